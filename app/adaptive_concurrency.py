@@ -0,0 +1,196 @@
+import logging
+import os
+import threading
+
+from app.metrics import task_metrics
+from app.resource_budget import ResourceBudget
+
+logger = logging.getLogger(__name__)
+
+
+def read_meminfo() -> dict[str, int]:
+    """/proc/meminfo 中的各项（字节）"""
+    info = {}
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                name, value = line.split(":", 1)
+                info[name] = int(value.split()[0]) * 1024
+    except (OSError, ValueError):
+        pass
+    return info
+
+
+def read_memory_pressure() -> float | None:
+    """内存 PSI（some avg10，最近 10 秒内有任务因等待内存而停顿的时间百分比），内核不支持时返回 None"""
+    try:
+        with open("/proc/pressure/memory") as f:
+            for line in f:
+                if line.startswith("some"):
+                    fields = dict(field.split("=") for field in line.split()[1:])
+                    return float(fields["avg10"])
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+
+def read_cpu_times() -> list[int] | None:
+    """/proc/stat 中 cpu 汇总行：user nice system idle iowait irq softirq steal ..."""
+    try:
+        with open("/proc/stat") as f:
+            fields = f.readline().split()
+        if fields and fields[0] == "cpu":
+            return [int(v) for v in fields[1:9]]
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class HostLoad:
+    """宿主机负载采样（Linux /proc），CPU 使用率与 steal 按相邻两次采样计算"""
+
+    def __init__(self):
+        self._cpu_times = read_cpu_times()
+
+    def sample(self) -> dict:
+        meminfo = read_meminfo()
+        total = meminfo.get("MemTotal", 0)
+        available = meminfo.get("MemAvailable", meminfo.get("MemFree", 0))
+
+        cpu_busy = cpu_steal = 0.0
+        cpu_times = read_cpu_times()
+        if cpu_times and self._cpu_times:
+            delta = [now - before for now, before in zip(cpu_times, self._cpu_times)]
+            elapsed = sum(delta)
+            if elapsed > 0:
+                # idle + iowait 之外均视为繁忙，steal 为被宿主机（虚拟化层）占用的时间
+                cpu_busy = 1 - (delta[3] + delta[4]) / elapsed
+                cpu_steal = delta[7] / elapsed
+        self._cpu_times = cpu_times
+
+        return {
+            "memory_available": available / total if total else 1.0,
+            "memory_pressure": read_memory_pressure(),
+            "cpu_busy": cpu_busy,
+            "cpu_steal": cpu_steal,
+        }
+
+
+class AdaptiveConcurrency:
+    """
+    按宿主机负载动态调整 worker 同时运行的任务数与预取数
+    - 可用内存比例低于 memory_low、内存 PSI 超过 pressure_limit 或 CPU steal 超过 steal_limit 时，上限降为 3/4（至少减 1）
+    - 连续 scale_up_rounds 次采样负载都较低（可用内存高于 memory_high，PSI 与 steal 低于限值的一半）时，上限加 1
+    - 上限介于 min_concurrency 与 worker 的 --concurrency 之间；通过资源预算限制运行数，通过 QoS 限制预取数
+    调低上限不会中断运行中的任务，只是新任务不再启动容器，多出的预取消息随运行中的任务结束逐步消化
+    """
+
+    def __init__(self,
+                 budget: ResourceBudget,
+                 min_concurrency: int = 1,
+                 interval: float = 5,
+                 memory_low: float = 0.15,
+                 memory_high: float = 0.3,
+                 pressure_limit: float = 10,
+                 steal_limit: float = 0.1,
+                 scale_up_rounds: int = 3):
+        self.budget = budget
+        self.min_concurrency = max(min_concurrency, 1)
+        self.interval = interval
+        self.memory_low = memory_low
+        self.memory_high = memory_high
+        self.pressure_limit = pressure_limit
+        self.steal_limit = steal_limit
+        self.scale_up_rounds = scale_up_rounds
+        self.max_concurrency = 0
+        self.concurrency = 0
+        self._consumer = None
+        self._healthy_rounds = 0
+        self._host = HostLoad()
+
+    def attach(self, consumer):
+        """绑定 worker 的 consumer（worker_ready 信号的 sender），以 --concurrency 为上限"""
+        self._consumer = consumer
+        self.max_concurrency = max(consumer.pool.num_processes or 0, self.min_concurrency)
+        self.concurrency = self.max_concurrency
+
+    def start(self, stop_event: threading.Event):
+        threading.Thread(target=self._run, args=(stop_event,), name="adaptive-concurrency", daemon=True).start()
+
+    def _run(self, stop_event: threading.Event):
+        while not stop_event.wait(self.interval):
+            try:
+                self.adjust(self._host.sample())
+            except Exception as e:
+                logger.warning(f"[AdaptiveConcurrency] Failed to adjust concurrency: {e}")
+
+    def overloaded(self, load: dict) -> str | None:
+        """返回需要降低并发的原因，负载正常时返回 None"""
+        if load["memory_available"] < self.memory_low:
+            return f"memory available {load['memory_available']:.0%}"
+        if load["memory_pressure"] is not None and load["memory_pressure"] > self.pressure_limit:
+            return f"memory pressure {load['memory_pressure']:.1f}%"
+        if load["cpu_steal"] > self.steal_limit:
+            return f"cpu steal {load['cpu_steal']:.0%}"
+        return None
+
+    def relaxed(self, load: dict) -> bool:
+        return (load["memory_available"] > self.memory_high
+                and (load["memory_pressure"] is None or load["memory_pressure"] < self.pressure_limit / 2)
+                and load["cpu_steal"] < self.steal_limit / 2)
+
+    def adjust(self, load: dict) -> int:
+        """根据一次负载采样调整并发上限，返回调整后的上限"""
+        if not self.max_concurrency:
+            return 0
+        target = self.concurrency
+        reason = self.overloaded(load)
+        if reason:
+            self._healthy_rounds = 0
+            target = max(self.min_concurrency, min(self.concurrency - 1, self.concurrency * 3 // 4))
+        elif self.relaxed(load):
+            self._healthy_rounds += 1
+            if self._healthy_rounds >= self.scale_up_rounds:
+                self._healthy_rounds = 0
+                target = min(self.max_concurrency, self.concurrency + 1)
+        else:
+            self._healthy_rounds = 0
+
+        if target != self.concurrency:
+            logger.info(f"[AdaptiveConcurrency] Concurrency {self.concurrency} -> {target}"
+                        f"{f' ({reason})' if reason else ''}, load: {load}")
+            self._apply(target)
+        return self.concurrency
+
+    def _apply(self, target: int):
+        delta = target - self.concurrency
+        self.concurrency = target
+        self.budget.set_limit(target)
+        # 预取数随并发上限同步调整（与 celery autoscale 相同的方式）
+        qos = getattr(self._consumer, "qos", None)
+        if qos is not None:
+            count = abs(delta) * (self._consumer.prefetch_multiplier or 1)
+            (qos.increment_eventually if delta > 0 else qos.decrement_eventually)(count)
+        task_metrics.concurrency_limit(target)
+
+
+def adaptive_from_env(budget: ResourceBudget) -> AdaptiveConcurrency | None:
+    """
+    ADAPTIVE_CONCURRENCY: 是否按宿主机负载调整并发，默认 true
+    ADAPTIVE_MIN_CONCURRENCY: 并发下限，默认 1
+    ADAPTIVE_INTERVAL: 采样间隔秒数，默认 5
+    ADAPTIVE_MEMORY_LOW / ADAPTIVE_MEMORY_HIGH: 可用内存比例低于该值时降低 / 高于该值时才提高并发，默认 0.15 / 0.3
+    ADAPTIVE_MEMORY_PRESSURE: 内存 PSI（some avg10，百分比）上限，默认 10
+    ADAPTIVE_CPU_STEAL: CPU steal 比例上限，默认 0.1
+    """
+    if os.getenv("ADAPTIVE_CONCURRENCY", "true").lower() not in ("1", "true", "yes", "on"):
+        return None
+    return AdaptiveConcurrency(
+        budget,
+        min_concurrency=int(os.getenv("ADAPTIVE_MIN_CONCURRENCY") or 1),
+        interval=float(os.getenv("ADAPTIVE_INTERVAL") or 5),
+        memory_low=float(os.getenv("ADAPTIVE_MEMORY_LOW") or 0.15),
+        memory_high=float(os.getenv("ADAPTIVE_MEMORY_HIGH") or 0.3),
+        pressure_limit=float(os.getenv("ADAPTIVE_MEMORY_PRESSURE") or 10),
+        steal_limit=float(os.getenv("ADAPTIVE_CPU_STEAL") or 0.1),
+    )
@@ -0,0 +1,32 @@
+from typing import Any
+
+from celery import Celery
+from celery.backends.base import BaseKeyValueStoreBackend
+
+# 单次 MGET 的 key 数量，避免单条命令过大
+MGET_CHUNK_SIZE = 1000
+
+
+def get_task_metas(celery_app: Celery, task_ids: list[str]) -> list[dict[str, Any]]:
+    """
+    批量读取任务的元数据（status / result / traceback / date_done）
+    Redis 等 KV 结果后端通过一个 pipeline 中的 MGET 一次读取，其他后端逐个读取
+    不存在的任务返回 PENDING
+    """
+    backend = celery_app.backend
+    if not isinstance(backend, BaseKeyValueStoreBackend) or not hasattr(backend, 'client'):
+        return [backend.get_task_meta(task_id) for task_id in task_ids]
+
+    keys = [backend.get_key_for_task(task_id) for task_id in task_ids]
+    pipe = backend.client.pipeline(transaction=False)
+    for offset in range(0, len(keys), MGET_CHUNK_SIZE):
+        pipe.mget(keys[offset:offset + MGET_CHUNK_SIZE])
+    values = [value for chunk in pipe.execute() for value in chunk]
+
+    metas = []
+    for task_id, value in zip(task_ids, values):
+        if value is None:
+            metas.append({"status": "PENDING", "result": None, "task_id": task_id})
+        else:
+            metas.append(backend.meta_from_decoded(backend.decode_result(value)))
+    return metas
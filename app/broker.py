@@ -0,0 +1,96 @@
+import base64
+import json
+import uuid
+from bisect import bisect
+
+import redis
+from celery import Celery
+from celery.signals import after_task_publish
+from kombu.compression import compress
+from kombu.serialization import dumps
+
+from app.queue_stats import DEFAULT_PRIORITY_SEP, DEFAULT_PRIORITY_STEPS
+
+DELIVERY_MODES = {"transient": 1, "persistent": 2}
+
+
+class BatchPublisher:
+    """
+    批量发布任务：Redis broker 下自行构造任务消息，一批消息的 LPUSH 在同一个 pipeline 中发送
+    消息格式与 kombu Redis transport 经匿名 exchange（direct 队列）发布的消息一致，不修改 kombu 的 channel
+    其他 broker 在同一个连接上用 producer 逐条发布
+    """
+
+    def __init__(self, celery_app: Celery):
+        self._app = celery_app
+        self.pipelined = celery_app.connection_for_write().transport.driver_type == 'redis'
+        self._client = redis.Redis.from_url(celery_app.conf.broker_url) if self.pipelined else None
+        options = celery_app.conf.broker_transport_options or {}
+        self._priority_steps = sorted(options.get("priority_steps", DEFAULT_PRIORITY_STEPS))
+        self._sep = options.get("sep", DEFAULT_PRIORITY_SEP)
+        self._prefix = options.get("global_keyprefix", "")
+
+    def _queue_key(self, queue: str, priority: int | None) -> str:
+        """与 kombu Redis transport 相同：优先级取不大于它的最大一档，0 档为队列本身"""
+        steps = self._priority_steps
+        pri = steps[bisect(steps, priority or 0) - 1]
+        return self._prefix + (f"{queue}{self._sep}{pri}" if pri else queue)
+
+    def _message(self, name: str, kwargs: dict, options: dict) -> tuple[str, str, dict, tuple]:
+        """返回 (任务 id, 队列名, 消息, 消息体)"""
+        conf = self._app.conf
+        task_id = options.get("task_id") or str(uuid.uuid4())
+        queue = options.get("queue") or conf.task_default_queue
+        headers, properties, body, _ = self._app.amqp.create_task_message(
+            task_id, name, (), kwargs,
+            countdown=options.get("countdown"),
+            expires=options.get("expires"),
+            time_limit=options.get("time_limit"),
+            reply_to=self._app.thread_oid,
+        )
+        headers.update(options.get("headers") or {})
+
+        content_type, content_encoding, data = dumps(body, serializer=conf.task_serializer)
+        if conf.task_compression:
+            data, headers["compression"] = compress(data, conf.task_compression)
+        if isinstance(data, str):
+            data = data.encode(content_encoding or "utf-8")
+
+        delivery_mode = conf.task_default_delivery_mode
+        properties.update(
+            priority=options.get("priority") or 0,
+            delivery_mode=DELIVERY_MODES.get(delivery_mode, delivery_mode),
+            delivery_info={"exchange": "", "routing_key": queue},
+            body_encoding="base64",
+            delivery_tag=str(uuid.uuid4()),
+        )
+        if isinstance(options.get("expires"), (int, float)):
+            properties["expiration"] = str(int(options["expires"] * 1000))
+        message = {
+            "body": base64.b64encode(data).decode(),
+            "content-encoding": content_encoding,
+            "content-type": content_type,
+            "headers": headers,
+            "properties": properties,
+        }
+        return task_id, queue, message, body
+
+    def publish(self, name: str, tasks: list[tuple[dict, dict]]) -> list[str]:
+        """
+        发布一批任务（kwargs, apply_async 参数），返回任务 id
+        Redis broker 下整批一次发送，失败时整批都未发送或部分已发送（由调用方按失败处理）
+        """
+        if not self.pipelined:
+            task = self._app.tasks[name]
+            with self._app.producer_or_acquire() as producer:
+                return [task.apply_async(kwargs=kwargs, producer=producer, **options).id for kwargs, options in tasks]
+
+        messages = [self._message(name, kwargs, options) for kwargs, options in tasks]
+        pipe = self._client.pipeline(transaction=False)
+        for (_, queue, message, _), (_, options) in zip(messages, tasks):
+            pipe.lpush(self._queue_key(queue, options.get("priority")), json.dumps(message))
+        pipe.execute()
+        for _, queue, message, body in messages:
+            after_task_publish.send(sender=name, body=body, headers=message["headers"], exchange="",
+                                    routing_key=queue)
+        return [task_id for task_id, *_ in messages]
@@ -0,0 +1,120 @@
+import json
+import logging
+import random
+import threading
+import time
+from typing import Any
+from urllib.parse import urlsplit
+
+import redis
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# 投递失败（重试耗尽或不可重试）的回调保存在该 Redis 列表中
+DEAD_LETTER_KEY = "tasker:callback:dead-letter"
+
+
+class CallbackRejected(Exception):
+    """回调地址返回不可重试的状态码（4xx，408/429 除外）"""
+
+
+class CallbackBusy(Exception):
+    """同一回调主机的并发投递数已满"""
+
+
+class CallbackResultNotReady(Exception):
+    """结果后端中还没有任务的结果（或结果已过期）"""
+
+
+class CallbackDelivery:
+    """
+    回调投递
+    - 共享 keep-alive 连接池的 requests.Session
+    - 每个回调主机的并发投递数受 host_concurrency 限制
+    - 指数退避的重试间隔，重试耗尽后写入死信列表
+    """
+
+    def __init__(self,
+                 timeout: float = 10,
+                 host_concurrency: int = 4,
+                 pool_maxsize: int = 32,
+                 backoff_base: float = 5,
+                 backoff_max: float = 600,
+                 dead_letter_max: int = 10000):
+        self.timeout = timeout
+        self.host_concurrency = host_concurrency
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.dead_letter_max = dead_letter_max
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        self._host_slots: dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.host_concurrency)
+            return slot
+
+    def post(self, url: str, payload: Any, task_id: str, wait: float = 30):
+        """投递一次回调，失败时抛出异常"""
+        slot = self._slot(url)
+        if not slot.acquire(timeout=wait):
+            raise CallbackBusy(f"Too many concurrent callbacks to {urlsplit(url).netloc}")
+        try:
+            headers = {
+                "Content-Type": "application/json",
+                "Task-Id": task_id
+            }
+            response = self._session.post(url, json=payload, headers=headers, timeout=self.timeout)
+            logger.info(f"callback: {response.status_code} - {response.text[:1000]}")
+            if 400 <= response.status_code < 500 and response.status_code not in (408, 429):
+                raise CallbackRejected(f"Callback {url} rejected with status {response.status_code}")
+            response.raise_for_status()
+        finally:
+            slot.release()
+
+    def backoff(self, retries: int) -> float:
+        """第 retries 次重试前的等待秒数（带随机抖动）"""
+        delay = min(self.backoff_base * (2 ** retries), self.backoff_max)
+        return delay * random.uniform(0.5, 1.0)
+
+    def dead_letter(self, client: redis.Redis | None, url: str, payload: Any, task_id: str,
+                    attempts: int, error: str):
+        record = {
+            "callback": url,
+            "task_id": task_id,
+            "payload": payload,
+            "attempts": attempts,
+            "error": error,
+            "timestamp": time.time(),
+        }
+        logger.error(f"回调通知失败，写入死信: {task_id} -> {url}: {error}")
+        if client is None:
+            return
+        pipe = client.pipeline(transaction=False)
+        pipe.lpush(DEAD_LETTER_KEY, json.dumps(record, default=str))
+        pipe.ltrim(DEAD_LETTER_KEY, 0, self.dead_letter_max - 1)
+        pipe.execute()
+
+
+def read_dead_letters(client: redis.Redis, start: int = 0, count: int = 100) -> list[dict]:
+    return [json.loads(item) for item in client.lrange(DEAD_LETTER_KEY, start, start + count - 1)]
+
+
+def pop_dead_letters(client: redis.Redis, count: int = 100) -> list[dict]:
+    """取出最早的 count 条死信（用于重新投递）"""
+    pipe = client.pipeline()
+    pipe.lrange(DEAD_LETTER_KEY, -count, -1)
+    pipe.ltrim(DEAD_LETTER_KEY, 0, -count - 1)
+    items, _ = pipe.execute()
+    return [json.loads(item) for item in reversed(items)]
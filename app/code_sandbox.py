@@ -0,0 +1,176 @@
+import logging
+import os
+import queue
+import subprocess
+import sys
+import threading
+
+from docker.utils import parse_bytes
+
+from app.sandbox_runner import read_frame, write_frame
+
+logger = logging.getLogger(__name__)
+
+RUNNER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_runner.py")
+
+
+class SandboxCodeError(Exception):
+    """执行的代码抛出异常，traceback 为子进程中的异常堆栈"""
+
+    def __init__(self, traceback_text: str):
+        super().__init__(traceback_text.strip().splitlines()[-1])
+        self.traceback = traceback_text
+
+
+class SandboxTimeout(Exception):
+    """代码执行超时，执行进程已被终止"""
+
+
+class SandboxCrashed(Exception):
+    """执行进程异常退出（超出内存或 CPU 限制等）"""
+
+
+class _Interpreter:
+    """一个常驻的执行子进程"""
+
+    def __init__(self, memory_limit: int | None):
+        self.uses = 0
+        # 内存上限由子进程启动后自行设置：preexec_fn 在多线程的 worker（--pool=threads）中 fork 后执行，不安全
+        self.process = subprocess.Popen(
+            [sys.executable, "-I", RUNNER_PATH, str(memory_limit or 0)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.wait(timeout=5)
+        except Exception:
+            pass
+
+
+class CodeSandbox:
+    """
+    预先启动的 Python 子进程池，用于执行小段代码，省去创建容器的开销
+    - 每次执行使用新的全局命名空间，stdout 按次捕获
+    - 超时后终止进程并补充新进程；CPU 时间与内存通过 rlimit 限制（仅 POSIX）
+    - 每个进程执行 max_uses 次后回收，避免模块级状态在多次执行间累积
+    注意：子进程与 worker 同用户运行，只隔离执行状态，不是安全沙箱，不应执行不可信代码
+    """
+
+    def __init__(self,
+                 size: int = 2,
+                 timeout: float = 30,
+                 memory_limit: int | None = 512 * 1024 * 1024,
+                 cpu_seconds: float | None = None,
+                 max_uses: int = 100):
+        self.size = size
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.cpu_seconds = cpu_seconds
+        self.max_uses = max_uses
+        # None 表示启动执行进程失败的空位，下次使用时重新启动
+        self._idle: queue.Queue[_Interpreter | None] = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self):
+        """启动 size 个执行进程（首次执行时也会自动启动）"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        size = max(self.size, 1)
+        for _ in range(size):
+            self._idle.put(self._spawn())
+        logger.info(f"[CodeSandbox] Started {size} interpreters.")
+
+    def run(self, code: str, timeout: float | None = None) -> str:
+        """执行代码并返回 stdout 输出；代码异常、超时或进程崩溃时抛出异常"""
+        self.start()
+        timeout = timeout or self.timeout
+        interpreter = self._idle.get()
+        healthy = False
+        try:
+            if interpreter is None or not interpreter.alive():
+                interpreter = _Interpreter(self.memory_limit)
+            response = self._call(interpreter, code, timeout)
+            healthy = True
+        finally:
+            if healthy and interpreter.uses + 1 < self.max_uses:
+                interpreter.uses += 1
+                self._idle.put(interpreter)
+            else:
+                if interpreter is not None:
+                    interpreter.kill()
+                # 无论能否启动新进程都要归还空位，否则空位耗尽后 _idle.get() 会一直阻塞
+                self._idle.put(self._spawn())
+        if response["error"]:
+            raise SandboxCodeError(response["error"])
+        return response["output"]
+
+    def _spawn(self) -> _Interpreter | None:
+        """启动一个执行进程，失败时返回 None（空位），下次使用时重试"""
+        try:
+            return _Interpreter(self.memory_limit)
+        except Exception as e:
+            logger.error(f"[CodeSandbox] Failed to start interpreter: {e}")
+            return None
+
+    def _call(self, interpreter: _Interpreter, code: str, timeout: float) -> dict:
+        timed_out = threading.Event()
+
+        def _on_timeout():
+            timed_out.set()
+            interpreter.kill()
+
+        # 超时后终止进程，阻塞中的读取随之返回
+        timer = threading.Timer(timeout, _on_timeout)
+        timer.daemon = True
+        timer.start()
+        try:
+            try:
+                write_frame(interpreter.process.stdin, {"code": code, "cpu_seconds": self.cpu_seconds or timeout})
+                response = read_frame(interpreter.process.stdout)
+            except (OSError, ValueError):
+                response = None
+        finally:
+            timer.cancel()
+        if timed_out.is_set():
+            raise SandboxTimeout(f"代码执行超过 {timeout} 秒，已终止")
+        if response is None:
+            exit_code = interpreter.process.wait()
+            raise SandboxCrashed(f"执行进程异常退出，退出码 {exit_code}（可能超出内存或 CPU 限制）")
+        return response
+
+    def shutdown(self):
+        while True:
+            try:
+                interpreter = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            if interpreter is not None:
+                interpreter.kill()
+
+
+def sandbox_from_env() -> CodeSandbox:
+    """
+    CODE_SANDBOX_SIZE: 预先启动的执行进程数，默认 2
+    CODE_SANDBOX_TIMEOUT: 单次执行的默认超时秒数，默认 30
+    CODE_SANDBOX_MEMORY: 单个执行进程的内存上限，如 512m，为空时不限制
+    CODE_SANDBOX_CPU_SECONDS: 单次执行的 CPU 时间上限，默认与超时相同
+    CODE_SANDBOX_MAX_USES: 单个进程执行多少次后回收，默认 100
+    """
+    memory = os.getenv("CODE_SANDBOX_MEMORY", "512m")
+    cpu_seconds = os.getenv("CODE_SANDBOX_CPU_SECONDS")
+    return CodeSandbox(
+        size=int(os.getenv("CODE_SANDBOX_SIZE") or 2),
+        timeout=float(os.getenv("CODE_SANDBOX_TIMEOUT") or 30),
+        memory_limit=parse_bytes(memory) if memory else None,
+        cpu_seconds=float(cpu_seconds) if cpu_seconds else None,
+        max_uses=int(os.getenv("CODE_SANDBOX_MAX_USES") or 100),
+    )
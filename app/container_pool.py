@@ -0,0 +1,230 @@
+import json
+import logging
+import os
+import shlex
+import threading
+import time
+from collections import deque
+
+from docker import DockerClient
+from docker.models.containers import Container
+
+from app.container_reaper import merge_labels
+from app.result_parser import ResultParser
+
+logger = logging.getLogger(__name__)
+
+
+class WarmContainer:
+    """池中的一个预创建容器"""
+
+    def __init__(self, container: Container):
+        self.container = container
+        self.uses: int = 0
+
+    @property
+    def id(self) -> str:
+        return self.container.id
+
+
+class ContainerPool:
+    """
+    单个镜像的预热容器池
+    - 预先创建并启动 size 个空闲容器（执行 idle_command 常驻），任务通过 exec 在其中执行命令
+    - 容器使用 max_uses 次或执行失败后销毁，由后台线程补充
+    - pause_idle 为 True 时空闲容器处于 paused 状态，不占用 CPU
+    """
+
+    def __init__(self,
+                 client: DockerClient,
+                 image: str,
+                 size: int,
+                 container_kwargs: dict | None = None,
+                 max_uses: int = 20,
+                 idle_command: list[str] | None = None,
+                 pause_idle: bool = False,
+                 ready_delay: float = 0,
+                 labels: dict[str, str] | None = None):
+        self._client = client
+        self.image = image
+        self.size = size
+        self.container_kwargs: dict = container_kwargs or {}
+        self.max_uses = max_uses
+        self.idle_command = idle_command or ["sleep", "infinity"]
+        self.pause_idle = pause_idle
+        self.ready_delay = ready_delay
+        # 附加到池中容器的标签（worker id，供清理孤儿容器）
+        self.labels: dict[str, str] = labels or {}
+
+        self._idle: deque[WarmContainer] = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def matches(self, container_kwargs: dict) -> bool:
+        """任务的容器参数（环境变量除外）与池一致时才能使用池中的容器"""
+        kwargs = {k: v for k, v in container_kwargs.items() if k != "environment"}
+        return kwargs == self.container_kwargs
+
+    def acquire(self) -> WarmContainer | None:
+        """取出一个空闲容器，没有空闲容器时返回 None（调用方走冷启动流程）"""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                warm = self._idle.popleft()
+            self._wakeup.set()
+            try:
+                if self.pause_idle:
+                    warm.container.unpause()
+                return warm
+            except Exception as e:
+                logger.warning(f"[ContainerPool] Warm container {warm.id} unusable: {e}")
+                self._destroy(warm)
+
+    def release(self, warm: WarmContainer, healthy: bool):
+        """归还容器，失败或达到使用次数的容器直接销毁"""
+        warm.uses += 1
+        if not healthy or warm.uses >= self.max_uses:
+            self._destroy(warm)
+            self._wakeup.set()
+            return
+        try:
+            if self.pause_idle:
+                warm.container.pause()
+        except Exception as e:
+            logger.warning(f"[ContainerPool] Failed to pause container {warm.id}: {e}")
+            self._destroy(warm)
+            self._wakeup.set()
+            return
+        with self._lock:
+            self._idle.append(warm)
+
+    def execute(self, warm: WarmContainer, command: list[str] | str, environment: dict | None,
+                timeout: float, parser: ResultParser) -> int:
+        """
+        在容器内执行命令，输出交给解析器，返回退出码
+        超时则抛出 TimeoutError，调用方应以 healthy=False 归还容器
+        """
+        api = self._client.api
+        exec_id = api.exec_create(warm.id, cmd=command, environment=environment, stdout=True, stderr=True)["Id"]
+        output = api.exec_start(exec_id, stream=True)
+
+        def _read():
+            try:
+                for chunk in output:
+                    parser.feed(chunk)
+            except Exception as e:
+                logger.warning(f"Exec output interrupted: {e}")
+
+        reader = threading.Thread(target=_read, name=f"docker-exec-{warm.container.short_id}", daemon=True)
+        reader.start()
+        reader.join(timeout=timeout)
+        if reader.is_alive():
+            raise TimeoutError(f"Exec in container {warm.id} exceeded {timeout} seconds")
+        parser.close()
+        exit_code = api.exec_inspect(exec_id).get("ExitCode")
+        return 1 if exit_code is None else exit_code
+
+    def maintain(self, stop_event: threading.Event):
+        """后台线程：保持 size 个空闲容器"""
+        while not stop_event.is_set():
+            with self._lock:
+                missing = self.size - len(self._idle)
+            for _ in range(max(missing, 0)):
+                if stop_event.is_set():
+                    break
+                try:
+                    self._create()
+                except Exception as e:
+                    logger.warning(f"[ContainerPool] Failed to create warm container for {self.image}: {e}")
+                    stop_event.wait(10)
+                    break
+            self._wakeup.wait(timeout=30)
+            self._wakeup.clear()
+
+    def shutdown(self):
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+        for warm in idle:
+            self._destroy(warm)
+
+    def _create(self):
+        container = self._client.containers.create(
+            image=self.image,
+            command=self.idle_command,
+            **{**self.container_kwargs,
+               "labels": merge_labels(self.container_kwargs.get("labels"),
+                                      {**self.labels, "tasker.warm-pool": self.image})},
+        )
+        container.start()
+        if self.ready_delay > 0:
+            time.sleep(self.ready_delay)
+        if self.pause_idle:
+            container.pause()
+        logger.info(f"[ContainerPool] Warm container {container.id} ready for image {self.image}.")
+        with self._lock:
+            self._idle.append(WarmContainer(container))
+
+    def _destroy(self, warm: WarmContainer):
+        try:
+            warm.container.remove(force=True)
+            logger.info(f"[ContainerPool] Warm container {warm.id} removed after {warm.uses} uses.")
+        except Exception as e:
+            logger.warning(f"[ContainerPool] Failed to remove warm container {warm.id}: {e}")
+
+
+class ContainerPools:
+    """按镜像管理预热容器池"""
+
+    def __init__(self, pools: list[ContainerPool]):
+        self._pools: dict[str, ContainerPool] = {p.image: p for p in pools}
+
+    def __bool__(self):
+        return bool(self._pools)
+
+    def get(self, image: str, container_kwargs: dict) -> ContainerPool | None:
+        pool = self._pools.get(image)
+        if pool is not None and pool.matches(container_kwargs):
+            return pool
+        return None
+
+    def start(self, stop_event: threading.Event):
+        for pool in self._pools.values():
+            threading.Thread(target=pool.maintain, args=(stop_event,),
+                             name=f"container-pool-{pool.image}", daemon=True).start()
+
+    def shutdown(self):
+        for pool in self._pools.values():
+            pool.shutdown()
+
+
+def pools_from_env(client: DockerClient, labels: dict[str, str] | None = None) -> ContainerPools:
+    """
+    WARM_POOL_IMAGES: 启用预热池的镜像及池大小，如 registry/platform_item_info:1.0=2,python:3.13-slim=1
+    WARM_POOL_CONTAINER_KWARGS: 池中容器的运行参数（JSON），任务参数与之一致才会使用池
+    WARM_POOL_MAX_USES: 单个容器最多执行的任务数
+    WARM_POOL_IDLE_COMMAND: 空闲容器常驻的命令
+    WARM_POOL_PAUSE: 空闲容器是否暂停
+    WARM_POOL_READY_DELAY: 容器启动后等待就绪的秒数
+    """
+    pools = []
+    container_kwargs = json.loads(os.getenv("WARM_POOL_CONTAINER_KWARGS") or "{}")
+    for item in (os.getenv("WARM_POOL_IMAGES") or "").split(","):
+        if not item.strip():
+            continue
+        image, _, size = item.strip().rpartition("=")
+        if not image:
+            image, size = size, "1"
+        pools.append(ContainerPool(
+            client,
+            image=image,
+            size=int(size),
+            container_kwargs=container_kwargs,
+            max_uses=int(os.getenv("WARM_POOL_MAX_USES") or 20),
+            idle_command=shlex.split(os.getenv("WARM_POOL_IDLE_COMMAND") or "sleep infinity"),
+            pause_idle=(os.getenv("WARM_POOL_PAUSE") or "false").lower() in ("1", "true", "yes", "on"),
+            ready_delay=float(os.getenv("WARM_POOL_READY_DELAY") or 0),
+            labels=labels,
+        ))
+    return ContainerPools(pools)
@@ -0,0 +1,204 @@
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import redis
+from celery import Celery
+from docker import DockerClient
+from docker.errors import NotFound
+
+from app.metrics import task_metrics
+
+logger = logging.getLogger(__name__)
+
+# 任务容器的标签
+LABEL_WORKER = "tasker.worker"  # 创建容器的 worker（进程级 id，重启后变化）
+LABEL_TASK_ID = "tasker.task-id"
+LABEL_DEADLINE = "tasker.deadline"  # 超过该时间（unix 秒）的容器视为过期
+
+# worker 存活标记，key 过期即视为 worker 已退出
+HEARTBEAT_PREFIX = "tasker:reaper:worker"
+
+
+def heartbeat_key(worker_id: str) -> str:
+    return f"{HEARTBEAT_PREFIX}:{worker_id}"
+
+
+def merge_labels(labels: dict | list | None, extra: dict[str, str]) -> dict[str, str]:
+    """合并任务参数中的标签（docker-py 支持 dict 或 list）"""
+    if isinstance(labels, (list, tuple)):
+        labels = dict.fromkeys(labels, "")
+    return {**(labels or {}), **extra}
+
+
+class ContainerReaper:
+    """
+    容器的后台清理
+    - 任务结束后容器 id 放入队列，由后台线程按批并发删除，任务无需等待删除完成
+    - 任务容器带有 worker id、任务 id 与过期时间标签，worker 通过 Redis 心跳表明存活
+    - 启动时及每 interval 秒清扫一次：删除心跳已消失的 worker 留下的容器，以及超过过期时间的容器
+    Redis 不可用时只按过期时间清扫，避免误删存活 worker 的容器
+    """
+
+    def __init__(self,
+                 client: DockerClient,
+                 celery_app: Celery,
+                 interval: float = 60,
+                 grace: float = 300,
+                 batch_size: int = 20,
+                 concurrency: int = 4):
+        self._client = client
+        self._app = celery_app
+        self.interval = interval
+        self.grace = grace
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._queue: queue.Queue[tuple[str, str | None]] = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="container-reaper")
+
+    @property
+    def _redis(self) -> redis.Redis:
+        return self._app.backend.client
+
+    def worker_labels(self) -> dict[str, str]:
+        """本 worker 创建的所有容器（含预热容器）都带有的标签"""
+        return {LABEL_WORKER: self.worker_id}
+
+    def task_labels(self, labels: dict | list | None, task_id: str, max_execution_time: float) -> dict[str, str]:
+        """任务容器的标签：worker id、任务 id，以及最大执行时间加宽限期后的过期时间"""
+        return merge_labels(labels, {
+            **self.worker_labels(),
+            LABEL_TASK_ID: task_id,
+            LABEL_DEADLINE: str(int(time.time() + max_execution_time + self.grace)),
+        })
+
+    def remove(self, container_id: str, task_name: str | None = None):
+        """异步删除容器"""
+        self._queue.put((container_id, task_name))
+
+    def start(self, stop_event: threading.Event):
+        self._heartbeat()
+        threading.Thread(target=self._drain, args=(stop_event,), name="container-reaper", daemon=True).start()
+        threading.Thread(target=self._sweep_loop, args=(stop_event,), name="container-sweeper", daemon=True).start()
+
+    def _drain(self, stop_event: threading.Event):
+        while not stop_event.is_set():
+            try:
+                batch = [self._queue.get(timeout=1)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._remove_batch(batch)
+
+    def shutdown(self):
+        """worker 退出时同步删除队列中剩余的容器，并清除心跳，其他 worker 可立即清理遗留的容器"""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._remove_batch(batch)
+        try:
+            self._redis.delete(heartbeat_key(self.worker_id))
+        except Exception as e:
+            logger.warning(f"[ContainerReaper] Failed to clear heartbeat: {e}")
+
+    def _remove_batch(self, batch: list[tuple[str, str | None]]):
+        for _ in self._executor.map(lambda item: self._remove_one(*item), batch):
+            pass
+
+    def _remove_one(self, container_id: str, task_name: str | None = None) -> bool:
+        started = time.perf_counter()
+        try:
+            self._client.api.remove_container(container_id, force=True)
+            logger.info(f"Container {container_id} removed.")
+            return True
+        except NotFound:
+            return True
+        except Exception as e:
+            logger.warning(f"[ContainerReaper] Failed to remove container {container_id}: {e}")
+            return False
+        finally:
+            if task_name:
+                task_metrics.observe_phase(task_name, "container_remove", time.perf_counter() - started)
+
+    def _sweep_loop(self, stop_event: threading.Event):
+        while True:
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.warning(f"[ContainerReaper] Sweep failed: {e}")
+            if stop_event.wait(self.interval):
+                return
+            self._heartbeat()
+
+    def _heartbeat(self):
+        try:
+            self._redis.set(heartbeat_key(self.worker_id), int(time.time()), ex=max(int(self.interval * 3), 1))
+        except Exception as e:
+            logger.warning(f"[ContainerReaper] Failed to write heartbeat: {e}")
+
+    def alive_workers(self, worker_ids: set[str]) -> set[str] | None:
+        """心跳仍然存在的 worker，Redis 不可用时返回 None"""
+        worker_ids = list(worker_ids)
+        if not worker_ids:
+            return set()
+        try:
+            values = self._redis.mget([heartbeat_key(w) for w in worker_ids])
+        except Exception as e:
+            logger.warning(f"[ContainerReaper] Failed to read heartbeats, skip orphan check: {e}")
+            return None
+        return {w for w, value in zip(worker_ids, values) if value is not None}
+
+    def sweep(self) -> list[str]:
+        """删除孤儿容器与过期容器，返回删除的容器 id"""
+        containers = self._client.api.containers(all=True, filters={"label": LABEL_WORKER})
+        owners = {c["Labels"][LABEL_WORKER] for c in containers}
+        # 本 worker 的心跳在本进程内始终视为存活
+        alive = self.alive_workers(owners - {self.worker_id})
+        now = time.time()
+        doomed = []
+        for c in containers:
+            labels = c["Labels"]
+            owner = labels[LABEL_WORKER]
+            deadline = labels.get(LABEL_DEADLINE)
+            if alive is not None and owner != self.worker_id and owner not in alive:
+                reason = f"worker {owner} is gone"
+            elif deadline and deadline.isdigit() and int(deadline) < now:
+                reason = "deadline exceeded"
+            else:
+                continue
+            logger.warning(f"[ContainerReaper] Removing container {c['Id'][:12]} "
+                           f"(task {labels.get(LABEL_TASK_ID, '-')}): {reason}.")
+            doomed.append(c["Id"])
+        removed = [cid for cid, ok in zip(doomed, self._executor.map(self._remove_one, doomed)) if ok]
+        if removed:
+            logger.info(f"[ContainerReaper] Swept {len(removed)} containers.")
+        return removed
+
+
+def reaper_from_env(client: DockerClient, celery_app: Celery) -> ContainerReaper:
+    """
+    REAPER_INTERVAL: 清扫间隔秒数，默认 60（worker 心跳 3 个间隔未刷新即视为退出）
+    REAPER_GRACE: 任务容器在最大执行时间之外保留的宽限秒数，默认 300
+    REAPER_CONCURRENCY: 并发删除容器的线程数，默认 4
+    """
+    return ContainerReaper(
+        client,
+        celery_app,
+        interval=float(os.getenv("REAPER_INTERVAL") or 60),
+        grace=float(os.getenv("REAPER_GRACE") or 300),
+        concurrency=int(os.getenv("REAPER_CONCURRENCY") or 4),
+    )
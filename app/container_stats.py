@@ -0,0 +1,137 @@
+import logging
+import threading
+import time
+
+from docker import DockerClient
+from docker.errors import InvalidVersion, NotFound
+
+logger = logging.getLogger(__name__)
+
+
+def parse_stats(stats: dict) -> dict:
+    """
+    从 Docker stats 接口的一次采样中提取累计计数与当前内存
+    内存不含页缓存（cgroup v1 减去 cache，v2 减去 inactive_file），与 docker stats 命令一致
+    """
+    cpu = stats.get("cpu_stats") or {}
+    memory = stats.get("memory_stats") or {}
+    memory_detail = memory.get("stats") or {}
+    usage = memory.get("usage") or 0
+    usage -= memory_detail.get("inactive_file", memory_detail.get("cache", 0)) or 0
+
+    networks = (stats.get("networks") or {}).values()
+    block_read = block_write = 0
+    for entry in (stats.get("blkio_stats") or {}).get("io_service_bytes_recursive") or []:
+        op = (entry.get("op") or "").lower()
+        if op == "read":
+            block_read += entry.get("value", 0)
+        elif op == "write":
+            block_write += entry.get("value", 0)
+
+    return {
+        "cpu_ns": (cpu.get("cpu_usage") or {}).get("total_usage", 0),
+        "system_ns": cpu.get("system_cpu_usage", 0),
+        "online_cpus": cpu.get("online_cpus") or len((cpu.get("cpu_usage") or {}).get("percpu_usage") or []) or 1,
+        "memory": max(usage, 0),
+        "memory_limit": memory.get("limit", 0),
+        "net_rx": sum(n.get("rx_bytes", 0) for n in networks),
+        "net_tx": sum(n.get("tx_bytes", 0) for n in networks),
+        "block_read": block_read,
+        "block_write": block_write,
+    }
+
+
+class ContainerStatsCollector:
+    """
+    后台线程按 interval 秒采样容器的资源使用（Docker stats 接口，one-shot 模式，不占用常驻连接）
+    - cpu_seconds / net / block 为累计值，relative 为 True 时按第一次采样计算增量（预热容器中的 exec）
+    - memory_peak 为采样到的内存峰值，cpu_percent_peak 为相邻两次采样间的 CPU 使用率峰值
+    采样间隔内结束的短任务可能只有一次或没有采样
+    """
+
+    def __init__(self, client: DockerClient, container_id: str, interval: float = 1, relative: bool = False):
+        self._api = client.api
+        self.container_id = container_id
+        self.interval = interval
+        self.relative = relative
+        self.samples = 0
+        self._first: dict | None = None
+        self._last: dict | None = None
+        self._memory_peak = 0
+        self._cpu_percent_peak = 0.0
+        self._started_at = time.monotonic()
+        self._one_shot: bool | None = True
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> "ContainerStatsCollector":
+        if self.relative:
+            # 同步采样一次作为基线，避免漏掉 exec 开始后的用量
+            self.sample()
+        self._thread = threading.Thread(target=self._run, name=f"docker-stats-{self.container_id[:12]}", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        if not self.relative:
+            self.sample()
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> bool:
+        """采样一次，容器已不存在或接口出错时返回 False"""
+        try:
+            try:
+                raw = self._api.stats(self.container_id, stream=False, one_shot=self._one_shot)
+            except InvalidVersion:
+                # 旧版本 API 不支持 one-shot，每次采样需等待一个统计周期
+                self._one_shot = None
+                raw = self._api.stats(self.container_id, stream=False)
+        except NotFound:
+            self._stop.set()
+            return False
+        except Exception as e:
+            logger.debug(f"Failed to sample stats of container {self.container_id}: {e}")
+            return False
+        current = parse_stats(raw)
+        if not current["system_ns"]:
+            # 已停止的容器返回空的统计，丢弃以免覆盖累计值
+            return False
+        with self._lock:
+            if self._last is not None and current["system_ns"] > self._last["system_ns"]:
+                cpu_delta = current["cpu_ns"] - self._last["cpu_ns"]
+                system_delta = current["system_ns"] - self._last["system_ns"]
+                percent = cpu_delta / system_delta * current["online_cpus"] * 100
+                self._cpu_percent_peak = max(self._cpu_percent_peak, percent)
+            if self._first is None:
+                self._first = current
+            self._last = current
+            self._memory_peak = max(self._memory_peak, current["memory"])
+            self.samples += 1
+        return True
+
+    def stop(self, oom_killed: bool | None = None) -> dict | None:
+        """停止采样并返回汇总，没有任何采样且 oom_killed 未知时返回 None"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+        with self._lock:
+            if self._last is None:
+                return None if oom_killed is None else {"samples": 0, "oom_killed": oom_killed}
+            base = self._first if self.relative else dict.fromkeys(self._last, 0)
+            summary = {
+                "duration": round(time.monotonic() - self._started_at, 3),
+                "samples": self.samples,
+                "cpu_seconds": round((self._last["cpu_ns"] - base["cpu_ns"]) / 1e9, 3),
+                "cpu_percent_peak": round(self._cpu_percent_peak, 1),
+                "memory_peak": self._memory_peak,
+                "memory_limit": self._last["memory_limit"],
+                "net_rx_bytes": self._last["net_rx"] - base["net_rx"],
+                "net_tx_bytes": self._last["net_tx"] - base["net_tx"],
+                "block_read_bytes": self._last["block_read"] - base["block_read"],
+                "block_write_bytes": self._last["block_write"] - base["block_write"],
+            }
+        if oom_killed is not None:
+            summary["oom_killed"] = oom_killed
+        return summary
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import time
+from typing import Any
+
+import redis
+from celery import Celery
+
+KEY_PREFIX = "tasker:dedup"
+
+# 不影响执行结果的容器参数，不参与指纹计算
+IGNORED_CONTAINER_KWARGS = frozenset({"name", "labels", "ports", "detach", "auto_remove", "remove"})
+
+
+def task_fingerprint(image: str, command: Any, container_kwargs: dict[str, Any]) -> str:
+    """镜像、命令与容器参数的规范化哈希（字典按 key 排序，与参数书写顺序无关）"""
+    relevant = {k: v for k, v in (container_kwargs or {}).items() if k not in IGNORED_CONTAINER_KWARGS}
+    canonical = json.dumps([image.strip(), command, relevant], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def inflight_key(fingerprint: str) -> str:
+    return f"{KEY_PREFIX}:inflight:{fingerprint}"
+
+
+def done_key(fingerprint: str) -> str:
+    return f"{KEY_PREFIX}:done:{fingerprint}"
+
+
+def callbacks_key(task_id: str) -> str:
+    return f"{KEY_PREFIX}:callbacks:{task_id}"
+
+
+class TaskDeduplicator:
+    """
+    相同任务的去重
+    - 执行中：相同指纹的任务合并到同一个任务 id，后来者的回调地址追加到该任务，结束时一并投递
+    - 已完成：成功的结果在 result_ttl 秒内可被复用，调用方通过 max_age 控制可接受的结果新旧程度
+    数据保存在结果后端的 Redis 中，结果本身仍从结果后端按任务 id 读取
+    """
+
+    def __init__(self, celery_app: Celery, result_ttl: int = 600):
+        self._app = celery_app
+        self.result_ttl = result_ttl
+
+    @property
+    def _client(self) -> redis.Redis:
+        return self._app.backend.client
+
+    def lookup_result(self, fingerprint: str, max_age: float) -> str | None:
+        """返回 max_age 秒内完成的相同任务 id"""
+        raw = self._client.get(done_key(fingerprint))
+        if raw is None:
+            return None
+        done = json.loads(raw)
+        if time.time() - done["finished_at"] > max_age:
+            return None
+        return done["task_id"]
+
+    def claim(self, fingerprint: str, task_id: str, lease: int, callback: str | None = None) -> str | None:
+        """
+        登记执行中的任务，返回 None 表示由 task_id 执行
+        已有相同任务在执行时返回其任务 id，并把 callback 追加到该任务的回调列表
+        """
+        key = inflight_key(fingerprint)
+        with self._client.pipeline() as pipe:
+            while True:
+                try:
+                    # 任务在 watch 之后结束时事务失败并重试，避免追加的回调无人投递
+                    pipe.watch(key)
+                    existing = pipe.get(key)
+                    pipe.multi()
+                    if existing is None:
+                        pipe.set(key, task_id, ex=lease)
+                    elif callback:
+                        pipe.rpush(callbacks_key(existing.decode()), callback)
+                        pipe.expire(callbacks_key(existing.decode()), lease)
+                    pipe.execute()
+                    return existing.decode() if existing is not None else None
+                except redis.WatchError:
+                    continue
+
+    def complete(self, fingerprint: str, task_id: str, success: bool) -> list[str]:
+        """任务结束：释放执行中标记，成功时登记可复用的结果，返回合并进来的回调地址"""
+        key = inflight_key(fingerprint)
+        with self._client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    owner = pipe.get(key)
+                    pipe.multi()
+                    if owner is not None and owner.decode() == task_id:
+                        pipe.delete(key)
+                    if success:
+                        pipe.set(done_key(fingerprint), json.dumps({"task_id": task_id, "finished_at": time.time()}),
+                                 ex=self.result_ttl)
+                    pipe.lrange(callbacks_key(task_id), 0, -1)
+                    pipe.delete(callbacks_key(task_id))
+                    values = pipe.execute()
+                    return [c.decode() for c in values[-2]]
+                except redis.WatchError:
+                    continue
+
+
+def deduplicator_from_env(celery_app: Celery) -> TaskDeduplicator:
+    """DEDUP_RESULT_TTL: 成功结果可被复用的最长时间（秒），默认 600"""
+    return TaskDeduplicator(celery_app, result_ttl=int(os.getenv("DEDUP_RESULT_TTL") or 600))
@@ -0,0 +1,315 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any
+
+import redis
+from celery import Celery
+
+from app.queue_stats import QueueStats
+
+logger = logging.getLogger(__name__)
+
+# 优先级名称 -> broker 优先级（Redis transport 下数值越小越优先，对应默认的 priority_steps [0, 3, 6, 9]）
+PRIORITY_CLASSES = {"high": 0, "normal": 3, "low": 9}
+DEFAULT_PRIORITY = "normal"
+
+KEY_PREFIX = "tasker:fair"
+# 有待调度任务的队列
+QUEUES_KEY = f"{KEY_PREFIX}:queues"
+# 待调度任务的参数（task_id -> json）
+PAYLOAD_KEY = f"{KEY_PREFIX}:payload"
+# 调度线程的 leader 锁，多个 api 进程中只有一个在调度
+LEADER_KEY = f"{KEY_PREFIX}:leader"
+
+# 有序集合的分数：优先级在高位，提交时间（毫秒）在低位，同一租户内先按优先级再按提交顺序
+_PRIORITY_SCALE = 10 ** 13
+
+
+def parse_priority(value: Any) -> int:
+    """优先级参数：high / normal / low 或 0-9 的整数，为空时为 normal"""
+    if value is None:
+        return PRIORITY_CLASSES[DEFAULT_PRIORITY]
+    if isinstance(value, str) and value in PRIORITY_CLASSES:
+        return PRIORITY_CLASSES[value]
+    if isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= 9:
+        return value
+    raise ValueError(f"priority 必须是 {list(PRIORITY_CLASSES)} 之一或 0-9 的整数")
+
+
+def priority_class(priority: int | None) -> str:
+    """broker 优先级所属的优先级名称（用于指标标签）"""
+    if priority is None or priority < PRIORITY_CLASSES["normal"]:
+        return "high"
+    if priority < PRIORITY_CLASSES["low"]:
+        return "normal"
+    return "low"
+
+
+def tenants_key(queue: str) -> str:
+    return f"{KEY_PREFIX}:tenants:{queue}"
+
+
+def pending_key(queue: str, tenant: str) -> str:
+    return f"{KEY_PREFIX}:pending:{queue}:{tenant}"
+
+
+def inflight_key(tenant: str) -> str:
+    return f"{KEY_PREFIX}:inflight:{tenant}"
+
+
+class FairScheduler:
+    """
+    多租户加权公平调度
+    - 带 tenant 的任务先进入 Redis 中按队列、租户划分的待调度集合，不直接发送到 broker
+    - 调度线程保持每个 broker 队列中的等待任务不超过 queue_depth，broker 中不会积压，优先级始终有效
+    - 每次从可调度的租户中选出队首优先级最高的，同一优先级内按权重做 stride 调度
+    - 每个租户同时执行的任务数不超过其并发上限，任务结束时由 worker 调用 release() 释放
+    - 释放丢失时（worker 崩溃等），占用在 time_limit + lease_grace 秒后自动过期
+    """
+
+    def __init__(self,
+                 celery_app: Celery,
+                 weights: dict[str, float] | None = None,
+                 concurrency: dict[str, int] | None = None,
+                 default_concurrency: int = 0,
+                 queue_depth: int = 8,
+                 lease_grace: float = 300,
+                 interval: float = 0.5):
+        self._app = celery_app
+        self._client = redis.Redis.from_url(celery_app.conf.broker_url)
+        self._queue_stats = QueueStats(celery_app)
+        self.weights = weights or {}
+        self.concurrency = concurrency or {}
+        self.default_concurrency = default_concurrency
+        self.queue_depth = queue_depth
+        self.lease_grace = lease_grace
+        self.interval = interval
+
+        # stride 调度：租户 -> 已消耗的虚拟时间
+        self._passes: dict[str, float] = {}
+        self._vtime = 0.0
+        self._token = uuid.uuid4().hex
+        self._wakeup = threading.Event()
+
+    def weight(self, tenant: str) -> float:
+        return max(float(self.weights.get(tenant, 1)), 0.01)
+
+    def limit(self, tenant: str) -> int:
+        """租户的并发上限，0 表示不限制"""
+        return int(self.concurrency.get(tenant, self.default_concurrency))
+
+    # ---------- 提交（api） ----------
+
+    def submit(self, task_name: str, task_id: str, kwargs: dict, options: dict, tenant: str, priority: int):
+        self.submit_many([(task_name, task_id, kwargs, options, tenant, priority)])
+
+    def submit_many(self, items: list[tuple[str, str, dict, dict, str, int]]):
+        """批量提交任务，一个事务内写入"""
+        now = time.time()
+        pipe = self._client.pipeline()
+        for task_name, task_id, kwargs, options, tenant, priority in items:
+            options = dict(options)
+            # 倒计时与过期时间相对提交时刻计算，转为绝对时间，不受排队时长影响
+            countdown = options.pop("countdown", None)
+            expires = options.pop("expires", None)
+            payload = {
+                "task": task_name,
+                "kwargs": kwargs,
+                "options": options,
+                "tenant": tenant,
+                "eta": now + countdown if countdown else None,
+                "expires": now + expires if expires else None,
+            }
+            queue = options["queue"]
+            pipe.hset(PAYLOAD_KEY, task_id, json.dumps(payload))
+            pipe.zadd(pending_key(queue, tenant), {task_id: priority * _PRIORITY_SCALE + int(now * 1000)})
+            pipe.sadd(tenants_key(queue), tenant)
+            pipe.sadd(QUEUES_KEY, queue)
+        pipe.execute()
+        self._wakeup.set()
+
+    # ---------- 释放（worker） ----------
+
+    def release(self, tenant: str, task_id: str):
+        self._client.zrem(inflight_key(tenant), task_id)
+
+    # ---------- 统计 ----------
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """各租户的待调度数、执行中数量与并发上限"""
+        now = time.time()
+        queues = [q.decode() for q in self._client.smembers(QUEUES_KEY)]
+        pipe = self._client.pipeline(transaction=False)
+        for queue in queues:
+            pipe.smembers(tenants_key(queue))
+        pairs = [(queue, t.decode()) for queue, tenants in zip(queues, pipe.execute()) for t in tenants]
+
+        tenants = sorted({tenant for _, tenant in pairs})
+        pipe = self._client.pipeline(transaction=False)
+        for queue, tenant in pairs:
+            pipe.zcard(pending_key(queue, tenant))
+        for tenant in tenants:
+            pipe.zcount(inflight_key(tenant), now, "+inf")
+        values = pipe.execute()
+
+        result = {tenant: {"pending": {}, "inflight": 0, "limit": self.limit(tenant), "weight": self.weight(tenant)}
+                  for tenant in tenants}
+        for (queue, tenant), count in zip(pairs, values):
+            if count:
+                result[tenant]["pending"][queue] = count
+        for tenant, count in zip(tenants, values[len(pairs):]):
+            result[tenant]["inflight"] = count
+        return result
+
+    # ---------- 调度（api 后台线程） ----------
+
+    def start(self, stop_event: threading.Event):
+        threading.Thread(target=self._run, args=(stop_event,), name="fair-scheduler", daemon=True).start()
+
+    def _run(self, stop_event: threading.Event):
+        while not stop_event.is_set():
+            dispatched = 0
+            try:
+                if self._is_leader():
+                    dispatched = self.dispatch()
+            except Exception as e:
+                logger.warning(f"[FairScheduler] Dispatch failed: {e}")
+            if not dispatched:
+                self._wakeup.wait(self.interval)
+                self._wakeup.clear()
+
+    def _is_leader(self) -> bool:
+        ttl = int(max(self.interval * 10, 5) * 1000)
+        if self._client.set(LEADER_KEY, self._token, nx=True, px=ttl):
+            return True
+        if self._client.get(LEADER_KEY) == self._token.encode():
+            self._client.pexpire(LEADER_KEY, ttl)
+            return True
+        return False
+
+    def dispatch(self) -> int:
+        """按队列剩余容量调度一轮，返回发送的任务数"""
+        queues = [q.decode() for q in self._client.smembers(QUEUES_KEY)]
+        if not queues:
+            return 0
+        dispatched = 0
+        for queue, depth in self._queue_stats.depths(queues).items():
+            budget = self.queue_depth - depth
+            if budget > 0:
+                dispatched += self._dispatch_queue(queue, budget)
+        return dispatched
+
+    def _dispatch_queue(self, queue: str, budget: int) -> int:
+        now = time.time()
+        tenants = [t.decode() for t in self._client.smembers(tenants_key(queue))]
+        if not tenants:
+            self._client.srem(QUEUES_KEY, queue)
+            return 0
+
+        pipe = self._client.pipeline(transaction=False)
+        for tenant in tenants:
+            pipe.zremrangebyscore(inflight_key(tenant), "-inf", now)
+            pipe.zcard(inflight_key(tenant))
+            pipe.zrange(pending_key(queue, tenant), 0, 0, withscores=True)
+        values = pipe.execute()
+
+        # 租户 -> [执行中数量, 队首分数]
+        heads: dict[str, list] = {}
+        for index, tenant in enumerate(tenants):
+            inflight, head = values[index * 3 + 1], values[index * 3 + 2]
+            if not head:
+                self._forget_tenant(queue, tenant)
+            else:
+                heads[tenant] = [inflight, head[0][1]]
+
+        dispatched = 0
+        while dispatched < budget:
+            eligible = [t for t, (inflight, _) in heads.items() if not self.limit(t) or inflight < self.limit(t)]
+            if not eligible:
+                break
+            # 先按优先级，同一优先级内选虚拟时间最小的租户
+            top = min(heads[t][1] // _PRIORITY_SCALE for t in eligible)
+            candidates = [t for t in eligible if heads[t][1] // _PRIORITY_SCALE == top]
+            tenant = min(candidates, key=lambda t: (max(self._passes.get(t, 0.0), self._vtime), t))
+            start = max(self._passes.get(tenant, 0.0), self._vtime)
+            self._passes[tenant] = start + 1 / self.weight(tenant)
+            self._vtime = start
+
+            if self._dispatch_one(queue, tenant):
+                dispatched += 1
+                heads[tenant][0] += 1
+            head = self._client.zrange(pending_key(queue, tenant), 0, 0, withscores=True)
+            if head:
+                heads[tenant][1] = head[0][1]
+            else:
+                heads.pop(tenant)
+        return dispatched
+
+    def _dispatch_one(self, queue: str, tenant: str) -> bool:
+        popped = self._client.zpopmin(pending_key(queue, tenant))
+        if not popped:
+            return False
+        task_id = popped[0][0].decode()
+        raw = self._client.hget(PAYLOAD_KEY, task_id)
+        if raw is None:
+            return False
+        payload = json.loads(raw)
+        options = payload["options"]
+        now = time.time()
+        if payload["expires"] and payload["expires"] <= now:
+            # 排队期间已过期：直接标记为 REVOKED，不发送也不占用并发
+            self._app.backend.mark_as_revoked(task_id, "expired")
+            self._client.hdel(PAYLOAD_KEY, task_id)
+            logger.info(f"[FairScheduler] Task {task_id} of tenant {tenant} expired before dispatch.")
+            return False
+        if payload["eta"]:
+            options["eta"] = datetime.fromtimestamp(payload["eta"], tz=timezone.utc)
+        if payload["expires"]:
+            options["expires"] = datetime.fromtimestamp(payload["expires"], tz=timezone.utc)
+        # 先占用再发送：执行很快的任务可能在发送返回前就已结束并调用 release()
+        lease = max(payload["eta"] or now, now) + (options.get("time_limit") or 3600) + self.lease_grace
+        self._client.zadd(inflight_key(tenant), {task_id: lease})
+        try:
+            self._app.send_task(payload["task"], kwargs=payload["kwargs"], task_id=task_id, **options)
+        except Exception:
+            # 发送失败时释放占用并放回待调度集合，下一轮重试
+            pipe = self._client.pipeline(transaction=False)
+            pipe.zrem(inflight_key(tenant), task_id)
+            pipe.zadd(pending_key(queue, tenant), {task_id: popped[0][1]})
+            pipe.execute()
+            raise
+        self._client.hdel(PAYLOAD_KEY, task_id)
+        return True
+
+    def _forget_tenant(self, queue: str, tenant: str):
+        """租户在该队列上已无待调度任务时移出集合（与提交并发时放弃，下一轮再处理）"""
+        with self._client.pipeline() as pipe:
+            try:
+                pipe.watch(pending_key(queue, tenant))
+                if pipe.zcard(pending_key(queue, tenant)) == 0:
+                    pipe.multi()
+                    pipe.srem(tenants_key(queue), tenant)
+                    pipe.execute()
+            except redis.WatchError:
+                pass
+
+
+def scheduler_from_env(celery_app: Celery) -> FairScheduler:
+    """
+    FAIR_TENANT_WEIGHTS: 租户权重（JSON），如 {"interactive": 4, "backfill": 1}，默认 1
+    FAIR_TENANT_CONCURRENCY: 租户并发上限（JSON），如 {"backfill": 2}
+    FAIR_DEFAULT_CONCURRENCY: 未单独配置的租户的并发上限，默认 0（不限制）
+    FAIR_QUEUE_DEPTH: 每个 broker 队列中最多等待的已调度任务数，默认 8
+    """
+    return FairScheduler(
+        celery_app,
+        weights=json.loads(os.getenv("FAIR_TENANT_WEIGHTS") or "{}"),
+        concurrency=json.loads(os.getenv("FAIR_TENANT_CONCURRENCY") or "{}"),
+        default_concurrency=int(os.getenv("FAIR_DEFAULT_CONCURRENCY") or 0),
+        queue_depth=int(os.getenv("FAIR_QUEUE_DEPTH") or 8),
+    )
@@ -0,0 +1,146 @@
+import logging
+import threading
+import time
+
+from docker import DockerClient
+from docker.errors import ImageNotFound
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """一次正在进行的镜像检查/拉取，其他等待同一镜像的任务共享它的结果"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error: BaseException | None = None
+        self.pulled: bool = False
+
+
+class ImageCache:
+    """
+    进程级的镜像存在性缓存
+    - 镜像确认存在后缓存 ttl 秒，期间不再请求 Docker
+    - 同一镜像的并发检查/拉取只执行一次（single-flight），其他任务等待并共享结果
+    - invalidate() 用于镜像被删除或容器创建时发现镜像不存在的场景
+    """
+
+    def __init__(self, client: DockerClient, ttl: float = 300):
+        self._client = client
+        self._ttl = ttl
+        # 镜像 -> 缓存过期时间
+        self._present: dict[str, float] = {}
+        # 镜像 -> 正在进行的检查/拉取
+        self._flights: dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def ensure(self, image: str) -> bool:
+        """
+        确保镜像在本地存在，返回本次调用是否触发了拉取
+        """
+        with self._lock:
+            if self._present.get(image, 0) > time.monotonic():
+                return False
+        return self._single_flight(image, force_pull=False)
+
+    def refresh(self, image: str) -> bool:
+        """强制拉取镜像（用于预热可变标签，如 latest）"""
+        return self._single_flight(image, force_pull=True)
+
+    def invalidate(self, image: str | None = None):
+        """清除缓存，image 为空时清除全部"""
+        with self._lock:
+            if image is None:
+                self._present.clear()
+            else:
+                self._present.pop(image, None)
+
+    def _single_flight(self, image: str, force_pull: bool) -> bool:
+        with self._lock:
+            flight = self._flights.get(image)
+            leader = flight is None
+            if leader:
+                flight = self._flights[image] = _Flight()
+
+        if not leader:
+            logger.info(f"Waiting for in-flight pull of image {image}.")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.pulled
+
+        try:
+            flight.pulled = self._check_or_pull(image, force_pull)
+            with self._lock:
+                self._present[image] = time.monotonic() + self._ttl
+            return flight.pulled
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(image, None)
+            flight.done.set()
+
+    def _check_or_pull(self, image: str, force_pull: bool) -> bool:
+        if not force_pull:
+            try:
+                self._client.images.get(image)
+                logger.info(f"Image {image} found locally.")
+                return False
+            except ImageNotFound:
+                logger.info(f"Image {image} not found locally. Pulling...")
+        self._client.images.pull(image)
+        logger.info(f"Image {image} pulled successfully.")
+        return True
+
+    def watch_events(self, stop_event: threading.Event):
+        """
+        监听 Docker 镜像事件，镜像被删除或取消标签时清空缓存
+        在后台线程中运行，连接断开后自动重连
+        """
+        while not stop_event.is_set():
+            try:
+                events = self._client.events(filters={"type": "image"}, decode=True)
+                for event in events:
+                    if stop_event.is_set():
+                        events.close()
+                        return
+                    if event.get("Action") in ("delete", "untag"):
+                        self.invalidate()
+            except Exception as e:
+                logger.warning(f"[ImageCache] Docker event stream interrupted: {e}")
+                stop_event.wait(5)
+
+
+class ImagePrefetcher:
+    """
+    后台线程：启动时预热热点镜像，之后每隔 interval 秒重新拉取一次，保持镜像为最新
+    interval <= 0 时只在启动时预热一次
+    """
+
+    def __init__(self, cache: ImageCache, images: list[str], interval: float = 300,
+                 stop_event: threading.Event | None = None):
+        self._cache = cache
+        self._images = images
+        self._interval = interval
+        self._stop_event = stop_event or threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, name="image-prefetcher", daemon=True).start()
+
+    def _run(self):
+        refresh = False
+        while not self._stop_event.is_set():
+            for image in self._images:
+                try:
+                    if refresh:
+                        self._cache.refresh(image)
+                    else:
+                        self._cache.ensure(image)
+                except Exception as e:
+                    logger.warning(f"[ImagePrefetcher] Failed to prefetch image {image}: {e}")
+            if self._interval <= 0:
+                return
+            refresh = True
+            self._stop_event.wait(self._interval)
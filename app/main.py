@@ -1,29 +1,67 @@
+import json
 import logging
+import os
+import threading
+import time
+import uuid
 from contextlib import asynccontextmanager
 from typing import Any, Dict, List
 
 import uvicorn
 from celery.result import AsyncResult
+from celery.states import READY_STATES
 from fastapi import FastAPI, Body, HTTPException, Query
-from kombu.exceptions import OperationalError
-from kombu.simple import SimpleQueue
+from redis.exceptions import RedisError
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import StreamingResponse
 
-from app.worker import app as celery_app, run_docker_task
-from app.workers_stats_monitor import start_worker_ping_monitor, stop_worker_ping_monitor, get_cached_workers
+from app.backend import get_task_metas
+from app.broker import BatchPublisher
+from app.callback import pop_dead_letters, read_dead_letters
+from app.dedup import task_fingerprint
+from app.fair_scheduler import parse_priority, priority_class
+from app.message_pipeline import message_queue_from_env
+from app.queue_stats import QueueStats
+from app.task_events import TaskEventSubscriber, make_task_event
+from app.worker import app as celery_app, run_docker_task, run_code_task, deliver_callback, callback_queue, fair_scheduler, \
+    task_dedup
+from app.workers_stats_monitor import start_worker_registry, stop_worker_registry, get_cached_workers
+
+
+# 后台线程的停止信号
+_STOP_EVENT = threading.Event()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # 启动时运行监控线程
-    start_worker_ping_monitor(interval=30, timeout=10.0)
+    # 启动时运行 worker 注册表（消费 Celery 事件）
+    start_worker_registry()
+    # 多租户任务的调度线程
+    fair_scheduler.start(_STOP_EVENT)
     yield
-    # 关闭时停止监控线程
-    stop_worker_ping_monitor()
+    # 关闭时停止
+    stop_worker_registry()
+    _STOP_EVENT.set()
 
 
 app = FastAPI(title="分布式任务接口文档", lifespan=lifespan)
 
+# 批量消息管道
+message_queue = message_queue_from_env(celery_app.conf.broker_url)
+# 单次请求的最大消息数
+MAX_MESSAGES = 10000
+
+# 队列深度查询（带短时缓存）
+queue_stats = QueueStats(celery_app, ttl=float(os.getenv('QUEUE_STATS_TTL', 2)))
+
+# 任务状态订阅（SSE）的最长连接时间，以及剩余任务一直为 PENDING 时的关闭等待时间（秒）
+TASK_STREAM_MAX_DURATION = float(os.getenv('TASK_STREAM_MAX_DURATION', 3600))
+TASK_STREAM_PENDING_TIMEOUT = float(os.getenv('TASK_STREAM_PENDING_TIMEOUT', 300))
+
+# 批量提交任务时合并发送到 broker
+batch_publisher = BatchPublisher(celery_app)
+
 # 日志配置，建议你根据生产环境实际需要调整
 logging.basicConfig(
     format='%(asctime)s %(levelname)s %(name)s %(message)s',
@@ -43,65 +81,226 @@ def get_parameter(data: dict):
     return max_retries, retry_delay, queue, countdown, expires, callback
 
 
-# 添加任务
-@app.post("/api/run_docker_task", tags=["run_docker_task"])
-def run_docker(data: dict = Body(..., example={
-    "image": "python:3.13-slim",
-    "command": ["python", "-c", "print('Hello'); print('===result-data==='); print(123);print('===result-data===');"],
-    "container_kwargs": {
-        "shm_size": "2g",
-        "ports": {
-            "7900/tcp": None  # 这里是外部映射的端口，null为随机，7900 为固定的
-        },
-    },
-    "proxy_url": None,  # 代理的地址 http://proxy.xx.com/ip.txt
-    "queue": "celery",
-    "max_retries": 1,
-    "retry_delay": 5,
-    "countdown": 1,  # 延迟执行
-    "expires": 60 * 60 * 2,
-    "max_execution_time": 60 * 60 * 1,  # 最大执行时间
-    "callback": None  # 回调的地址，注意必须是一个post请求
-})):
+# 构建 docker 任务的参数与投递选项，参数不合法时抛出 HTTPException
+def make_docker_task(data: dict) -> tuple[dict, dict]:
     image = data.get('image')
     command = data.get('command')
     container_kwargs: dict[str, Any] = data.get('container_kwargs', {})  # 容器的其他参数
-    proxy_url: str | None = data.get('proxy_url', None)  # 代理服务器地址
+    proxy_url: str | None = data.get('proxy_url', None)  # 代理服务器地址（旧参数，建议使用 proxy_pool）
+    proxy_pool: str | None = data.get('proxy_pool', None)  # worker 上配置的代理池名称
     max_execution_time: int | None = data.get('max_execution_time', 3600)  # 最大执行时间
+    tenant: str | None = data.get('tenant', None)  # 租户，设置后由公平调度器按租户权重与并发上限发送
 
     # 提取通用参数
     max_retries, retry_delay, queue, countdown, expires, callback = get_parameter(data)
 
     logger.info(
         f"image={image}, command={command}, container_kwargs={container_kwargs}, "
-        f"proxy_url={proxy_url}, max_execution_time={max_execution_time}, "
+        f"proxy_url={proxy_url}, proxy_pool={proxy_pool}, max_execution_time={max_execution_time}, "
         f"max_retries={max_retries}, retry_delay={retry_delay}, queue={queue}, "
-        f"countdown={countdown}, expires={expires}, callback={callback}"
+        f"countdown={countdown}, expires={expires}, callback={callback}, "
+        f"priority={data.get('priority')}, tenant={tenant}"
     )
 
     if not image or not command:
         raise HTTPException(status_code=400, detail="缺少镜像或命令参数")
+    try:
+        priority = parse_priority(data.get('priority'))  # 优先级 high / normal / low 或 0-9（0 最高）
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if tenant is not None and (not isinstance(tenant, str) or not tenant):
+        raise HTTPException(status_code=400, detail="tenant 必须是非空字符串")
 
-    task = run_docker_task.apply_async(kwargs={
+    # 消息头：提交时间与优先级用于统计等待时间，租户用于释放并发占用
+    headers = {"submitted_at": time.time(), "priority_class": priority_class(priority)}
+    if tenant:
+        headers["tenant"] = tenant
+
+    kwargs = {
         "image": image,
         "command": command,
         "container_kwargs": container_kwargs,
         "proxy_url": proxy_url,
+        "proxy_pool": proxy_pool,
         "max_retries": max_retries,
         "retry_delay": retry_delay,
         "max_execution_time": max_execution_time,
         "callback": callback
+    }
+    options = {
+        "retry": True,
+        "max_retries": max_retries,
+        "queue": queue,  # 队列名
+        "countdown": countdown,
+        "expires": expires,
+        "time_limit": max_execution_time,
+        "priority": priority,
+        "headers": headers
+    }
+    return kwargs, options
+
+
+# 去重（dedup=true 时）：命中已完成或执行中的相同任务时返回响应，否则预分配任务 id 并登记为执行中
+def deduplicate(data: dict, kwargs: dict, options: dict) -> dict | None:
+    if not data.get('dedup'):
+        return None
+    # 可接受的已完成结果的最长时间（秒），0 表示只合并执行中的任务
+    max_result_age = data.get('max_result_age', task_dedup.result_ttl)
+    if isinstance(max_result_age, bool) or not isinstance(max_result_age, (int, float)) or max_result_age < 0:
+        raise HTTPException(status_code=400, detail="max_result_age 必须是非负数")
+
+    fingerprint = task_fingerprint(kwargs["image"], kwargs["command"], kwargs["container_kwargs"])
+    callback = kwargs["callback"]
+    if max_result_age:
+        cached_id = task_dedup.lookup_result(fingerprint, min(max_result_age, task_dedup.result_ttl))
+        if cached_id is not None:
+            meta = celery_app.backend.get_task_meta(cached_id)
+            # 结果已从结果后端过期时按未命中处理
+            if meta.get("status") == "SUCCESS":
+                if callback:
+                    deliver_callback.apply_async(args=(callback, cached_id),
+                                                 queue=callback_queue or "celery")
+                return {"task_id": cached_id, "deduplicated": "result"}
+
+    task_id = str(uuid.uuid4())
+    # 执行中标记的有效期覆盖排队与执行的最长时间
+    lease = int((options.get("countdown") or 0) + (options.get("expires") or 0) + (options.get("time_limit") or 0)) + 60
+    existing_id = task_dedup.claim(fingerprint, task_id, lease, callback)
+    if existing_id is not None:
+        return {"task_id": existing_id, "deduplicated": "inflight"}
+    options["task_id"] = task_id
+    options["headers"]["dedup_key"] = fingerprint
+    return None
+
+
+# 任务发送失败时释放去重标记，避免后续相同任务合并到未发送的任务上
+def release_dedup(options: dict):
+    if "dedup_key" in options["headers"]:
+        try:
+            task_dedup.complete(options["headers"]["dedup_key"], options["task_id"], False)
+        except Exception as e:
+            logger.warning(f"Failed to release dedup entry {options['task_id']}: {e}")
+
+
+# 设置了租户的任务交给公平调度器，返回任务 id
+def submit_fair_tasks(tasks: list[tuple[dict, dict]]) -> list[str]:
+    task_ids = [options.get("task_id") or str(uuid.uuid4()) for _, options in tasks]
+    fair_scheduler.submit_many([
+        (run_docker_task.name, task_id, kwargs, {k: v for k, v in options.items() if k != "task_id"},
+         options["headers"]["tenant"], options["priority"])
+        for task_id, (kwargs, options) in zip(task_ids, tasks)
+    ])
+    return task_ids
+
+
+# 添加任务
+@app.post("/api/run_docker_task", tags=["run_docker_task"])
+def run_docker(data: dict = Body(..., example={
+    "image": "python:3.13-slim",
+    "command": ["python", "-c", "print('Hello'); print('===result-data==='); print(123);print('===result-data===');"],
+    "container_kwargs": {
+        "shm_size": "2g",
+        "ports": {
+            "7900/tcp": None  # 这里是外部映射的端口，null为随机，7900 为固定的
+        },
     },
-        retry=True,
-        max_retries=max_retries,
-        queue=queue,  # 队列名
-        countdown=countdown,
-        expires=expires,
-        time_limit=max_execution_time
-    )
+    "proxy_url": None,  # 代理的地址 http://proxy.xx.com/ip.txt（旧参数）
+    "proxy_pool": None,  # 代理池名称，对应 worker 的 PROXY_POOLS 配置
+    "queue": "celery",
+    "priority": "normal",  # 优先级 high / normal / low
+    "tenant": None,  # 租户，设置后按租户权重与并发上限公平调度
+    "dedup": False,  # 相同镜像、命令与容器参数的任务合并执行，并复用已完成的结果
+    "max_result_age": 600,  # dedup 时可接受的已完成结果的最长时间（秒），0 表示只合并执行中的任务
+    "max_retries": 1,
+    "retry_delay": 5,
+    "countdown": 1,  # 延迟执行
+    "expires": 60 * 60 * 2,
+    "max_execution_time": 60 * 60 * 1,  # 最大执行时间
+    "callback": None  # 回调的地址，注意必须是一个post请求
+})):
+    kwargs, options = make_docker_task(data)
+    duplicate = deduplicate(data, kwargs, options)
+    if duplicate is not None:
+        return duplicate
+    try:
+        if "tenant" in options["headers"]:
+            return {"task_id": submit_fair_tasks([(kwargs, options)])[0]}
+        task = run_docker_task.apply_async(kwargs=kwargs, **options)
+    except Exception:
+        release_dedup(options)
+        raise
     return {"task_id": task.id}
 
 
+# 批量添加任务
+@app.post("/api/run_docker_task/batch", tags=["run_docker_task"])
+def run_docker_batch(data: dict = Body(..., example={
+    "tasks": [
+        {
+            "image": "python:3.13-slim",
+            "command": ["python", "-c", "print('===result-data==='); print(1);print('===result-data===');"],
+            "queue": "celery"
+        },
+        {
+            "image": "python:3.13-slim",
+            "command": ["python", "-c", "print('===result-data==='); print(2);print('===result-data===');"],
+            "queue": "celery"
+        }
+    ],
+    "batch_size": 500  # 每批合并发送到 broker 的任务数
+})):
+    """
+    一次提交多个任务：先整体校验，再分批合并发送到 broker
+    返回的 items 与 tasks 顺序一致，每项为 {"task_id": ...} 或 {"error": ...}，单项失败不影响其他任务
+    """
+    tasks: list[dict] = data.get('tasks') or []
+    batch_size: int = max(int(data.get('batch_size', 500)), 1)
+    if not isinstance(tasks, list) or not tasks:
+        raise HTTPException(status_code=400, detail="任务列表不能为空")
+
+    items: list[dict[str, Any]] = [{} for _ in tasks]
+    valid: list[tuple[int, dict, dict]] = []
+    fair: list[tuple[int, dict, dict]] = []
+    for index, spec in enumerate(tasks):
+        try:
+            if not isinstance(spec, dict):
+                raise HTTPException(status_code=400, detail="任务参数必须是对象")
+            kwargs, options = make_docker_task(spec)
+            duplicate = deduplicate(spec, kwargs, options)
+            if duplicate is not None:
+                items[index] = duplicate
+                continue
+            (fair if "tenant" in options["headers"] else valid).append((index, kwargs, options))
+        except HTTPException as e:
+            items[index] = {"error": e.detail}
+
+    for offset in range(0, len(fair), batch_size):
+        chunk = fair[offset:offset + batch_size]
+        try:
+            task_ids = submit_fair_tasks([(kwargs, options) for _, kwargs, options in chunk])
+            for (index, _, _), task_id in zip(chunk, task_ids):
+                items[index] = {"task_id": task_id}
+        except Exception as e:
+            logger.error(f"Failed to submit batch to fair scheduler: {e}")
+            for index, _, options in chunk:
+                release_dedup(options)
+                items[index] = {"error": f"Broker unavailable: {e}"}
+
+    for offset in range(0, len(valid), batch_size):
+        chunk = valid[offset:offset + batch_size]
+        try:
+            task_ids = batch_publisher.publish(run_docker_task.name, [(kwargs, options) for _, kwargs, options in chunk])
+            for (index, _, _), task_id in zip(chunk, task_ids):
+                items[index] = {"task_id": task_id}
+        except Exception as e:
+            logger.error(f"Failed to publish batch: {e}")
+            for index, _, options in chunk:
+                release_dedup(options)
+                items[index] = {"error": f"Broker unavailable: {e}"}
+
+    return {"items": items}
+
+
 @app.post("/api/run_code_task", tags=["run_code_task"])
 def run_code(data: dict = Body(..., example={
     "code": "print('Hello'); print('===result-data==='); print(1+1);print('===result-data===');",
@@ -110,30 +309,106 @@ def run_code(data: dict = Body(..., example={
     "retry_delay": 5,
     "countdown": 1,  # 延迟执行
     "expires": 60 * 60 * 2,
+    "timeout": 30,  # 单次执行的超时秒数，默认为 worker 的 CODE_SANDBOX_TIMEOUT
     "callback": None  # 回调的地址，注意必须是一个post请求
 })):
     code = data.get('code', None)
     if not code:
         raise HTTPException(status_code=500, detail="代码不能为空")
+    timeout: float | None = data.get('timeout', None)
+    try:
+        priority = parse_priority(data.get('priority'))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # 提取通用参数
+    max_retries, retry_delay, queue, countdown, expires, callback = get_parameter(data)
+
+    task = run_code_task.apply_async(
+        kwargs={
+            "code": code,
+            "max_retries": max_retries,
+            "retry_delay": retry_delay,
+            "callback": callback,
+            "timeout": timeout
+        },
+        retry=True,
+        max_retries=max_retries,
+        queue=queue,
+        countdown=countdown,
+        expires=expires,
+        priority=priority,
+        headers={"submitted_at": time.time(), "priority_class": priority_class(priority)}
+    )
+    return {"task_id": task.id}
+
+
+# 未配置的处理器没有 worker 消费，写入的消息会一直停留在 Stream 中
+def check_message_handler(handler: str):
+    if handler not in message_queue.handlers:
+        raise HTTPException(status_code=400, detail=f"未知的消息处理器 {handler}，"
+                                                    f"可用：{', '.join(sorted(message_queue.handlers))}")
 
 
 @app.post("/api/process_message", tags=["process_message"])
 def process_message(data: dict = Body(..., example={
+    "handler": "echo",  # worker 上注册的消息处理器
     "message_content": {
         "code": 1,
         "msg": "1111"
     },
-    "queue": "celery",
-    "max_retries": 1,
-    "retry_delay": 5,
-    "countdown": 1,  # 延迟执行
-    "expires": 60 * 60 * 2,
-    "callback": None  # 回调的地址，注意必须是一个post请求
+    "messages": None  # 一次提交多条消息时使用，与 message_content 二选一
 })):
+    """
+    消息写入处理器对应的 Redis Stream，不为每条消息创建 Celery 任务
+    worker 按批读取并交给处理器，结果通过 /api/process_message/results 查询
+    """
+    handler: str = data.get('handler') or 'echo'
+    check_message_handler(handler)
+    # 消息不再作为 Celery 任务执行，不支持回调与指定队列，避免调用方以为会收到回调
+    unsupported = [field for field in ('callback', 'queue') if data.get(field)]
+    if unsupported:
+        raise HTTPException(status_code=400, detail=f"不支持 {', '.join(unsupported)}，"
+                                                    f"结果通过 /api/process_message/results 查询")
     # 消息内容
     message_content = data.get('message_content', None)
-    if not message_content:
-        raise HTTPException(status_code=500, detail="消息内容不能为空")
+    messages = data.get('messages', None)
+    if messages is None:
+        if not message_content:
+            raise HTTPException(status_code=500, detail="消息内容不能为空")
+        messages = [message_content]
+    if not isinstance(messages, list) or not messages:
+        raise HTTPException(status_code=400, detail="messages 必须是非空数组")
+    if len(messages) > MAX_MESSAGES:
+        raise HTTPException(status_code=400, detail=f"单次最多提交 {MAX_MESSAGES} 条消息")
+    try:
+        message_ids = message_queue.enqueue(handler, messages)
+    except RedisError as e:
+        raise HTTPException(status_code=503, detail=f"Broker unavailable: {e}")
+    return {"handler": handler, "message_ids": message_ids}
+
+
+@app.post("/api/process_message/results", tags=["process_message"])
+def process_message_results(data: dict = Body(..., example={
+    "handler": "echo",
+    "message_ids": ["1718000000000-0"]
+})):
+    """每项的 status 为 done（result 中包含 success 与 result/error）或 pending"""
+    handler: str = data.get('handler') or 'echo'
+    check_message_handler(handler)
+    message_ids: list[str] = data.get('message_ids') or []
+    if not isinstance(message_ids, list) or not message_ids:
+        raise HTTPException(status_code=400, detail="message_ids 不能为空")
+    if len(message_ids) > MAX_MESSAGES:
+        raise HTTPException(status_code=400, detail=f"单次最多查询 {MAX_MESSAGES} 条消息")
+    try:
+        results = message_queue.results(handler, message_ids)
+    except RedisError as e:
+        raise HTTPException(status_code=503, detail=f"Broker unavailable: {e}")
+    return {"items": [
+        {"message_id": message_id, "status": "pending" if result is None else "done", "result": result}
+        for message_id, result in zip(message_ids, results)
+    ]}
 
 
 # 查询任务状态
@@ -147,6 +422,132 @@ def get_task_status(task_id: str):
     }
 
 
+# 批量查询任务状态时单次请求的最大任务数
+MAX_STATUS_TASK_IDS = 5000
+# 批量查询任务状态可返回的字段
+TASK_STATUS_FIELDS = ("status", "result", "date_done", "traceback")
+
+
+# 批量查询任务状态
+@app.post("/api/tasks/status", tags=["task"])
+def get_tasks_status(data: dict = Body(..., example={
+    "task_ids": ["5937c7e7-425f-4452-bff7-a234fca14973", "4eade758-6ea8-465c-9a46-ff59d84c5bc7"],
+    "fields": ["status"]  # 只返回需要的字段，可选 status、result、date_done、traceback，默认 status、result
+})):
+    task_ids: list[str] = data.get('task_ids') or []
+    fields: list[str] = data.get('fields') or ["status", "result"]
+    if not isinstance(task_ids, list) or not task_ids:
+        raise HTTPException(status_code=400, detail="任务id不能为空")
+    if len(task_ids) > MAX_STATUS_TASK_IDS:
+        raise HTTPException(status_code=400, detail=f"单次最多查询 {MAX_STATUS_TASK_IDS} 个任务")
+    unknown = [f for f in fields if f not in TASK_STATUS_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"不支持的字段: {unknown}")
+
+    items = []
+    for task_id, meta in zip(task_ids, get_task_metas(celery_app, task_ids)):
+        item: dict[str, Any] = {"task_id": task_id}
+        status = meta.get("status")
+        for field in fields:
+            if field == "status":
+                item["status"] = status
+            elif field == "result":
+                result = meta.get("result") if status in READY_STATES else None
+                item["result"] = str(result) if isinstance(result, BaseException) else result
+            else:
+                item[field] = meta.get(field)
+        items.append(item)
+    return {"items": items}
+
+
+# 订阅任务状态变化（Server-Sent Events）
+@app.get(
+    "/api/tasks/stream",
+    tags=["task"],
+    summary="订阅任务状态变化",
+    description=(
+            "以 SSE 推送任务的状态变化与结果，数据来自 worker 发布的 Redis pub/sub 事件。\n"
+            "订阅 task_ids 时，已结束的任务立即推送当前状态，全部任务结束后关闭连接；"
+            "订阅 queues 时持续推送该队列上所有任务的状态变化。\n"
+            "连接最长保持 TASK_STREAM_MAX_DURATION 秒；仅订阅任务时，剩余任务在 TASK_STREAM_PENDING_TIMEOUT 秒内"
+            "没有事件且仍为 PENDING（id 不存在、已撤销或过期）则关闭。关闭前推送 "
+            "{\"event\": \"end\", \"reason\": ..., \"pending\": [...]}，reason 为 completed / max_duration / pending_timeout。"
+    )
+)
+async def stream_tasks(
+        task_ids: List[str] = Query(default=[], description="要订阅的任务id"),
+        queues: List[str] = Query(default=[], description="要订阅的队列名")
+):
+    if not task_ids and not queues:
+        raise HTTPException(status_code=400, detail="任务id与队列名不能同时为空")
+    if len(task_ids) > MAX_STATUS_TASK_IDS:
+        raise HTTPException(status_code=400, detail=f"单次最多订阅 {MAX_STATUS_TASK_IDS} 个任务")
+
+    def _sse(event: dict) -> str:
+        return f"data: {json.dumps(event, default=str, ensure_ascii=False)}\n\n"
+
+    def _end(reason: str, pending: set[str]) -> str:
+        # 关闭前的最后一个事件，pending 为仍未结束的任务
+        return _sse({"event": "end", "reason": reason, "pending": sorted(pending)})
+
+    async def _events():
+        requested = set(task_ids)
+        pending = set(task_ids)
+        # 同时订阅任务与其所在队列时同一事件会收到两次，按时间戳去重
+        last_seen: dict[str, float] = {}
+        started = time.monotonic()
+        # 最近一次收到所订阅任务事件的时间
+        last_progress = started
+        async with TaskEventSubscriber(celery_app.conf.result_backend, task_ids, queues) as subscriber:
+            # 订阅完成后再读取当前状态，避免遗漏期间发生的变化
+            if task_ids:
+                metas = await run_in_threadpool(get_task_metas, celery_app, task_ids)
+                for task_id, meta in zip(task_ids, metas):
+                    if meta.get("status") in READY_STATES:
+                        pending.discard(task_id)
+                        yield _sse(make_task_event(task_id, meta["status"], result=meta.get("result")))
+                if not pending and not queues:
+                    yield _end("completed", pending)
+                    return
+
+            async for event in subscriber.events():
+                now = time.monotonic()
+                if now - started > TASK_STREAM_MAX_DURATION:
+                    yield _end("max_duration", pending)
+                    return
+                if event is None:
+                    if pending and not queues and now - last_progress > TASK_STREAM_PENDING_TIMEOUT:
+                        # 长时间没有事件：重新读取状态，剩余任务都仍为 PENDING（id 不存在或已撤销）时关闭连接
+                        metas = await run_in_threadpool(get_task_metas, celery_app, sorted(pending))
+                        for task_id, meta in zip(sorted(pending), metas):
+                            if meta.get("status") in READY_STATES:
+                                pending.discard(task_id)
+                                yield _sse(make_task_event(task_id, meta["status"], result=meta.get("result")))
+                        if not pending:
+                            yield _end("completed", pending)
+                            return
+                        if all(meta.get("status") == "PENDING" for meta in metas):
+                            yield _end("pending_timeout", pending)
+                            return
+                        last_progress = now
+                    yield ": keepalive\n\n"
+                    continue
+                task_id = event.get("task_id")
+                if task_id in requested:
+                    last_progress = now
+                    if last_seen.get(task_id) == event.get("timestamp"):
+                        continue
+                    last_seen[task_id] = event.get("timestamp")
+                yield _sse(event)
+                if task_id in pending and event.get("status") in READY_STATES:
+                    pending.discard(task_id)
+                    if not pending and not queues:
+                        yield _end("completed", pending)
+                        return
+
+    return StreamingResponse(_events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
 # 删除任务（逻辑删除：Redis无法真正取消任务）
 @app.delete("/api/task/{task_id}", tags=["task"])
 def delete_task(task_id: str):
@@ -157,30 +558,47 @@ def delete_task(task_id: str):
     return {"msg": "任务结果已清除", "task_id": task_id}
 
 
+# 查询投递失败的回调
+@app.get("/api/callback/dead_letters", tags=["callback"])
+def get_dead_letters(start: int = Query(default=0, ge=0), count: int = Query(default=100, ge=1, le=1000)):
+    return {"items": read_dead_letters(celery_app.backend.client, start=start, count=count)}
+
+
+# 重新投递失败的回调（从最早的开始）
+@app.post("/api/callback/dead_letters/replay", tags=["callback"])
+def replay_dead_letters(data: dict = Body(..., example={"count": 100})):
+    count = max(int(data.get('count', 100)), 1)
+    items = pop_dead_letters(celery_app.backend.client, count=count)
+    for item in items:
+        deliver_callback.apply_async(args=(item["callback"], item["task_id"], item["payload"]),
+                                     queue=callback_queue or "celery")
+    return {"count": len(items)}
+
+
 # 查询任务队列
-@app.get("/api/count/task", tags=["count"])
+@app.get(
+    "/api/count/task",
+    tags=["count"],
+    summary="查询队列中等待的任务数",
+    description=(
+            "直接对 broker 的 Redis 执行 LLEN（含各优先级子队列），结果缓存 QUEUE_STATS_TTL 秒并在并发请求间共享。\n"
+            "detail=true 时额外返回根据相邻两次采样计算的入队/出队速率（条/秒）。"
+    )
+)
 def count_tasks(
         queue_names: List[str] = Query(
             default=["celery"],
             description="要查询的队列名数组，默认只查 'celery'"
-        )
-) -> Dict[str, int]:
-    results: Dict[str, int] = {}
+        ),
+        detail: bool = Query(default=False, description="是否返回入队/出队速率")
+) -> Dict[str, Any]:
     try:
-        with celery_app.connection_or_acquire() as conn:
-            for name in queue_names:
-                q = None
-                try:
-                    q = SimpleQueue(conn, name, queue_opts={"durable": True})
-                    results[name] = q.qsize()
-                except Exception as e:
-                    print(e)
-                finally:
-                    if q is not None:
-                        q.close()
-        return results
-    except OperationalError as e:
+        stats = queue_stats.get(queue_names)
+    except RedisError as e:
         raise HTTPException(status_code=503, detail=f"Broker unavailable: {e}")
+    if detail:
+        return stats
+    return {name: item["depth"] for name, item in stats.items()}
 
 
 @app.get(
@@ -188,14 +606,30 @@ def count_tasks(
     tags=["count"],
     summary="查询在线的 Celery workers 数量",
     description=(
-            "通过 `celery_app.control.ping` 以广播方式探测在线 worker，统计可响应的 worker 数量。\n"
-            "仅统计当前可达（在给定超时内回复）的 worker；不可达/超时不计入。"
+            "由 Celery 事件（worker 上下线、心跳与任务事件）维护的 worker 注册表，无需广播 ping。\n"
+            "仅统计最近心跳未过期的 worker，details 中包含在执行任务数、消费队列、负载与最后心跳时间。"
     )
 )
 def count_workers():
     return get_cached_workers()
 
 
+@app.get(
+    "/api/count/tenants",
+    tags=["count"],
+    summary="查询各租户的待调度与执行中任务数",
+    description=(
+            "仅列出有待调度任务的租户。pending 为各队列中等待公平调度器发送的任务数，"
+            "inflight 为已发送且未结束的任务数，limit 为并发上限（0 不限制）。"
+    )
+)
+def count_tenants():
+    try:
+        return fair_scheduler.stats()
+    except RedisError as e:
+        raise HTTPException(status_code=503, detail=f"Broker unavailable: {e}")
+
+
 if __name__ == '__main__':
     # 跨域支持
     app.add_middleware(
@@ -0,0 +1,339 @@
+import importlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Callable
+
+import redis
+from docker import DockerClient
+from docker.utils.socket import STDOUT, frames_iter
+
+logger = logging.getLogger(__name__)
+
+# 每个处理器一个 Redis Stream，worker 以消费组方式分批读取
+STREAM_PREFIX = "tasker:messages"
+CONSUMER_GROUP = "tasker"
+# 消息的处理结果（json），按处理器与消息 id 保存
+RESULT_PREFIX = "tasker:message-result"
+# 每个 Stream 保留的大约消息数，没有 worker 消费时不会无限增长
+DEFAULT_STREAM_MAX_LEN = 100000
+
+MessageHandler = Callable[[list[Any]], list[Any]]
+
+# 处理器名称 -> 处理函数（接收一批消息，返回等长的结果列表）
+_HANDLERS: dict[str, MessageHandler] = {}
+
+
+def stream_key(handler: str) -> str:
+    return f"{STREAM_PREFIX}:{handler}"
+
+
+def result_key(handler: str, message_id: str) -> str:
+    return f"{RESULT_PREFIX}:{handler}:{message_id}"
+
+
+def message_handler(name: str):
+    """
+    注册 Python 处理器
+        @message_handler("sum")
+        def handle(messages: list) -> list:
+            return [sum(m["values"]) for m in messages]
+    """
+
+    def _register(func: MessageHandler) -> MessageHandler:
+        _HANDLERS[name] = func
+        return func
+
+    return _register
+
+
+def get_handler(name: str) -> MessageHandler | None:
+    return _HANDLERS.get(name)
+
+
+@message_handler("echo")
+def echo_handler(messages: list[Any]) -> list[Any]:
+    """原样返回消息，用于测试链路"""
+    return messages
+
+
+class ContainerHandler:
+    """
+    由一个常驻容器处理消息
+    每批消息以一行 JSON 数组写入容器的 stdin，容器在 stdout 输出一行等长的 JSON 数组作为结果
+    容器退出或输出不合法时重建容器
+    """
+
+    def __init__(self, client: DockerClient, name: str, image: str, command: list[str] | str | None = None,
+                 container_kwargs: dict[str, Any] | None = None, timeout: float = 60):
+        self._client = client
+        self.name = name
+        self.image = image
+        self.command = command
+        self.container_kwargs = container_kwargs or {}
+        self.timeout = timeout
+        self._container = None
+        self._socket = None
+        self._frames = None
+        self._buffer = b""
+        # 同一容器同时只处理一批消息
+        self._lock = threading.Lock()
+
+    def __call__(self, messages: list[Any]) -> list[Any]:
+        with self._lock:
+            if self._container is None:
+                self._start()
+            try:
+                self._write(json.dumps(messages, default=str).encode("utf-8") + b"\n")
+                results = json.loads(self._read_line())
+            except Exception:
+                self.stop()
+                raise
+            if not isinstance(results, list) or len(results) != len(messages):
+                self.stop()
+                raise ValueError(f"Handler container {self.name} returned {type(results).__name__} "
+                                 f"instead of {len(messages)} results")
+            return results
+
+    def _start(self):
+        self._container = self._client.containers.run(
+            self.image, self.command, stdin_open=True, detach=True, **self.container_kwargs)
+        self._socket = self._container.attach_socket(params={"stdin": 1, "stdout": 1, "stream": 1})
+        self._raw_socket().settimeout(self.timeout)
+        self._frames = frames_iter(self._socket, tty=False)
+        self._buffer = b""
+        logger.info(f"[MessagePipeline] Started handler container {self._container.short_id} for {self.name}.")
+
+    def _raw_socket(self) -> socket.socket:
+        return getattr(self._socket, "_sock", self._socket)
+
+    def _write(self, data: bytes):
+        self._raw_socket().sendall(data)
+
+    def _read_line(self) -> bytes:
+        while b"\n" not in self._buffer:
+            stream, data = next(self._frames)
+            if stream == STDOUT:
+                self._buffer += data
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return line
+
+    def stop(self):
+        container, self._container = self._container, None
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except Exception:
+                pass
+            self._socket = None
+        if container is not None:
+            try:
+                container.remove(force=True)
+            except Exception as e:
+                logger.warning(f"[MessagePipeline] Failed to remove handler container: {e}")
+
+
+class MessageQueue:
+    """
+    api 侧：批量写入消息与读取结果，每次请求一个 pipeline
+    handlers 为已配置的处理器名称，写入前由调用方检查；每个 Stream 按 MAXLEN ~ max_len 裁剪
+    """
+
+    def __init__(self, url: str, handlers: set[str] | None = None, max_len: int = DEFAULT_STREAM_MAX_LEN):
+        self._client = redis.Redis.from_url(url)
+        self.handlers = handlers if handlers is not None else set(_HANDLERS)
+        self.max_len = max_len
+
+    def enqueue(self, handler: str, messages: list[Any]) -> list[str]:
+        pipe = self._client.pipeline(transaction=False)
+        for message in messages:
+            pipe.xadd(stream_key(handler), {"data": json.dumps(message, default=str)},
+                      maxlen=self.max_len, approximate=True)
+        return [message_id.decode() for message_id in pipe.execute()]
+
+    def results(self, handler: str, message_ids: list[str]) -> list[Any | None]:
+        """未处理完的消息返回 None"""
+        if not message_ids:
+            return []
+        values = self._client.mget([result_key(handler, message_id) for message_id in message_ids])
+        return [json.loads(value) if value is not None else None for value in values]
+
+
+class MessageConsumer:
+    """
+    worker 侧：从处理器的 Stream 中按批读取消息
+    - 一批最多 batch_size 条，或自第一条到达起最多等待 linger 秒
+    - 整批交给处理器，结果用一个 pipeline 批量写回，并确认、删除已处理的消息
+    - 消费者崩溃后未确认的消息在 claim_idle 秒后由其他消费者接管，投递超过 max_deliveries 次记为失败
+    """
+
+    def __init__(self,
+                 url: str,
+                 name: str,
+                 handler: MessageHandler,
+                 batch_size: int = 100,
+                 linger: float = 0.05,
+                 result_ttl: int = 3600,
+                 claim_idle: float = 300,
+                 max_deliveries: int = 3):
+        self._client = redis.Redis.from_url(url)
+        self.name = name
+        self.handler = handler
+        self.batch_size = batch_size
+        self.linger = linger
+        self.result_ttl = result_ttl
+        self.claim_idle = claim_idle
+        self.max_deliveries = max_deliveries
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._last_claim = 0.0
+
+    def start(self, stop_event: threading.Event):
+        threading.Thread(target=self._run, args=(stop_event,), name=f"message-consumer-{self.name}",
+                         daemon=True).start()
+
+    def _run(self, stop_event: threading.Event):
+        self._ensure_group()
+        while not stop_event.is_set():
+            try:
+                batch = self._claim_stale() or self._next_batch()
+                if batch:
+                    self._process(batch)
+            except Exception as e:
+                logger.warning(f"[MessagePipeline] Consumer {self.name} failed: {e}")
+                stop_event.wait(3)
+        if isinstance(self.handler, ContainerHandler):
+            self.handler.stop()
+
+    def _ensure_group(self):
+        try:
+            self._client.xgroup_create(stream_key(self.name), CONSUMER_GROUP, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def _next_batch(self) -> list[tuple[bytes, dict]]:
+        key = stream_key(self.name)
+        batch = []
+        # 阻塞等待第一条消息，之后在 linger 时间内继续凑满一批
+        deadline = None
+        while len(batch) < self.batch_size:
+            if deadline is None:
+                block = 1000
+            else:
+                block = int((deadline - time.monotonic()) * 1000)
+                if block <= 0:
+                    break
+            response = self._client.xreadgroup(CONSUMER_GROUP, self.consumer, {key: ">"},
+                                               count=self.batch_size - len(batch), block=block)
+            if not response:
+                break
+            batch.extend(response[0][1])
+            if deadline is None:
+                deadline = time.monotonic() + self.linger
+        return batch
+
+    def _claim_stale(self) -> list[tuple[bytes, dict]]:
+        """接管其他消费者长时间未确认的消息"""
+        if time.monotonic() - self._last_claim < self.claim_idle / 2:
+            return []
+        self._last_claim = time.monotonic()
+        key = stream_key(self.name)
+        _, claimed, *_ = self._client.xautoclaim(key, CONSUMER_GROUP, self.consumer,
+                                                 min_idle_time=int(self.claim_idle * 1000), count=self.batch_size)
+        claimed = [(message_id, fields) for message_id, fields in claimed if fields]
+        if not claimed:
+            return []
+        # 投递次数过多的消息记为失败；按 id 逐条精确查询本消费者的待确认记录，范围查询会混入其他消费者的消息
+        pipe = self._client.pipeline(transaction=False)
+        for message_id, _ in claimed:
+            pipe.xpending_range(key, CONSUMER_GROUP, min=message_id, max=message_id, count=1,
+                                consumername=self.consumer)
+        deliveries = {p["message_id"]: p["times_delivered"] for pending in pipe.execute() for p in pending}
+        batch, failed = [], []
+        for message_id, fields in claimed:
+            if deliveries.get(message_id, 0) > self.max_deliveries:
+                failed.append(message_id)
+            else:
+                batch.append((message_id, fields))
+        if failed:
+            self._write_back(failed, [{"success": False, "error": "消息处理失败次数过多"}] * len(failed))
+        logger.info(f"[MessagePipeline] Claimed {len(claimed)} stale messages for {self.name}.")
+        return batch
+
+    def _process(self, batch: list[tuple[bytes, dict]]):
+        message_ids = [message_id for message_id, _ in batch]
+        try:
+            messages = [json.loads(fields[b"data"]) for _, fields in batch]
+            results = self.handler(messages)
+            if len(results) != len(messages):
+                raise ValueError(f"Handler {self.name} returned {len(results)} results for {len(messages)} messages")
+            outcomes = [{"success": True, "result": result} for result in results]
+        except Exception as e:
+            logger.warning(f"[MessagePipeline] Handler {self.name} failed on {len(batch)} messages: {e}")
+            outcomes = [{"success": False, "error": str(e)}] * len(batch)
+        self._write_back(message_ids, outcomes)
+
+    def _write_back(self, message_ids: list[bytes], outcomes: list[dict]):
+        key = stream_key(self.name)
+        pipe = self._client.pipeline(transaction=False)
+        for message_id, outcome in zip(message_ids, outcomes):
+            pipe.set(result_key(self.name, message_id.decode()), json.dumps(outcome, default=str), ex=self.result_ttl)
+        pipe.xack(key, CONSUMER_GROUP, *message_ids)
+        pipe.xdel(key, *message_ids)
+        pipe.execute()
+
+
+def _import_handler_modules():
+    for module in filter(None, (m.strip() for m in os.getenv("MESSAGE_HANDLER_MODULES", "").split(","))):
+        importlib.import_module(module)
+
+
+def _container_handler_configs() -> dict[str, dict]:
+    return json.loads(os.getenv("MESSAGE_CONTAINER_HANDLERS") or "{}")
+
+
+def message_queue_from_env(url: str) -> MessageQueue:
+    """
+    api 侧：与 worker 读取相同的 MESSAGE_HANDLER_MODULES / MESSAGE_CONTAINER_HANDLERS，得到已配置的处理器名称
+    MESSAGE_STREAM_MAX_LEN: 每个处理器的 Stream 保留的大约消息数，默认 100000
+    """
+    _import_handler_modules()
+    handlers = set(_HANDLERS) | set(_container_handler_configs())
+    return MessageQueue(url, handlers, max_len=int(os.getenv("MESSAGE_STREAM_MAX_LEN") or DEFAULT_STREAM_MAX_LEN))
+
+
+def consumers_from_env(url: str, docker_client: DockerClient) -> list[MessageConsumer]:
+    """
+    MESSAGE_HANDLER_MODULES: 启动时导入的模块（逗号分隔），模块中用 @message_handler 注册处理器
+    MESSAGE_CONTAINER_HANDLERS: 由常驻容器处理的处理器（JSON），如
+        {"nlp": {"image": "nlp:1.0", "command": ["python", "serve.py"], "container_kwargs": {}}}
+    MESSAGE_HANDLERS: 本 worker 消费的处理器（逗号分隔），默认全部
+    MESSAGE_BATCH_SIZE / MESSAGE_BATCH_LINGER: 每批最多条数（默认 100）/ 凑批最长等待秒数（默认 0.05）
+    MESSAGE_CONSUMERS: 每个处理器的消费线程数，默认 1
+    MESSAGE_RESULT_TTL: 结果保存秒数，默认 3600
+    """
+    _import_handler_modules()
+    for name, config in _container_handler_configs().items():
+        _HANDLERS[name] = ContainerHandler(docker_client, name, **config)
+
+    enabled = [h.strip() for h in os.getenv("MESSAGE_HANDLERS", "").split(",") if h.strip()] or list(_HANDLERS)
+    consumers = []
+    for name in enabled:
+        handler = get_handler(name)
+        if handler is None:
+            logger.warning(f"[MessagePipeline] Unknown message handler {name}.")
+            continue
+        # 容器处理器同一时间只处理一批，只用一个消费线程
+        count = 1 if isinstance(handler, ContainerHandler) else int(os.getenv("MESSAGE_CONSUMERS") or 1)
+        for _ in range(count):
+            consumers.append(MessageConsumer(
+                url, name, handler,
+                batch_size=int(os.getenv("MESSAGE_BATCH_SIZE") or 100),
+                linger=float(os.getenv("MESSAGE_BATCH_LINGER") or 0.05),
+                result_ttl=int(os.getenv("MESSAGE_RESULT_TTL") or 3600),
+            ))
+    return consumers
@@ -0,0 +1,131 @@
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+# run_docker_task 的各个阶段
+PHASES = (
+    "image_check",  # 确认镜像在本地存在（命中缓存或 images.get）
+    "image_pull",  # 本地不存在时拉取镜像
+    "proxy_fetch",  # 请求代理地址
+    "budget_wait",  # 等待资源预算
+    "container_create",
+    "container_start",
+    "wait",  # 等待容器运行结束（预热容器为 exec 执行时间）
+    "log_fetch",  # 读取容器日志
+    "result_parse",  # 解析结果
+    "container_remove",
+    "callback",  # 投递回调
+)
+
+# 耗时直方图的分桶（秒），覆盖毫秒级的缓存命中到小时级的长任务
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+# 字节数直方图的分桶，1KB ~ 256MB
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(10))
+
+
+class TaskMetrics:
+    """
+    worker 内部的 Prometheus 指标
+    - tasker_task_phase_seconds{task,phase}: 各阶段耗时
+    - tasker_container_exit_total{task,code}: 容器退出码
+    - tasker_task_log_bytes{task} / tasker_task_result_bytes{task}: 日志与结果大小
+    - tasker_task_wait_seconds{task,priority}: 从提交到开始执行的等待时间（按优先级）
+    - tasker_container_memory_peak_bytes{task} / tasker_container_cpu_seconds{task}: 容器的内存峰值与 CPU 时间
+    - tasker_worker_concurrency_limit: 自适应并发控制当前的并发上限
+    - tasker_proxy_unavailable_total{task,pool}: 代理池中没有可用代理、任务本次尝试失败的次数
+    未安装 prometheus_client 时所有方法为空操作
+    """
+
+    def __init__(self):
+        self.enabled = prometheus_client is not None
+        if not self.enabled:
+            return
+        self._phase_seconds = prometheus_client.Histogram(
+            "tasker_task_phase_seconds", "Time spent in each phase of a task",
+            ["task", "phase"], buckets=SECONDS_BUCKETS)
+        self._exit_codes = prometheus_client.Counter(
+            "tasker_container_exit", "Container exit codes",
+            ["task", "code"])
+        self._log_bytes = prometheus_client.Histogram(
+            "tasker_task_log_bytes", "Bytes of container output per task",
+            ["task"], buckets=BYTES_BUCKETS)
+        self._result_bytes = prometheus_client.Histogram(
+            "tasker_task_result_bytes", "Bytes of parsed result per task",
+            ["task"], buckets=BYTES_BUCKETS)
+        self._wait_seconds = prometheus_client.Histogram(
+            "tasker_task_wait_seconds", "Time from submission to start of a task",
+            ["task", "priority"], buckets=SECONDS_BUCKETS)
+        self._memory_peak = prometheus_client.Histogram(
+            "tasker_container_memory_peak_bytes", "Peak memory usage of task containers",
+            ["task"], buckets=BYTES_BUCKETS)
+        self._cpu_seconds = prometheus_client.Histogram(
+            "tasker_container_cpu_seconds", "CPU time used by task containers",
+            ["task"], buckets=SECONDS_BUCKETS)
+        self._concurrency_limit = prometheus_client.Gauge(
+            "tasker_worker_concurrency_limit", "Concurrency limit set by adaptive concurrency control")
+        self._proxy_unavailable = prometheus_client.Counter(
+            "tasker_proxy_unavailable", "Task attempts failed because a proxy pool had no proxy",
+            ["task", "pool"])
+
+    def observe_phase(self, task: str, phase: str, seconds: float):
+        if self.enabled:
+            self._phase_seconds.labels(task, phase).observe(seconds)
+
+    @contextmanager
+    def phase(self, task: str, phase: str):
+        """记录代码块的耗时（异常时同样记录）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_phase(task, phase, time.perf_counter() - start)
+
+    def exit_code(self, task: str, code: int | None):
+        if self.enabled:
+            self._exit_codes.labels(task, str(code)).inc()
+
+    def log_bytes(self, task: str, size: int):
+        if self.enabled:
+            self._log_bytes.labels(task).observe(size)
+
+    def result_bytes(self, task: str, size: int):
+        if self.enabled:
+            self._result_bytes.labels(task).observe(size)
+
+    def wait_time(self, task: str, priority: str, seconds: float):
+        if self.enabled:
+            self._wait_seconds.labels(task, priority).observe(max(seconds, 0))
+
+    def container_usage(self, task: str, usage: dict | None):
+        if self.enabled and usage and usage.get("samples"):
+            self._memory_peak.labels(task).observe(usage["memory_peak"])
+            self._cpu_seconds.labels(task).observe(usage["cpu_seconds"])
+
+    def concurrency_limit(self, value: int):
+        if self.enabled:
+            self._concurrency_limit.set(value)
+
+    def proxy_unavailable(self, task: str, pool: str):
+        if self.enabled:
+            self._proxy_unavailable.labels(task, pool).inc()
+
+    def start_server(self, port: int):
+        """启动 /metrics HTTP 服务（后台线程）"""
+        if not self.enabled:
+            logger.warning("prometheus_client is not installed, worker metrics are disabled.")
+            return
+        try:
+            prometheus_client.start_http_server(port)
+            logger.info(f"Worker metrics listening on :{port}/metrics")
+        except OSError as e:
+            logger.warning(f"Failed to start metrics server on port {port}: {e}")
+
+
+task_metrics = TaskMetrics()
@@ -0,0 +1,302 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class ProxyUnavailable(Exception):
+    """代理池在等待时间内没有可用的代理"""
+
+
+class Proxy:
+    """池中的一个代理及其统计数据"""
+
+    def __init__(self, address: str, expires_at: float):
+        self.address = address
+        self.expires_at = expires_at
+        self.successes = 0
+        self.failures = 0
+        # 连续失败次数，超过阈值后移出代理池
+        self.consecutive_failures = 0
+        # 延迟的指数移动平均（秒），None 表示尚未测量
+        self.latency: float | None = None
+        self.last_used = 0.0
+        self.checked = False
+
+    @property
+    def env(self) -> dict[str, str]:
+        url = self.address if "://" in self.address else f"http://{self.address}"
+        return {"HTTP_PROXY": url, "HTTPS_PROXY": url}
+
+    def weight(self) -> float:
+        """成功率越高、延迟越低权重越大（无数据时按 50% 成功率、1 秒延迟估算）"""
+        success_rate = (self.successes + 1) / (self.successes + self.failures + 2)
+        return success_rate / max(self.latency if self.latency is not None else 1.0, 0.05)
+
+    def snapshot(self) -> dict:
+        return {
+            "address": self.address,
+            "successes": self.successes,
+            "failures": self.failures,
+            "latency": self.latency,
+            "last_used": self.last_used,
+            "checked": self.checked,
+        }
+
+
+class ProxyPool:
+    """
+    代理池
+    - 后台线程从一个或多个代理列表地址批量预取代理（每行一个 ip:port），池中代理少于 min_size 时补充
+    - 新代理及存量代理在线程池中并发做健康检查，连续失败 max_failures 次或超过 ttl 秒的代理被移除
+    - 任务结束后通过 report() 反馈结果与延迟
+    - 按最久未使用（lru）或按成功率/延迟加权随机（weighted）分配代理
+    """
+
+    def __init__(self,
+                 name: str,
+                 sources: list[str],
+                 min_size: int = 10,
+                 max_size: int = 100,
+                 strategy: str = "lru",
+                 ttl: float = 300,
+                 check_url: str | None = None,
+                 check_timeout: float = 5,
+                 check_interval: float = 60,
+                 check_concurrency: int = 16,
+                 max_failures: int = 3,
+                 fetch_timeout: float = 10,
+                 refill_interval: float = 5):
+        if strategy not in ("lru", "weighted"):
+            raise ValueError(f"Unknown proxy pool strategy: {strategy}")
+        self.name = name
+        self.sources = sources
+        self.min_size = min_size
+        self.max_size = max_size
+        self.strategy = strategy
+        self.ttl = ttl
+        self.check_url = check_url
+        self.check_timeout = check_timeout
+        self.check_interval = check_interval
+        self.max_failures = max_failures
+        self.fetch_timeout = fetch_timeout
+        self.refill_interval = refill_interval
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=check_concurrency, pool_maxsize=check_concurrency)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._checker = ThreadPoolExecutor(max_workers=check_concurrency, thread_name_prefix=f"proxy-check-{name}")
+
+        # 地址 -> 代理
+        self._proxies: dict[str, Proxy] = {}
+        self._lock = threading.Lock()
+        self._refill = threading.Event()
+        self._last_check = 0.0
+        self._last_fetch = 0.0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._proxies)
+
+    def acquire(self, wait: float = 10) -> Proxy | None:
+        """
+        分配一个代理，池为空时唤醒预取线程并最多等待 wait 秒
+        池仍为空时返回 None（任务不使用代理运行）
+        """
+        deadline = time.monotonic() + wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                candidates = [p for p in self._proxies.values() if p.checked and p.expires_at > now]
+                if len(candidates) < self.min_size:
+                    self._refill.set()
+                if candidates:
+                    if self.strategy == "weighted":
+                        proxy = random.choices(candidates, weights=[p.weight() for p in candidates])[0]
+                    else:
+                        proxy = min(candidates, key=lambda p: p.last_used)
+                    proxy.last_used = now
+                    return proxy
+            if now >= deadline:
+                logger.warning(f"[ProxyPool {self.name}] No proxy available.")
+                return None
+            time.sleep(min(0.2, deadline - now))
+
+    def report(self, address: str, success: bool, latency: float | None = None):
+        """反馈代理的使用结果与耗时（秒），连续失败过多的代理移出代理池"""
+        with self._lock:
+            proxy = self._proxies.get(address)
+            if proxy is None:
+                return
+            self._record(proxy, success, latency)
+
+    def _record(self, proxy: Proxy, success: bool, latency: float | None):
+        # 调用方持有 self._lock
+        if success:
+            proxy.successes += 1
+            proxy.consecutive_failures = 0
+            if latency is not None:
+                proxy.latency = latency if proxy.latency is None else proxy.latency * 0.7 + latency * 0.3
+        else:
+            proxy.failures += 1
+            proxy.consecutive_failures += 1
+            if proxy.consecutive_failures >= self.max_failures:
+                self._proxies.pop(proxy.address, None)
+                logger.info(f"[ProxyPool {self.name}] Removed proxy {proxy.address} after "
+                            f"{proxy.consecutive_failures} consecutive failures.")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._proxies),
+                "strategy": self.strategy,
+                "proxies": [p.snapshot() for p in self._proxies.values()],
+            }
+
+    def start(self, stop_event: threading.Event):
+        threading.Thread(target=self._run, args=(stop_event,), name=f"proxy-pool-{self.name}", daemon=True).start()
+
+    def _run(self, stop_event: threading.Event):
+        while not stop_event.is_set():
+            try:
+                self._expire()
+                size = len(self)
+                # 池为空时尽快补充，否则两次预取至少间隔 refill_interval 秒
+                interval = 1 if size == 0 else self.refill_interval
+                if size < self.min_size and time.monotonic() - self._last_fetch >= interval:
+                    self._last_fetch = time.monotonic()
+                    self._fetch()
+                if self.check_url and time.monotonic() - self._last_check >= self.check_interval:
+                    self._last_check = time.monotonic()
+                    self._check([p for p in self._snapshot() if p.checked])
+            except Exception as e:
+                logger.warning(f"[ProxyPool {self.name}] Maintenance failed: {e}")
+            self._refill.wait(self.refill_interval)
+            self._refill.clear()
+            stop_event.wait(0.1)
+
+    def _snapshot(self) -> list[Proxy]:
+        with self._lock:
+            return list(self._proxies.values())
+
+    def _expire(self):
+        now = time.monotonic()
+        with self._lock:
+            for address in [a for a, p in self._proxies.items() if p.expires_at <= now]:
+                del self._proxies[address]
+
+    def _fetch(self):
+        """从代理列表地址批量预取代理"""
+        added = []
+        for source in self.sources:
+            try:
+                resp = self._session.get(source, timeout=self.fetch_timeout)
+                resp.raise_for_status()
+            except Exception as e:
+                logger.warning(f"[ProxyPool {self.name}] Failed to fetch proxies from {source}: {e}")
+                continue
+            expires_at = time.monotonic() + self.ttl
+            with self._lock:
+                for line in resp.text.splitlines():
+                    address = line.strip()
+                    if not address or address in self._proxies or len(self._proxies) >= self.max_size:
+                        continue
+                    proxy = self._proxies[address] = Proxy(address, expires_at)
+                    # 未配置健康检查时直接视为可用
+                    proxy.checked = not self.check_url
+                    added.append(proxy)
+            if len(self) >= self.min_size:
+                break
+        if added:
+            logger.info(f"[ProxyPool {self.name}] Fetched {len(added)} proxies, pool size {len(self)}.")
+            if self.check_url:
+                self._check(added)
+
+    def _check(self, proxies: list[Proxy]):
+        """并发检查代理可用性并测量延迟，新代理在检查通过后才会被分配"""
+        if not proxies:
+            return
+        for proxy, (success, latency) in zip(proxies, self._checker.map(self._probe, proxies)):
+            with self._lock:
+                if proxy.address not in self._proxies:
+                    continue
+                if not success and not proxy.checked:
+                    # 首次检查失败的新代理直接丢弃
+                    del self._proxies[proxy.address]
+                    continue
+                proxy.checked = True
+                self._record(proxy, success, latency)
+
+    def _probe(self, proxy: Proxy) -> tuple[bool, float | None]:
+        url = proxy.env["HTTP_PROXY"]
+        started = time.perf_counter()
+        try:
+            resp = self._session.get(self.check_url, proxies={"http": url, "https": url}, timeout=self.check_timeout)
+            return resp.ok, time.perf_counter() - started
+        except Exception:
+            return False, None
+
+
+class ProxyPools:
+    """
+    按名称管理多个代理池，任务通过 proxy_pool 参数引用命名代理池
+    """
+
+    def __init__(self, configs: dict[str, dict], defaults: dict | None = None):
+        self._defaults = defaults or {}
+        self._pools = {name: ProxyPool(name, **{**self._defaults, **config}) for name, config in configs.items()}
+
+    def __bool__(self):
+        return bool(self._pools)
+
+    def get(self, name: str) -> ProxyPool | None:
+        return self._pools.get(name)
+
+    def start(self, stop_event: threading.Event):
+        for pool in self._pools.values():
+            pool.start(stop_event)
+
+    def stats(self) -> dict:
+        return {name: pool.stats() for name, pool in self._pools.items()}
+
+
+def fetch_proxy(url: str, timeout: float = 10) -> Proxy | None:
+    """
+    旧的 proxy_url 参数：每个任务从该地址取一个代理，不进入代理池
+    代理服务按次分配 IP，共享或后台预取会让多个任务使用同一个 IP
+    """
+    try:
+        resp = requests.get(url, timeout=timeout)
+        resp.raise_for_status()
+    except Exception as e:
+        logger.warning(f"Failed to fetch proxy from {url}: {e}")
+        return None
+    address = resp.text.strip()
+    if not address:
+        logger.warning(f"Proxy address from {url} is empty.")
+        return None
+    return Proxy(address, float("inf"))
+
+
+def proxy_pools_from_env() -> ProxyPools:
+    """
+    PROXY_POOLS: 命名代理池（JSON），如
+        {"default": {"sources": ["http://proxy.xx.com/ip.txt"], "min_size": 20, "strategy": "weighted"}}
+    PROXY_CHECK_URL: 健康检查地址，为空时不做健康检查
+    PROXY_TTL: 代理的有效期（秒），默认 300
+    """
+    configs = json.loads(os.getenv("PROXY_POOLS") or "{}")
+    defaults = {
+        "ttl": float(os.getenv("PROXY_TTL", 300)),
+        "check_url": os.getenv("PROXY_CHECK_URL") or None,
+    }
+    return ProxyPools(configs, defaults)
@@ -0,0 +1,138 @@
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Any
+
+import redis
+from celery import Celery
+
+logger = logging.getLogger(__name__)
+
+# 队列累计入队/出队数，用于计算速率
+COUNTER_KEY_PREFIX = "tasker:queue-stats"
+
+# kombu Redis transport 的默认优先级配置
+DEFAULT_PRIORITY_STEPS = [0, 3, 6, 9]
+DEFAULT_PRIORITY_SEP = "\x06\x16"
+
+
+def counter_key(kind: str, queue: str) -> str:
+    return f"{COUNTER_KEY_PREFIX}:{kind}:{queue}"
+
+
+class QueueCounters:
+    """
+    进程内累计入队/出队数，由后台线程每隔 interval 秒批量写入 Redis
+    避免每次发布或执行任务都多一次 Redis 往返
+    """
+
+    def __init__(self, url: str, interval: float = 1.0):
+        self._url = url
+        self._interval = interval
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def incr(self, kind: str, queue: str, amount: int = 1):
+        with self._lock:
+            self._counts[(kind, queue)] += amount
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="queue-counters", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        client = redis.Redis.from_url(self._url)
+        while True:
+            time.sleep(self._interval)
+            with self._lock:
+                counts, self._counts = self._counts, Counter()
+            if not counts:
+                continue
+            try:
+                pipe = client.pipeline(transaction=False)
+                for (kind, queue), amount in counts.items():
+                    pipe.incrby(counter_key(kind, queue), amount)
+                pipe.execute()
+            except Exception as e:
+                logger.warning(f"[QueueCounters] Failed to flush counters: {e}")
+                with self._lock:
+                    self._counts.update(counts)
+
+
+class QueueStats:
+    """
+    队列深度查询
+    - 直接对 broker 的 Redis 执行 LLEN（含各优先级子队列），一个 pipeline 完成，不声明队列
+    - 结果缓存 ttl 秒，并发请求共享同一次查询
+    - 根据相邻两次采样的累计入队/出队数计算速率（条/秒）
+    """
+
+    def __init__(self, celery_app: Celery, ttl: float = 2.0):
+        self._client = redis.Redis.from_url(celery_app.conf.broker_url)
+        options = celery_app.conf.broker_transport_options or {}
+        self._priority_steps = options.get("priority_steps", DEFAULT_PRIORITY_STEPS)
+        self._sep = options.get("sep", DEFAULT_PRIORITY_SEP)
+        self._prefix = options.get("global_keyprefix", "")
+        self._ttl = ttl
+        # 队列 -> 最近一次采样
+        self._samples: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _queue_keys(self, queue: str) -> list[str]:
+        return [self._prefix + (queue if pri == 0 else f"{queue}{self._sep}{pri}") for pri in self._priority_steps]
+
+    def depths(self, queues: list[str]) -> dict[str, int]:
+        """不经缓存直接读取队列深度"""
+        pipe = self._client.pipeline(transaction=False)
+        for queue in queues:
+            for key in self._queue_keys(queue):
+                pipe.llen(key)
+        values = pipe.execute()
+        width = len(self._priority_steps)
+        return {queue: sum(values[index * width:(index + 1) * width]) for index, queue in enumerate(queues)}
+
+    def get(self, queues: list[str]) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            now = time.monotonic()
+            stale = [q for q in dict.fromkeys(queues)
+                     if q not in self._samples or now - self._samples[q]["sampled_at"] > self._ttl]
+            if stale:
+                self._refresh(stale)
+            return {q: self._view(self._samples[q]) for q in queues}
+
+    def _refresh(self, queues: list[str]):
+        pipe = self._client.pipeline(transaction=False)
+        for queue in queues:
+            for key in self._queue_keys(queue):
+                pipe.llen(key)
+            pipe.get(counter_key("enqueued", queue))
+            pipe.get(counter_key("dequeued", queue))
+        values = pipe.execute()
+        now = time.monotonic()
+
+        width = len(self._priority_steps) + 2
+        for index, queue in enumerate(queues):
+            row = values[index * width:(index + 1) * width]
+            sample = {
+                "depth": sum(row[:-2]),
+                "enqueued": int(row[-2] or 0),
+                "dequeued": int(row[-1] or 0),
+                "sampled_at": now,
+                "enqueue_rate": None,
+                "dequeue_rate": None,
+            }
+            previous = self._samples.get(queue)
+            if previous is not None and now > previous["sampled_at"]:
+                elapsed = now - previous["sampled_at"]
+                sample["enqueue_rate"] = max(sample["enqueued"] - previous["enqueued"], 0) / elapsed
+                sample["dequeue_rate"] = max(sample["dequeued"] - previous["dequeued"], 0) / elapsed
+            self._samples[queue] = sample
+
+    @staticmethod
+    def _view(sample: dict[str, Any]) -> dict[str, Any]:
+        return {
+            "depth": sample["depth"],
+            "enqueue_rate": sample["enqueue_rate"],
+            "dequeue_rate": sample["dequeue_rate"],
+        }
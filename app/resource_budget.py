@@ -0,0 +1,119 @@
+import logging
+import os
+import threading
+
+from docker.utils import parse_bytes
+
+logger = logging.getLogger(__name__)
+
+
+def host_memory_bytes() -> int:
+    """读取宿主机内存总量，读取失败返回 0（不限制）"""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def requested_resources(container_kwargs: dict, default_cpus: float, default_memory: int) -> tuple[float, int]:
+    """
+    根据容器参数估算任务占用的 CPU 核数与内存字节数
+    支持 nano_cpus、cpu_quota/cpu_period、mem_limit，未指定时使用默认值
+    """
+    cpus = default_cpus
+    if container_kwargs.get("nano_cpus"):
+        cpus = int(container_kwargs["nano_cpus"]) / 1e9
+    elif container_kwargs.get("cpu_quota") and container_kwargs.get("cpu_period"):
+        cpus = int(container_kwargs["cpu_quota"]) / int(container_kwargs["cpu_period"])
+
+    memory = default_memory
+    if container_kwargs.get("mem_limit"):
+        memory = parse_bytes(container_kwargs["mem_limit"])
+    return cpus, memory
+
+
+class ResourceBudget:
+    """
+    单个 worker 进程内并发任务的资源预算
+    每个任务启动容器前按申请的 CPU/内存占用预算，预算不足时阻塞等待其他任务释放
+    cpus / memory 为 0 表示不限制该项；limit 为同时运行的任务数上限（0 不限制，可由自适应并发控制动态调整）
+    """
+
+    def __init__(self, cpus: float = 0, memory: int = 0):
+        self.cpus: float = cpus
+        self.memory: int = memory
+        self._used_cpus: float = 0
+        self._used_memory: int = 0
+        self._running: int = 0
+        self.limit: int = 0
+        self._cond = threading.Condition()
+
+    def _clamp(self, cpus: float, memory: int) -> tuple[float, int]:
+        # 单个任务申请超过总预算时按总预算计算，避免永远无法获得资源
+        if self.cpus > 0:
+            cpus = min(cpus, self.cpus)
+        if self.memory > 0:
+            memory = min(memory, self.memory)
+        return cpus, memory
+
+    def _fits(self, cpus: float, memory: int) -> bool:
+        if self._running == 0:
+            return True
+        if self.limit > 0 and self._running >= self.limit:
+            return False
+        if self.cpus > 0 and self._used_cpus + cpus > self.cpus:
+            return False
+        if self.memory > 0 and self._used_memory + memory > self.memory:
+            return False
+        return True
+
+    def acquire(self, cpus: float, memory: int, timeout: float | None = None) -> bool:
+        cpus, memory = self._clamp(cpus, memory)
+        with self._cond:
+            if not self._fits(cpus, memory):
+                logger.info(f"Waiting for resource budget: cpus={cpus}, memory={memory}, {self.usage()}")
+            if not self._cond.wait_for(lambda: self._fits(cpus, memory), timeout=timeout):
+                return False
+            self._used_cpus += cpus
+            self._used_memory += memory
+            self._running += 1
+            return True
+
+    def release(self, cpus: float, memory: int):
+        cpus, memory = self._clamp(cpus, memory)
+        with self._cond:
+            self._used_cpus -= cpus
+            self._used_memory -= memory
+            self._running -= 1
+            self._cond.notify_all()
+
+    def set_limit(self, limit: int):
+        """调整并发上限，已运行的任务不受影响，调低后新任务等待运行数降到上限以下"""
+        with self._cond:
+            self.limit = limit
+            self._cond.notify_all()
+
+    def usage(self) -> dict:
+        return {
+            "running": self._running,
+            "limit": self.limit,
+            "cpus": self._used_cpus,
+            "cpus_budget": self.cpus,
+            "memory": self._used_memory,
+            "memory_budget": self.memory,
+        }
+
+
+def budget_from_env() -> ResourceBudget:
+    """
+    WORKER_CPU_BUDGET: 可用的 CPU 核数，默认宿主机核数
+    WORKER_MEMORY_BUDGET: 可用的内存，如 8g，默认宿主机内存总量
+    预算按 worker 进程计算，同一宿主机运行多个副本时需按副本数拆分
+    """
+    cpus = float(os.getenv("WORKER_CPU_BUDGET") or os.cpu_count() or 0)
+    memory = os.getenv("WORKER_MEMORY_BUDGET") or None
+    return ResourceBudget(cpus=cpus, memory=parse_bytes(memory) if memory else host_memory_bytes())
@@ -0,0 +1,150 @@
+import codecs
+import logging
+
+logger = logging.getLogger(__name__)
+
+result_data_word: str = "===result-data==="
+
+
+def _blank(line: bytes | bytearray) -> bool:
+    """解码后判断是否为空行，与 result() 中 str.strip() 的判断一致（含全角空格等 Unicode 空白）"""
+    return not line.decode("utf-8", errors="replace").strip()
+
+
+class ResultParser:
+    """
+    增量解析容器输出中的 ===result-data=== 数据块。
+    按字节块喂入日志，只保留已提取的数据块与有限长度的尾部日志，内存占用与输出总量无关。
+    单个数据块超过 max_block_size 时截断；最后一行非空输出只保留一行，且最多 max_line_size 字节。
+    """
+
+    def __init__(self,
+                 marker: str = result_data_word,
+                 tail_size: int = 64 * 1024,
+                 max_block_size: int = 64 * 1024 * 1024,
+                 max_line_size: int = 64 * 1024):
+        self._marker: bytes = marker.encode("utf-8")
+        self._tail_size: int = tail_size
+        self._max_block_size: int = max_block_size
+        # 没有换行的超长日志行只保留前 max_line_size 字节
+        self._max_line_size: int = max_line_size
+
+        # 尚未确认是否为标记一部分的字节（标记可能跨越两个 chunk）
+        self._pending: bytes = b""
+        # 当前打开的数据块，None 表示不在数据块内
+        self._block: bytearray | None = None
+        # 已闭合的非空数据块
+        self.blocks: list[str] = []
+        # 已闭合的数据块数量（包括空数据块）
+        self.block_count: int = 0
+        # 是否有数据块因超过上限被截断
+        self.truncated: bool = False
+        # 当前未结束的一行，以及最后一行非空输出
+        self._line: bytearray = bytearray()
+        self._last_line: bytes = b""
+        # 最近的日志输出
+        self._tail: bytearray = bytearray()
+        # 输出的总字节数
+        self.total_bytes: int = 0
+
+    def feed(self, chunk: bytes):
+        if not chunk:
+            return
+        self.total_bytes += len(chunk)
+        self._append_tail(chunk)
+        self._track_last_line(chunk)
+
+        data = self._pending + chunk if self._pending else chunk
+        marker_len = len(self._marker)
+        start = 0
+        while True:
+            idx = data.find(self._marker, start)
+            if idx < 0:
+                break
+            self._consume(data, start, idx)
+            self._toggle()
+            start = idx + marker_len
+
+        # 保留末尾不足一个标记长度的字节，等待下一个 chunk
+        end = max(start, len(data) - marker_len + 1)
+        self._consume(data, start, end)
+        self._pending = bytes(data[end:])
+
+    def close(self):
+        """输出结束，未闭合的数据块直接丢弃"""
+        if self._pending:
+            self._consume(self._pending, 0, len(self._pending))
+            self._pending = b""
+        self._block = None
+        if not _blank(self._line):
+            self._last_line = bytes(self._line)
+        self._line = bytearray()
+
+    def tail(self) -> str:
+        """返回最近的日志输出"""
+        return codecs.decode(bytes(self._tail[-self._tail_size:]), "utf-8", errors="replace")
+
+    def result(self) -> str:
+        """与 get_execute_result 的语义一致：优先返回数据块，否则返回最后一行非空输出"""
+        if self.block_count:
+            return "\n\n".join(self.blocks)
+        for line in reversed(self._last_line.decode("utf-8", errors="replace").splitlines()):
+            if line.strip():
+                return line.strip()
+        return ""
+
+    def _consume(self, data: bytes, start: int, end: int):
+        if self._block is None or end <= start:
+            return
+        room = self._max_block_size - len(self._block)
+        if end - start > room:
+            if not self.truncated:
+                logger.warning(f"Result block exceeds {self._max_block_size} bytes, truncated.")
+            self.truncated = True
+            end = start + max(room, 0)
+        if end > start:
+            self._block += data[start:end]
+
+    def _toggle(self):
+        if self._block is None:
+            self._block = bytearray()
+            return
+        self.block_count += 1
+        text = self._block.decode("utf-8", errors="replace").strip()
+        if text:
+            self.blocks.append(text)
+        self._block = None
+
+    def _track_last_line(self, chunk: bytes):
+        nl = chunk.rfind(b"\n")
+        if nl < 0:
+            self._append_line(chunk)
+            return
+        # 从后往前找到本 chunk 内最后一行非空内容
+        end = nl
+        while True:
+            start = chunk.rfind(b"\n", 0, end) + 1
+            if start == 0:
+                self._append_line(chunk[:end])
+                if not _blank(self._line):
+                    self._last_line = bytes(self._line)
+                break
+            if not _blank(chunk[start:end]):
+                self._last_line = chunk[start:min(end, start + self._max_line_size)]
+                break
+            end = start - 1
+        self._line = bytearray()
+        self._append_line(chunk[nl + 1:])
+
+    def _append_line(self, data: bytes):
+        room = self._max_line_size - len(self._line)
+        if room > 0:
+            self._line += data[:room]
+
+    def _append_tail(self, chunk: bytes):
+        if self._tail_size <= 0:
+            return
+        self._tail += chunk[-self._tail_size:]
+        # 超过两倍时再截断，避免每个 chunk 都移动内存
+        if len(self._tail) > self._tail_size * 2:
+            del self._tail[:-self._tail_size]
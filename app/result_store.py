@@ -0,0 +1,157 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+import zlib
+from typing import Any
+
+import msgpack
+from kombu.serialization import register
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+# 结果序列化器名称，celery_config 中 result_serializer 设置为该名称即可启用
+SERIALIZER_NAME = "tasker"
+CONTENT_TYPE = "application/x-tasker-result"
+
+# 存储格式的首字节
+FORMAT_RAW = b"M"  # msgpack
+FORMAT_ZSTD = b"Z"  # zstd 压缩的 msgpack
+FORMAT_LZ4 = b"L"  # lz4 压缩的 msgpack
+FORMAT_ZLIB = b"G"  # zlib 压缩的 msgpack（未安装 zstd/lz4 时使用）
+
+# 卸载到文件的结果在 Redis 中保存的引用
+OFFLOAD_REF_KEY = "__offloaded__"
+
+
+class ResultStore:
+    """
+    结果存储格式
+    - msgpack 编码，超过 compress_threshold 字节时压缩（优先 zstd，其次 lz4，最后 zlib）
+    - 压缩后仍超过 offload_threshold 字节时，将 result 字段写入 offload_dir 下的文件，Redis 中只保存文件引用
+    - 读取时自动识别格式，透明还原
+    """
+
+    def __init__(self,
+                 compress_threshold: int = 16 * 1024,
+                 offload_threshold: int = 1024 * 1024,
+                 offload_dir: str | None = None):
+        self.compress_threshold = compress_threshold
+        self.offload_threshold = offload_threshold
+        self.offload_dir = offload_dir
+
+    def dumps(self, obj: Any) -> bytes:
+        data = self._pack(obj)
+        if self.offload_dir and len(data) > self.offload_threshold and isinstance(obj, dict) and "result" in obj:
+            path = self._offload(self._pack(obj["result"]))
+            data = self._pack({**obj, "result": {OFFLOAD_REF_KEY: path}})
+        return data
+
+    def loads(self, data: bytes) -> Any:
+        obj = self._unpack(data)
+        if isinstance(obj, dict) and isinstance(obj.get("result"), dict) and OFFLOAD_REF_KEY in obj["result"]:
+            obj["result"] = self._load_offloaded(obj["result"][OFFLOAD_REF_KEY])
+        return obj
+
+    def _pack(self, obj: Any) -> bytes:
+        raw = msgpack.packb(obj, use_bin_type=True, default=str)
+        if len(raw) <= self.compress_threshold:
+            return FORMAT_RAW + raw
+        if zstandard is not None:
+            return FORMAT_ZSTD + zstandard.ZstdCompressor(level=3).compress(raw)
+        if lz4 is not None:
+            return FORMAT_LZ4 + lz4.frame.compress(raw)
+        return FORMAT_ZLIB + zlib.compress(raw, 6)
+
+    @staticmethod
+    def _unpack(data: bytes) -> Any:
+        if isinstance(data, str):
+            data = data.encode("latin-1")
+        fmt, body = data[:1], data[1:]
+        if fmt == FORMAT_ZSTD:
+            body = zstandard.ZstdDecompressor().decompress(body)
+        elif fmt == FORMAT_LZ4:
+            body = lz4.frame.decompress(body)
+        elif fmt == FORMAT_ZLIB:
+            body = zlib.decompress(body)
+        elif fmt != FORMAT_RAW:
+            # 切换序列化器之前以 json 存储的结果
+            return json.loads(data)
+        return msgpack.unpackb(body, raw=False, strict_map_key=False)
+
+    def _offload(self, data: bytes) -> str:
+        name = uuid.uuid4().hex
+        # 按前两位分目录，避免单个目录文件过多
+        directory = os.path.join(self.offload_dir, name[:2])
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, name)
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+        return os.path.relpath(path, self.offload_dir)
+
+    def _load_offloaded(self, ref: str) -> Any:
+        path = os.path.join(self.offload_dir or "", ref)
+        try:
+            with open(path, "rb") as f:
+                return self._unpack(f.read())
+        except OSError as e:
+            logger.warning(f"Offloaded result {ref} unavailable: {e}")
+            return {"success": False, "error": f"结果文件不可用: {ref}"}
+
+    def sweep(self, max_age: float):
+        """删除超过 max_age 秒的卸载文件（与 Redis 中结果的过期时间保持一致）"""
+        if not self.offload_dir or not os.path.isdir(self.offload_dir):
+            return
+        deadline = time.time() - max_age
+        removed = 0
+        for root, _, files in os.walk(self.offload_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if os.path.getmtime(path) < deadline:
+                        os.remove(path)
+                        removed += 1
+                except OSError:
+                    pass
+        if removed:
+            logger.info(f"[ResultStore] Removed {removed} expired offloaded results.")
+
+    def start_sweeper(self, max_age: float, stop_event: threading.Event, interval: float = 3600):
+        def _run():
+            while not stop_event.is_set():
+                self.sweep(max_age)
+                stop_event.wait(interval)
+
+        threading.Thread(target=_run, name="result-store-sweeper", daemon=True).start()
+
+
+def store_from_env() -> ResultStore:
+    """
+    RESULT_COMPRESS_THRESHOLD: 超过该字节数的结果压缩后存储，默认 16KB
+    RESULT_OFFLOAD_THRESHOLD: 压缩后仍超过该字节数的结果写入文件，默认 1MB
+    RESULT_OFFLOAD_DIR: 结果文件目录，api 与 worker 需挂载同一目录，为空时不卸载
+    """
+    return ResultStore(
+        compress_threshold=int(os.getenv("RESULT_COMPRESS_THRESHOLD") or 16 * 1024),
+        offload_threshold=int(os.getenv("RESULT_OFFLOAD_THRESHOLD") or 1024 * 1024),
+        offload_dir=os.getenv("RESULT_OFFLOAD_DIR") or None,
+    )
+
+
+result_store = store_from_env()
+
+register(SERIALIZER_NAME, result_store.dumps, result_store.loads,
+         content_type=CONTENT_TYPE, content_encoding="binary")
@@ -0,0 +1,84 @@
+"""
+代码执行子进程（由 app/code_sandbox.py 以 python -I sandbox_runner.py <内存上限字节数> 启动，不依赖 app 包）
+协议：stdin / stdout 上的帧，4 字节大端长度 + JSON
+  请求 {"code": str, "cpu_seconds": float | null}
+  响应 {"output": str, "error": str | null}
+"""
+import io
+import json
+import os
+import struct
+import sys
+import traceback
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+_HEADER = struct.Struct(">I")
+
+
+def read_frame(stream) -> dict | None:
+    header = stream.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return None
+    (size,) = _HEADER.unpack(header)
+    return json.loads(stream.read(size))
+
+
+def write_frame(stream, message: dict):
+    data = json.dumps(message, default=str).encode("utf-8")
+    stream.write(_HEADER.pack(len(data)) + data)
+    stream.flush()
+
+
+def limit_process(memory_limit: int):
+    """启动时设置本进程的内存上限（0 表示不限制），并且不生成 core 文件"""
+    if resource is None:
+        return
+    if memory_limit:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+
+def limit_cpu(seconds: float | None):
+    """本次执行最多再使用 seconds 秒 CPU，超出后进程收到 SIGXCPU 退出"""
+    if resource is None or not seconds:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = usage.ru_utime + usage.ru_stime
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(used + seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def main():
+    limit_process(int(sys.argv[1]) if len(sys.argv) > 1 else 0)
+    stdin = sys.stdin.buffer
+    # 协议使用原 stdout 的副本，fd 1 指向 /dev/null，执行的代码直接写 fd 1 也不会破坏协议
+    protocol_out = os.fdopen(os.dup(1), "wb")
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+
+    while True:
+        request = read_frame(stdin)
+        if request is None:
+            return
+        output = io.StringIO()
+        error = None
+        sys.stdout = output
+        try:
+            limit_cpu(request.get("cpu_seconds"))
+            exec(request["code"], {"__name__": "__main__", "__builtins__": __builtins__})
+        except BaseException:
+            error = traceback.format_exc()
+        finally:
+            sys.stdout = sys.__stdout__
+        write_frame(protocol_out, {"output": output.getvalue(), "error": error})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import json
+import time
+from typing import Any, AsyncIterator
+
+import redis
+import redis.asyncio as aioredis
+
+# 任务状态变化通过 Redis pub/sub 推送，频道按任务 id 与队列名区分
+EVENT_CHANNEL_PREFIX = "tasker:events"
+
+
+def task_channel(task_id: str) -> str:
+    return f"{EVENT_CHANNEL_PREFIX}:task:{task_id}"
+
+
+def queue_channel(queue: str) -> str:
+    return f"{EVENT_CHANNEL_PREFIX}:queue:{queue}"
+
+
+def make_task_event(task_id: str, status: str, queue: str | None = None, result: Any = None) -> dict[str, Any]:
+    if isinstance(result, BaseException):
+        result = str(result)
+    return {
+        "task_id": task_id,
+        "queue": queue,
+        "status": status,
+        "result": result,
+        "timestamp": time.time(),
+    }
+
+
+def publish_task_event(client: redis.Redis, event: dict[str, Any]):
+    """同时发布到任务频道与队列频道"""
+    data = json.dumps(event, default=str)
+    pipe = client.pipeline(transaction=False)
+    pipe.publish(task_channel(event["task_id"]), data)
+    if event.get("queue"):
+        pipe.publish(queue_channel(event["queue"]), data)
+    pipe.execute()
+
+
+class TaskEventSubscriber:
+    """
+    订阅任务/队列的状态变化（异步上下文管理器，进入时完成订阅）
+    """
+
+    def __init__(self, url: str, task_ids: list[str], queues: list[str]):
+        self._client = aioredis.from_url(url)
+        self._pubsub = self._client.pubsub()
+        self._channels = [task_channel(t) for t in task_ids] + [queue_channel(q) for q in queues]
+
+    async def __aenter__(self):
+        await self._pubsub.subscribe(*self._channels)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._pubsub.aclose()
+        await self._client.aclose()
+
+    async def events(self, keepalive: float = 15) -> AsyncIterator[dict[str, Any] | None]:
+        """keepalive 秒内没有事件时产出 None，用于发送心跳"""
+        while True:
+            message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=keepalive)
+            if message is None:
+                yield None
+                continue
+            yield json.loads(message["data"])
@@ -1,15 +1,36 @@
+import json
 import logging
 import os
-import re
-import sys
+import threading
+import time
 import traceback
-from io import StringIO
+from datetime import datetime
 from typing import Any
 
 import docker
-import requests  # 需要引入
 from celery import Celery, Task
+from celery import states
+from celery.signals import after_task_publish, task_postrun, task_prerun, task_revoked, worker_ready, worker_shutdown
 from docker.errors import ImageNotFound
+from docker.utils import parse_bytes
+
+from app.adaptive_concurrency import adaptive_from_env
+from app.callback import CallbackDelivery, CallbackRejected, CallbackResultNotReady
+from app.code_sandbox import SandboxCodeError, sandbox_from_env
+from app.container_pool import pools_from_env
+from app.container_reaper import reaper_from_env
+from app.container_stats import ContainerStatsCollector
+from app.dedup import deduplicator_from_env
+from app.fair_scheduler import scheduler_from_env
+from app.image_cache import ImageCache, ImagePrefetcher
+from app.message_pipeline import consumers_from_env, get_handler
+from app.metrics import task_metrics
+from app.proxy_pool import Proxy, ProxyPool, ProxyUnavailable, fetch_proxy, proxy_pools_from_env
+from app.queue_stats import QueueCounters
+from app.resource_budget import budget_from_env, requested_resources
+from app.result_parser import ResultParser
+from app.result_store import result_store
+from app.task_events import make_task_event, publish_task_event
 
 # 日志配置，建议你根据生产环境实际需要调整
 logging.basicConfig(
@@ -22,10 +43,70 @@ logger = logging.getLogger(__name__)
 app = Celery('tasks')
 app.config_from_object('conf.celery_config')
 
-# Docker client，模块级单例
-docker_client = docker.from_env()
-
-result_data_word: str = "===result-data==="
+# 队列累计入队/出队数（api 与 worker 进程共用），用于计算队列速率
+queue_counters = QueueCounters(app.conf.broker_url)
+
+# 多租户公平调度（api 负责调度，worker 在任务结束时释放租户的并发占用）
+fair_scheduler = scheduler_from_env(app)
+
+# 相同任务的去重与结果复用（api 登记，worker 在任务结束时释放并登记结果）
+task_dedup = deduplicator_from_env(app)
+
+# Docker client，模块级单例（线程池模式下多个任务共享，连接池需不小于并发数）
+docker_client = docker.from_env(max_pool_size=int(os.getenv('DOCKER_MAX_POOL_SIZE', 32)))
+
+# 镜像存在性缓存，同一镜像的并发拉取只执行一次
+image_cache = ImageCache(docker_client, ttl=float(os.getenv('IMAGE_CACHE_TTL', 300)))
+# worker 启动时预热的热点镜像，逗号分隔；PREFETCH_INTERVAL 秒后重新拉取（<=0 只预热一次）
+prefetch_images: list[str] = [i.strip() for i in os.getenv('PREFETCH_IMAGES', '').split(',') if i.strip()]
+prefetch_interval: float = float(os.getenv('PREFETCH_INTERVAL', 300))
+
+# 容器的后台删除与孤儿容器清理（容器带有 worker id 标签）
+container_reaper = reaper_from_env(docker_client, app)
+
+# 预热容器池（WARM_POOL_IMAGES 为空时不启用）
+container_pools = pools_from_env(docker_client, labels=container_reaper.worker_labels())
+
+# 批量消息处理的消费者（每个处理器一个 Redis Stream）
+message_consumers = consumers_from_env(app.conf.broker_url, docker_client)
+
+# 执行 run_code_task 的常驻 Python 子进程池
+code_sandbox = sandbox_from_env()
+
+# 代理池（PROXY_POOLS 配置命名代理池，旧的 proxy_url 参数仍按任务单独获取代理）
+proxy_pools = proxy_pools_from_env()
+
+# 单个 worker 进程的资源预算，--pool=threads 时多个容器并发运行，按预算限流
+resource_budget = budget_from_env()
+# 未指定 nano_cpus / mem_limit 的任务按默认值占用预算
+task_default_cpus: float = float(os.getenv('TASK_DEFAULT_CPUS', 1))
+task_default_memory: int = parse_bytes(os.getenv('TASK_DEFAULT_MEMORY', '1g'))
+# 按宿主机内存压力与 CPU steal 动态调整并发上限与预取数（ADAPTIVE_CONCURRENCY=false 关闭）
+adaptive_concurrency = adaptive_from_env(resource_budget)
+# 是否采样任务容器的 CPU、内存、网络与磁盘 IO 并附加到结果的 resources 字段
+container_stats_enabled: bool = os.getenv('CONTAINER_STATS', 'true').lower() in ('1', 'true', 'yes', 'on')
+container_stats_interval: float = float(os.getenv('CONTAINER_STATS_INTERVAL', 1))
+
+# 是否以流式方式读取容器日志（边运行边解析，内存占用与日志大小无关）
+docker_log_stream: bool = os.getenv('DOCKER_LOG_STREAM', 'true').lower() in ('1', 'true', 'yes', 'on')
+# 流式模式下保留的尾部日志字节数
+docker_log_tail_bytes: int = int(os.getenv('DOCKER_LOG_TAIL_BYTES', 64 * 1024))
+# 是否通过 Redis pub/sub 推送任务状态变化（供 /api/tasks/stream 订阅）
+task_events_enabled: bool = os.getenv('TASK_EVENTS', 'true').lower() in ('1', 'true', 'yes', 'on')
+# 回调投递队列，由专门的 worker 消费（-Q callback），不占用执行容器任务的线程；为空时在任务线程内直接投递一次
+callback_queue: str = os.getenv('CALLBACK_QUEUE', 'callback')
+# 回调失败的最大重试次数，重试耗尽后写入死信列表
+callback_max_retries: int = int(os.getenv('CALLBACK_MAX_RETRIES', 8))
+callback_delivery = CallbackDelivery(
+    timeout=float(os.getenv('CALLBACK_TIMEOUT', 10)),
+    host_concurrency=int(os.getenv('CALLBACK_HOST_CONCURRENCY', 4)),
+    backoff_base=float(os.getenv('CALLBACK_BACKOFF_BASE', 5)),
+    backoff_max=float(os.getenv('CALLBACK_BACKOFF_MAX', 600)),
+)
+# 单个结果数据块的最大字节数，超出部分截断
+result_max_block_bytes: int = int(os.getenv('RESULT_MAX_BLOCK_BYTES', 64 * 1024 * 1024))
+# worker 的 Prometheus 指标端口（/metrics），0 表示不启用
+worker_metrics_port: int = int(os.getenv('WORKER_METRICS_PORT', 9100))
 
 
 def docker_login():
@@ -48,52 +129,258 @@ def docker_login():
 # worker 启动时只调用一次
 docker_login()
 
+# worker 启动时登记自己消费的队列（hostname -> 队列名列表），供 api 的 worker 注册表读取
+WORKER_QUEUES_KEY = "tasker:worker-queues"
+
+# 后台线程的停止信号
+_STOP_EVENT = threading.Event()
+
+
+@worker_ready.connect
+def on_worker_ready(sender=None, **kwargs):
+    # 登记消费的队列
+    try:
+        queues = [q.name for q in sender.task_consumer.queues]
+        app.backend.client.hset(WORKER_QUEUES_KEY, sender.hostname, json.dumps(queues))
+    except Exception as e:
+        logger.warning(f"Failed to register worker queues: {e}")
+        queues = []
+    # 只消费回调队列的 worker（回调专用）不启动容器、代码执行与消息处理相关的后台服务
+    if callback_queue and queues and set(queues) <= {callback_queue}:
+        logger.info(f"Worker {sender.hostname} only delivers callbacks.")
+        if worker_metrics_port:
+            task_metrics.start_server(worker_metrics_port)
+        return
+    # 监听镜像删除事件，及时清除镜像缓存
+    threading.Thread(target=image_cache.watch_events, args=(_STOP_EVENT,), name="image-events", daemon=True).start()
+    # 预热热点镜像
+    if prefetch_images:
+        ImagePrefetcher(image_cache, prefetch_images, interval=prefetch_interval, stop_event=_STOP_EVENT).start()
+    # 清理过期的结果文件
+    if result_store.offload_dir:
+        result_store.start_sweeper(app.backend.prepare_expires(None) or 86400, _STOP_EVENT)
+    # 后台删除容器，清理已退出 worker 遗留的容器
+    container_reaper.start(_STOP_EVENT)
+    # 预热容器池
+    if container_pools:
+        container_pools.start(_STOP_EVENT)
+    # 代理池后台预取与健康检查
+    proxy_pools.start(_STOP_EVENT)
+    # 批量消息处理
+    for consumer in message_consumers:
+        consumer.start(_STOP_EVENT)
+    # 预先启动代码执行进程
+    if code_sandbox.size:
+        threading.Thread(target=code_sandbox.start, name="code-sandbox", daemon=True).start()
+    # 按宿主机负载调整并发
+    if adaptive_concurrency is not None:
+        adaptive_concurrency.attach(sender)
+        adaptive_concurrency.start(_STOP_EVENT)
+    # 暴露各阶段耗时等指标
+    if worker_metrics_port:
+        task_metrics.start_server(worker_metrics_port)
+
+
+@worker_shutdown.connect
+def on_worker_shutdown(sender=None, **kwargs):
+    _STOP_EVENT.set()
+    try:
+        app.backend.client.hdel(WORKER_QUEUES_KEY, sender.hostname)
+    except Exception as e:
+        logger.warning(f"Failed to unregister worker queues: {e}")
+    container_pools.shutdown()
+    container_reaper.shutdown()
+    code_sandbox.shutdown()
+
+
+# 推送任务状态变化
+def publish_task_state(task: Task, task_id: str, status: str, result: Any = None):
+    client = getattr(app.backend, 'client', None)
+    if not task_events_enabled or client is None:
+        return
+    try:
+        queue = (task.request.delivery_info or {}).get('routing_key')
+        publish_task_event(client, make_task_event(task_id, status, queue=queue, result=result))
+    except Exception as e:
+        logger.warning(f"[TASK {task_id}] Failed to publish task event: {e}")
+
+
+@after_task_publish.connect
+def on_after_task_publish(routing_key: str = None, **kwargs):
+    if routing_key:
+        queue_counters.incr("enqueued", routing_key)
+
+
+@task_prerun.connect
+def on_task_prerun(task_id: str = None, task: Task = None, **kwargs):
+    queue = (task.request.delivery_info or {}).get('routing_key')
+    if queue:
+        queue_counters.incr("dequeued", queue)
+    # 从提交到开始执行的等待时间（api 提交的任务在消息头中带有提交时间）
+    headers = task.request.headers or {}
+    if headers.get('submitted_at') and not task.request.retries:
+        # 延迟执行的任务从计划时间开始计算
+        ready_at = headers['submitted_at']
+        if task.request.eta:
+            ready_at = max(ready_at, datetime.fromisoformat(task.request.eta).timestamp())
+        task_metrics.wait_time(task.name, headers.get('priority_class', 'high'), time.time() - ready_at)
+    publish_task_state(task, task_id, states.STARTED)
+
+
+@task_postrun.connect
+def on_task_postrun(task_id: str = None, task: Task = None, retval: Any = None, state: str = None, **kwargs):
+    publish_task_state(task, task_id, state, retval if state in states.READY_STATES else None)
+    # 释放租户的并发占用（重试中的任务继续占用）
+    tenant = (task.request.headers or {}).get('tenant')
+    if tenant and state in states.READY_STATES:
+        release_tenant(tenant, task_id)
+    # 释放去重标记，并向合并到该任务的调用方投递回调
+    dedup_key = (task.request.headers or {}).get('dedup_key')
+    if dedup_key and state in states.READY_STATES:
+        complete_dedup(task, task_id, dedup_key, state, retval)
+
+
+@task_revoked.connect
+def on_task_revoked(sender: Task = None, request=None, expired: bool = False, **kwargs):
+    # 撤销或过期的任务不会触发 task_postrun，在这里释放租户的并发占用与去重标记，避免占用到租期结束
+    # 自定义消息头在 request.headers 中，或（由消息头构造的 request）直接是 request 的属性
+    headers = getattr(request, 'headers', None) or {}
+    tenant = headers.get('tenant') or getattr(request, 'tenant', None)
+    if tenant:
+        release_tenant(tenant, request.id)
+    dedup_key = headers.get('dedup_key') or getattr(request, 'dedup_key', None)
+    if dedup_key:
+        complete_dedup(sender, request.id, dedup_key, states.REVOKED, "Task expired" if expired else "Task revoked")
+
+
+def release_tenant(tenant: str, task_id: str):
+    try:
+        fair_scheduler.release(tenant, task_id)
+    except Exception as e:
+        logger.warning(f"[TASK {task_id}] Failed to release tenant {tenant}: {e}")
+
+
+def complete_dedup(task: Task, task_id: str, dedup_key: str, state: str, retval: Any):
+    """释放去重标记，合并进来的调用方收到与发起方相同的回调（异常结束时为失败结果）"""
+    try:
+        success = state == states.SUCCESS and isinstance(retval, dict) and retval.get('success', False)
+        callbacks = task_dedup.complete(dedup_key, task_id, success)
+    except Exception as e:
+        logger.warning(f"[TASK {task_id}] Failed to complete dedup entry: {e}")
+        return
+    if state != states.SUCCESS:
+        retval = make_result(success=False, error=str(retval))
+    for callback in callbacks:
+        send_callback(callback, retval, task_id, task.name)
+
 
 def make_result(success: bool = False,
                 attempt: int | None = None,
                 result: Any | None = None,
                 callback: str | None = None,
                 error: str | None = None,
-                traceback: str | None = None):
+                traceback: str | None = None,
+                resources: dict | None = None):
     return {key: value for key, value in {
         "success": success,
         "attempt": attempt,
         "result": result,
         "callback": callback,
         "error": error,
-        "traceback": traceback
+        "traceback": traceback,
+        "resources": resources
     }.items() if value is not None}
 
 
 # 获取执行结果集
 def get_execute_result(ret: str):
     # 解析输出结果
-    result = ""
-    matches = re.findall(rf"{result_data_word}\s*([\s\S]*?)\s*{result_data_word}", ret)
-    if matches:
-        # 可以返回所有，或者只返回第一个数据块
-        result = "\n\n".join(m.strip() for m in matches if m.strip())
-    elif ret.strip():
-        result = ret.strip().splitlines()[-1]
-    else:
-        result = ""
-    return result
+    parser = new_result_parser()
+    parser.feed(ret.encode("utf-8"))
+    parser.close()
+    return parser.result()
+
+
+# 持续读取容器日志流并交给解析器
+def follow_container_logs(log_stream, parser: ResultParser):
+    try:
+        for chunk in log_stream:
+            parser.feed(chunk)
+    except Exception as e:
+        logger.warning(f"Log stream interrupted: {e}")
+
+
+def new_result_parser() -> ResultParser:
+    return ResultParser(tail_size=docker_log_tail_bytes, max_block_size=result_max_block_bytes)
+
+
+# 容器是否因超出内存限制被终止
+def container_oom_killed(container) -> bool | None:
+    try:
+        container.reload()
+        return bool(container.attrs.get("State", {}).get("OOMKilled", False))
+    except Exception as e:
+        logger.warning(f"Failed to inspect container {container.id}: {e}")
+        return None
+
+
+# 通知回调地址
+def send_callback(callback: str | None, retval: Any, task_id: str, task_name: str):
+    if not callback or not callback.startswith(('http://', 'https://')):
+        return
+    try:
+        if callback_queue:
+            # 投递到回调队列，worker 无需等待回调方响应；消息中只带任务 id，投递时从结果后端读取结果
+            deliver_callback.apply_async(args=(callback, task_id), queue=callback_queue)
+        else:
+            with task_metrics.phase(task_name, "callback"):
+                callback_delivery.post(callback, retval, task_id)
+    except Exception as e:
+        logger.error(f"回调通知失败:{e}")
+        logger.error("Traceback:\n%s", traceback.format_exc())
+        callback_delivery.dead_letter(getattr(app.backend, 'client', None), callback, retval, task_id,
+                                      attempts=1, error=str(e))
 
 
 class CallbackTask(Task):
     def on_success(self, retval, task_id, args, kwargs):
-        callback = kwargs.get('callback')
-        if callback and callback.startswith(('http://', 'https://')):
-            try:
-                headers = {
-                    "Content-Type": "application/json",
-                    "Task-Id": task_id
-                }
-                response = requests.post(callback, json=retval, headers=headers, timeout=60)
-                logger.info(f"callback: {response.status_code} - {response.text}")
-            except Exception as e:
-                logger.error(f"回调通知失败:{e}")
-                logger.error("Traceback:\n%s", traceback.format_exc())
+        send_callback(kwargs.get('callback'), retval, task_id, self.name)
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        send_callback(kwargs.get('callback'), make_result(success=False, error=str(exc)), task_id, self.name)
+
+
+# 回调的内容：任务在结果后端中的结果，异常结束的任务转换为失败结果
+def callback_payload(task_id: str) -> Any:
+    meta = app.backend.get_task_meta(task_id)
+    status = meta.get("status")
+    if status not in states.READY_STATES:
+        raise CallbackResultNotReady(f"Result of task {task_id} is {status}")
+    if status != states.SUCCESS:
+        return make_result(success=False, error=str(meta.get("result")))
+    return meta.get("result")
+
+
+# 投递回调，失败时按指数退避重试，重试耗尽或回调方拒绝后写入死信列表
+# payload 为空时从结果后端读取任务的结果（重新投递死信时直接使用死信中的内容）
+@app.task(bind=True, ignore_result=True)
+def deliver_callback(self, callback: str, task_id: str, payload: Any = None):
+    attempt = self.request.retries + 1
+    try:
+        if payload is None:
+            payload = callback_payload(task_id)
+        with task_metrics.phase(self.name, "callback"):
+            callback_delivery.post(callback, payload, task_id)
+    except CallbackRejected as e:
+        callback_delivery.dead_letter(getattr(app.backend, 'client', None), callback, payload, task_id,
+                                      attempts=attempt, error=str(e))
+    except Exception as e:
+        if self.request.retries < callback_max_retries:
+            countdown = callback_delivery.backoff(self.request.retries)
+            logger.warning(f"[CALLBACK {task_id}] Attempt {attempt} failed: {e}, retry in {countdown:.0f}s")
+            raise self.retry(exc=e, countdown=countdown, max_retries=callback_max_retries)
+        callback_delivery.dead_letter(getattr(app.backend, 'client', None), callback, payload, task_id,
+                                      attempts=attempt, error=str(e))
 
 
 @app.task(bind=True, base=CallbackTask)
@@ -101,53 +388,69 @@ def run_docker_task(self,
                     image: str,  # Docker 镜像名
                     command: list[str],  # 容器执行的命令行
                     container_kwargs: dict[str, Any],  # 容器的运行参数
-                    proxy_url: str = None,  # 抓取代理服务器
+                    proxy_url: str = None,  # 抓取代理服务器（兼容旧参数，建议使用 proxy_pool）
                     max_retries: int = 0,
                     retry_delay: int = 5,
                     max_execution_time: int = 60 * 60 * 1,  # 最大执行时长，单位为秒，默认为1小时
                     callback: str = None,  # 回调url，任务执行完成后回调的地址
+                    proxy_pool: str = None,  # 代理池名称（PROXY_POOLS 中配置）
                     ) -> dict[str, Any]:
     logging.info(f"Running Docker task with the following parameters:")
     logging.info(f"image: {image}")
     logging.info(f"command: {command}")
     logging.info(f"container_kwargs: {container_kwargs}")
     logging.info(f"proxy_url: {proxy_url}")
+    logging.info(f"proxy_pool: {proxy_pool}")
     logging.info(f"max_retries: {max_retries}")
     logging.info(f"retry_delay: {retry_delay}")
     logging.info(f"callback: {callback}")
     logging.info(f"max_execution_time: {max_execution_time} seconds")  # Log the max_execution_time
 
     container = None
+    # 容器已启动且尚未确认退出（等待超时或出错时仍在运行）
+    container_running = False
+    log_stream = None
+    reserved = None
+    pool = None
+    warm = None
+    warm_healthy = False
+    stats: ContainerStatsCollector | None = None
+    proxies: ProxyPool | None = None
+    proxy: Proxy | None = None
+    proxy_success: bool | None = None
+    # 容器运行耗时，与结果一起反馈给代理池
+    proxy_latency: float | None = None
     attempt = self.request.retries + 1
     image = image.strip()
 
     try:
-        # 检查并拉取镜像
-        try:
-            docker_client.images.get(image)
-            logger.info(f"Image {image} found locally.")
-        except ImageNotFound:
-            logger.info(f"Image {image} not found locally. Pulling...")
-            docker_client.images.pull(image)
-            logger.info(f"Image {image} pulled successfully.")
+        # 检查并拉取镜像（带缓存，并发任务共享同一次拉取）
+        started = time.perf_counter()
+        pulled = image_cache.ensure(image)
+        task_metrics.observe_phase(self.name, "image_pull" if pulled else "image_check",
+                                   time.perf_counter() - started)
 
         # ========== 代理逻辑开始 ==========
         proxy_env = {}
-        if proxy_url:
-            try:
-                resp = requests.get(proxy_url, timeout=10)
-                resp.raise_for_status()
-                proxy_ip = resp.text.strip()
-                if proxy_ip:
-                    proxy_env = {
-                        "HTTP_PROXY": f"http://{proxy_ip}",
-                        "HTTPS_PROXY": f"http://{proxy_ip}"
-                    }
-                    logger.info(f"Using proxy: {proxy_env}")
-                else:
-                    logger.warning(f"Proxy address from {proxy_url} is empty.")
-            except Exception as e:
-                logger.warning(f"Failed to fetch proxy from {proxy_url}: {e}")
+        if proxy_pool:
+            proxies = proxy_pools.get(proxy_pool)
+            if proxies is None:
+                logger.warning(f"Unknown proxy pool {proxy_pool}, running without proxy.")
+        if proxies is not None:
+            # 从代理池分配，池为空时最多等待一次预取
+            with task_metrics.phase(self.name, "proxy_fetch"):
+                proxy = proxies.acquire()
+            if proxy is None:
+                # 不使用代理运行可能被目标站点封禁，本次尝试按失败处理（按 max_retries 重试）
+                task_metrics.proxy_unavailable(self.name, proxy_pool)
+                raise ProxyUnavailable(f"No proxy available in pool {proxy_pool}")
+        elif proxy_url:
+            # 旧参数：每个任务单独获取一个代理
+            with task_metrics.phase(self.name, "proxy_fetch"):
+                proxy = fetch_proxy(proxy_url)
+        if proxy is not None:
+            proxy_env = proxy.env
+            logger.info(f"Using proxy: {proxy_env}")
         # ========== 代理逻辑结束 ==========
 
         # 合并外部传入的环境变量和代理变量
@@ -157,30 +460,119 @@ def run_docker_task(self,
         # 更新环境变量
         container_kwargs['environment'] = merged_env
 
+        # 占用资源预算，预算不足时等待其他容器结束
+        reserved = requested_resources(container_kwargs, task_default_cpus, task_default_memory)
+        with task_metrics.phase(self.name, "budget_wait"):
+            resource_budget.acquire(*reserved)
+
+        # 预热池中有空闲容器时通过 exec 执行，省去创建与启动容器的时间
+        pool = container_pools.get(image, container_kwargs) if container_pools else None
+        warm = pool.acquire() if pool is not None else None
+        if warm is not None:
+            logger.info(f"Running in warm container {warm.id} for image {image}.")
+            parser = new_result_parser()
+            if container_stats_enabled:
+                stats = ContainerStatsCollector(docker_client, warm.id, container_stats_interval, relative=True).start()
+            started = time.perf_counter()
+            with task_metrics.phase(self.name, "wait"):
+                exit_code = pool.execute(warm, command, merged_env, max_execution_time, parser)
+            proxy_latency = time.perf_counter() - started
+            resources = stats.stop() if stats is not None else None
+            task_metrics.container_usage(self.name, resources)
+            warm_healthy = proxy_success = exit_code == 0
+            task_metrics.exit_code(self.name, exit_code)
+            task_metrics.log_bytes(self.name, parser.total_bytes)
+            logger.info(f"[TASK {self.request.id}] Docker output ({parser.total_bytes} bytes, tail):\n{parser.tail()}")
+            with task_metrics.phase(self.name, "result_parse"):
+                result = parser.result()
+            task_metrics.result_bytes(self.name, len(result.encode("utf-8")))
+            return make_result(
+                success=exit_code == 0,
+                attempt=attempt,
+                result=result,
+                callback=callback,
+                resources=resources
+            )
+
         # 创建并启动容器
-        container = docker_client.containers.create(
-            image=image,
-            command=command,
-            **container_kwargs,
-        )
+        try:
+            with task_metrics.phase(self.name, "container_create"):
+                container = docker_client.containers.create(
+                    image=image,
+                    command=command,
+                    **{**container_kwargs,
+                       "labels": container_reaper.task_labels(container_kwargs.get("labels"), self.request.id,
+                                                              max_execution_time)},
+                )
+        except ImageNotFound:
+            # 镜像在缓存有效期内被删除，清除缓存后交给重试
+            image_cache.invalidate(image)
+            raise
         logger.info(f"Container {container.id} created successfully for image {image}.")
-        container.start()
+        with task_metrics.phase(self.name, "container_start"):
+            container.start()
+        container_running = True
+        run_started = time.perf_counter()
         logger.info(f"Container {container.id} started.")
-
-        # 等待执行完成，并设置最大执行时间
-        exit_result = container.wait(timeout=max_execution_time)  # Set timeout here
-        logs = container.logs(stdout=True, stderr=True).decode("utf-8")
-        logger.info(f"[TASK {self.request.id}] Docker output:\n{logs}")
-
-        # 解析输出结果
-        result = get_execute_result(logs)
+        if container_stats_enabled:
+            stats = ContainerStatsCollector(docker_client, container.id, container_stats_interval).start()
+
+        if docker_log_stream:
+            # 流式读取日志，运行期间即增量解析结果
+            parser = new_result_parser()
+            log_stream = container.logs(stdout=True, stderr=True, stream=True, follow=True)
+            reader = threading.Thread(target=follow_container_logs, args=(log_stream, parser),
+                                      name=f"docker-logs-{container.short_id}", daemon=True)
+            reader.start()
+
+            # 等待执行完成，并设置最大执行时间
+            with task_metrics.phase(self.name, "wait"):
+                exit_result = container.wait(timeout=max_execution_time)
+            container_running = False
+            proxy_latency = time.perf_counter() - run_started
+            # 等待读取剩余的日志
+            with task_metrics.phase(self.name, "log_fetch"):
+                reader.join(timeout=30)
+                if reader.is_alive():
+                    log_stream.close()
+                    reader.join()
+                parser.close()
+            task_metrics.log_bytes(self.name, parser.total_bytes)
+            logger.info(f"[TASK {self.request.id}] Docker output ({parser.total_bytes} bytes, tail):\n{parser.tail()}")
+
+            # 解析输出结果
+            with task_metrics.phase(self.name, "result_parse"):
+                result = parser.result()
+        else:
+            # 等待执行完成，并设置最大执行时间
+            with task_metrics.phase(self.name, "wait"):
+                exit_result = container.wait(timeout=max_execution_time)  # Set timeout here
+            container_running = False
+            proxy_latency = time.perf_counter() - run_started
+            with task_metrics.phase(self.name, "log_fetch"):
+                raw_logs = container.logs(stdout=True, stderr=True)
+            task_metrics.log_bytes(self.name, len(raw_logs))
+            logs = raw_logs.decode("utf-8")
+            logger.info(f"[TASK {self.request.id}] Docker output:\n{logs}")
+
+            # 解析输出结果
+            with task_metrics.phase(self.name, "result_parse"):
+                result = get_execute_result(logs)
+        proxy_success = exit_result.get("StatusCode", 1) == 0
+        task_metrics.exit_code(self.name, exit_result.get("StatusCode"))
+        task_metrics.result_bytes(self.name, len(result.encode("utf-8")))
+        resources = stats.stop(oom_killed=container_oom_killed(container)) if stats is not None else None
+        task_metrics.container_usage(self.name, resources)
+        if resources and resources.get("oom_killed"):
+            logger.warning(f"[TASK {self.request.id}] Container {container.id} was OOM killed: {resources}")
 
         # 返回 Result 实例
         return make_result(
             success=exit_result.get("StatusCode", 1) == 0,
             attempt=attempt,
             result=result,
-            callback=callback
+            callback=callback,
+            resources=resources
         )
 
     except Exception as e:
@@ -198,43 +590,56 @@ def run_docker_task(self,
             )
 
     finally:
-        # 强制清理容器
-        if container is not None:
+        # 停止资源采样
+        if stats is not None:
+            stats.stop()
+        # 关闭日志流
+        if log_stream is not None:
             try:
-                container.remove(force=True)
-                logger.info(f"Container {container.id} removed.")
-            except Exception as cleanup_error:
-                logger.warning(f"[WARN] Failed to remove container: {cleanup_error}")
+                log_stream.close()
+            except Exception:
+                pass
+        # 交给后台强制删除容器，任务无需等待
+        if container is not None:
+            if container_running:
+                # 仍在运行的容器先同步终止，释放资源预算后不再占用 CPU 与内存
+                try:
+                    container.kill()
+                except Exception as e:
+                    logger.warning(f"[TASK {self.request.id}] Failed to kill container {container.id}: {e}")
+            container_reaper.remove(container.id, self.name)
+        # 归还预热容器，失败的容器直接销毁
+        if warm is not None:
+            pool.release(warm, healthy=warm_healthy)
+        # 反馈代理的使用结果（容器正常结束才计入）
+        if proxies is not None and proxy is not None and proxy_success is not None:
+            proxies.report(proxy.address, proxy_success, latency=proxy_latency)
+        # 释放资源预算
+        if reserved is not None:
+            resource_budget.release(*reserved)
 
 
 @app.task(bind=True, base=CallbackTask)
 def run_code_task(self,
-                  code: str,  # 容器执行的命令行
+                  code: str,  # 要执行的 Python 代码
                   max_retries: int = 0,
                   retry_delay: int = 5,
                   callback: str = None,  # 回调url，任务执行完成后回调的地址
+                  timeout: float = None,  # 单次执行的超时秒数，默认 CODE_SANDBOX_TIMEOUT
                   ) -> dict[str, Any]:
     """
-    执行传入的 Python 代码，并返回执行结果。支持失败重试。
+    在常驻的 Python 子进程中执行传入的代码，并按结果标记解析输出。支持失败重试。
     """
     attempt = self.request.retries + 1  # 获取当前重试次数
 
     try:
-        # 取出print的日志
-        captured_output = StringIO()
-        sys.stdout = captured_output
-
-        # 隔离环境变量
-        sandbox_globals = {}
-        sandbox_locals = {}
-        exec(code, sandbox_globals, sandbox_locals)
-
-        sys.stdout = sys.__stdout__
-        logs = captured_output.getvalue()
-        print(logs)
+        with task_metrics.phase(self.name, "wait"):
+            logs = code_sandbox.run(code, timeout=timeout)
+        logger.info(f"[TASK {self.request.id}] Code output:\n{logs}")
 
         # 解析输出结果
-        result = get_execute_result(logs)
+        with task_metrics.phase(self.name, "result_parse"):
+            result = get_execute_result(logs)
 
         return make_result(
             success=True,
@@ -245,7 +650,8 @@ def run_code_task(self,
     except Exception as e:
         logger.warning(f"[TASK {self.request.id}] Exception on attempt {attempt}: {e}")
         error = str(e)
-        traceback_info = traceback.format_exc()
+        # 代码中的异常使用子进程内的堆栈
+        traceback_info = e.traceback if isinstance(e, SandboxCodeError) else traceback.format_exc()
 
         # 如果失败且未超过最大重试次数，进行重试
         if attempt <= max_retries:
@@ -261,10 +667,26 @@ def run_code_task(self,
         )
 
 
-# 通用的任务处理函数
+# 通用的任务处理函数：单条消息交给已注册的处理器（大量消息请使用 /api/process_message 的批量管道）
 @app.task(bind=True, base=CallbackTask)
 def run_process_message(
         self,
         message_content: dict[str, Any],
-        callback: str = None) -> dict[str, Any]:
-    pass
+        callback: str = None,
+        handler: str = 'echo') -> dict[str, Any]:
+    attempt = self.request.retries + 1
+    process = get_handler(handler)
+    if process is None:
+        return make_result(success=False, attempt=attempt, error=f"未注册的消息处理器: {handler}", callback=callback)
+    try:
+        result = process([message_content])[0]
+        return make_result(success=True, attempt=attempt, result=result, callback=callback)
+    except Exception as e:
+        logger.warning(f"[TASK {self.request.id}] Exception on attempt {attempt}: {e}")
+        return make_result(
+            success=False,
+            attempt=attempt,
+            error=str(e),
+            traceback=traceback.format_exc(),
+            callback=callback
+        )
@@ -1,56 +1,135 @@
-# workers_ping_monitor.py
+# workers_stats_monitor.py
+import json
 import threading
 import time
-from typing import List, Dict
+from typing import Any, Dict, List
 
-from app.worker import app as celery_app
+from app.worker import app as celery_app, WORKER_QUEUES_KEY
 
-# 缓存最新的在线 worker 列表
-_WORKERS: List[str] = []
+# 心跳超过该秒数未更新的 worker 视为离线（Celery 默认每 2 秒发送一次心跳）
+HEARTBEAT_EXPIRES = 6.0
+
+_WORKERS: Dict[str, Dict[str, Any]] = {}
 _LOCK = threading.Lock()
 _STOP_EVENT = threading.Event()
+_RECEIVER = None
+
 
+def _worker(hostname: str) -> Dict[str, Any]:
+    worker = _WORKERS.get(hostname)
+    if worker is None:
+        worker = _WORKERS[hostname] = {
+            "hostname": hostname,
+            "online": False,
+            "active": 0,
+            "processed": 0,
+            "loadavg": None,
+            "queues": None,
+            "last_heartbeat": None,
+        }
+    return worker
 
-def _refresh_workers(timeout: float = 3.0):
-    """定期通过 ping 探测 Celery workers"""
-    global _WORKERS
+
+def _load_queues(hostnames: List[str]):
+    """读取 worker 启动时登记的消费队列"""
     try:
-        replies = celery_app.control.ping(timeout=timeout) or []
-        workers = [list(r.keys())[0] for r in replies if r]
-        with _LOCK:
-            _WORKERS = workers
+        values = celery_app.backend.client.hmget(WORKER_QUEUES_KEY, hostnames)
     except Exception as e:
-        print(f"[WorkerPingMonitor] 刷新失败: {e}")
+        print(f"[WorkerRegistry] 读取队列失败: {e}")
+        return
+    with _LOCK:
+        for hostname, value in zip(hostnames, values):
+            _worker(hostname)["queues"] = json.loads(value) if value is not None else []
+
+
+def _on_worker_event(event: dict):
+    hostname = event.get("hostname")
+    if not hostname:
+        return
+    with _LOCK:
+        worker = _worker(hostname)
+        new = worker["queues"] is None
+        if event["type"] == "worker-offline":
+            worker["online"] = False
+            worker["active"] = 0
+        else:
+            worker["online"] = True
+            # 使用本地接收时间，避免 worker 与 api 时钟不一致
+            worker["last_heartbeat"] = time.time()
+            worker["loadavg"] = event.get("loadavg", worker["loadavg"])
+            worker["processed"] = event.get("processed", worker["processed"])
+            # 心跳中的 active 为准确值，用于校正任务事件累计的计数
+            if "active" in event:
+                worker["active"] = event["active"]
+    if new or event["type"] == "worker-online":
+        _load_queues([hostname])
 
 
-def start_worker_ping_monitor(interval: int = 60, timeout: float = 3.0):
+def _on_task_event(event: dict):
+    hostname = event.get("hostname")
+    if not hostname:
+        return
+    with _LOCK:
+        worker = _worker(hostname)
+        if event["type"] == "task-started":
+            worker["active"] += 1
+        elif event["type"] in ("task-succeeded", "task-failed", "task-retried", "task-revoked"):
+            worker["active"] = max(worker["active"] - 1, 0)
+
+
+def _run():
+    """消费 Celery 事件（心跳与任务事件），连接断开后自动重连"""
+    global _RECEIVER
+    while not _STOP_EVENT.is_set():
+        try:
+            with celery_app.connection_for_read() as conn:
+                _RECEIVER = celery_app.events.Receiver(conn, handlers={
+                    "worker-online": _on_worker_event,
+                    "worker-heartbeat": _on_worker_event,
+                    "worker-offline": _on_worker_event,
+                    "task-started": _on_task_event,
+                    "task-succeeded": _on_task_event,
+                    "task-failed": _on_task_event,
+                    "task-retried": _on_task_event,
+                    "task-revoked": _on_task_event,
+                })
+                _RECEIVER.capture(limit=None, timeout=None, wakeup=True)
+        except Exception as e:
+            print(f"[WorkerRegistry] 事件连接中断: {e}")
+            _STOP_EVENT.wait(3)
+
+
+def start_worker_registry():
     """
-    启动后台线程，每隔 interval 秒刷新一次 worker 在线列表（基于 ping）
-    :param interval: 刷新间隔（秒）
-    :param timeout: ping 超时时间（秒）
+    启动后台线程，通过 Celery 事件（worker 心跳、上下线与任务事件）维护 worker 状态，无需广播 ping
     """
-    def _run():
-        while not _STOP_EVENT.is_set():
-            _refresh_workers(timeout=timeout)
-            time.sleep(interval)
-
-    t = threading.Thread(target=_run, name="celery-worker-ping", daemon=True)
+    t = threading.Thread(target=_run, name="celery-worker-registry", daemon=True)
     t.start()
 
 
-def stop_worker_ping_monitor():
+def stop_worker_registry():
     """停止后台线程"""
     _STOP_EVENT.set()
+    if _RECEIVER is not None:
+        _RECEIVER.should_stop = True
 
 
 def get_cached_workers() -> Dict[str, object]:
     """
-    返回缓存的 worker 信息
+    返回在线 worker 信息
     {
       "count": 2,
-      "workers": ["celery@hostA", "celery@hostB"]
+      "workers": ["celery@hostA", "celery@hostB"],
+      "details": {"celery@hostA": {"online": true, "active": 1, "queues": ["celery"], ...}}
     }
     """
+    now = time.time()
     with _LOCK:
-        workers = list(_WORKERS)
-    return {"count": len(workers), "workers": workers}
+        details = {}
+        for hostname, worker in _WORKERS.items():
+            online = worker["online"] and worker["last_heartbeat"] is not None \
+                     and now - worker["last_heartbeat"] <= HEARTBEAT_EXPIRES
+            if online:
+                details[hostname] = {**worker, "online": True}
+    workers = sorted(details)
+    return {"count": len(workers), "workers": workers, "details": details}
@@ -0,0 +1,67 @@
+# 对比增量解析器 ResultParser 与旧版全文正则的解析耗时
+# 用法：python -m benchmark.result_parser_benchmark --sizes 1 50 500
+import argparse
+import re
+import time
+
+from app.result_parser import ResultParser, result_data_word
+
+# 模拟爬虫容器的日志行
+LOG_LINE = b"2025-07-18 10:00:00,000 INFO platforms.douyin fetch comments cursor=1200 count=20 has_more=1\n"
+RESULT_BLOCK = f"\n{result_data_word}\n{{\"success\":true,\"items\":[{{\"id\":\"7512642593688210738\"}}]}}\n{result_data_word}\n".encode()
+CHUNK_SIZE = 64 * 1024
+
+
+def make_chunks(size_mb: int):
+    """生成约 size_mb MB 的日志，结果数据块位于末尾"""
+    total = size_mb * 1024 * 1024
+    chunk = LOG_LINE * (CHUNK_SIZE // len(LOG_LINE))
+    sent = 0
+    while sent + len(chunk) < total:
+        yield chunk
+        sent += len(chunk)
+    yield RESULT_BLOCK
+
+
+def regex_parse(ret: str) -> str:
+    # 旧版 get_execute_result 的实现
+    matches = re.findall(rf"{result_data_word}\s*([\s\S]*?)\s*{result_data_word}", ret)
+    if matches:
+        return "\n\n".join(m.strip() for m in matches if m.strip())
+    elif ret.strip():
+        return ret.strip().splitlines()[-1]
+    return ""
+
+
+def bench_regex(size_mb: int) -> tuple[float, str]:
+    # 旧版需要先拼接完整日志再解码
+    logs = b"".join(make_chunks(size_mb))
+    start = time.perf_counter()
+    result = regex_parse(logs.decode("utf-8"))
+    return time.perf_counter() - start, result
+
+
+def bench_parser(size_mb: int) -> tuple[float, str]:
+    parser = ResultParser()
+    start = time.perf_counter()
+    for chunk in make_chunks(size_mb):
+        parser.feed(chunk)
+    parser.close()
+    return time.perf_counter() - start, parser.result()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="ResultParser 与正则解析的性能对比")
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[1, 50, 500], help="日志大小(MB)")
+    args = arg_parser.parse_args()
+
+    print(f"{'size':>8} {'regex(s)':>10} {'parser(s)':>10} {'MB/s(parser)':>14}")
+    for size_mb in args.sizes:
+        regex_time, regex_result = bench_regex(size_mb)
+        parser_time, parser_result = bench_parser(size_mb)
+        assert regex_result == parser_result, "解析结果不一致"
+        print(f"{size_mb:>6}MB {regex_time:>10.3f} {parser_time:>10.3f} {size_mb / parser_time:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -8,7 +8,15 @@ result_backend = 'redis://:xiaofengfeng@redis:6379/0'
 
 # 其他常见配置（可选）
 task_serializer = 'json'
-result_serializer = 'json'
+# 结果使用 msgpack + 压缩存储，大结果卸载到文件（见 app/result_store.py）
+result_serializer = 'tasker'
 accept_content = ['json']
+result_accept_content = ['json', 'tasker']
 timezone = 'Asia/Shanghai'  # 可根据需要设置时区
 enable_utc = True
+
+# 线程池并发执行时每次只预取一个任务，避免单个 worker 囤积任务
+worker_prefetch_multiplier = 1
+
+# 发送任务事件，api 的 worker 注册表据此实时统计各 worker 正在执行的任务数
+worker_send_task_events = True
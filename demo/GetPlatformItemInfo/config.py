@@ -1,7 +1,16 @@
 # 定义并解析命令行参数。
 import argparse
-
+import ast
 import importlib
+import importlib.util
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+
+logger = logging.getLogger(__name__)
 
 # 只维护一个完整路径列表
 # platform_class_paths = [
@@ -22,6 +31,35 @@ platform_class_map = {
 platform_items = platform_class_map.keys()
 
 
+def read_url_pattern(module_path: str) -> str:
+    """
+    从平台模块的源码中读取模块级的 URL_PATTERN（平台 filter 使用的同一个正则）
+    只解析源码不执行，平台模块及其依赖仍在首次使用时才导入
+    """
+    spec = importlib.util.find_spec(module_path)
+    with open(spec.origin, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=spec.origin)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == "URL_PATTERN" for t in node.targets):
+            return ast.literal_eval(node.value)
+    raise ValueError(f"{module_path} 未定义 URL_PATTERN")
+
+
+# 各平台可处理的链接（正则），用于在导入平台模块前确定链接所属的平台
+platform_url_patterns = {_type: read_url_pattern(class_path.rsplit(".", 1)[0])
+                         for _type, class_path in platform_class_map.items()}
+
+# 合并为一个预编译的正则，命名分组为平台类型，一次匹配即可确定平台（各正则去掉开头的 ^ 后放入分组）
+_url_router = re.compile("^(?:" + "|".join(f"(?P<{_type}>{pattern.removeprefix('^')})"
+                                           for _type, pattern in platform_url_patterns.items()) + ")")
+
+# 各平台模块的导入耗时（秒），平台首次使用时记录
+import_times: dict[str, float] = {}
+
+# 平台类型 -> 平台实例（平台实例无状态，可在多个链接间复用）
+_platforms: dict[str, object] = {}
+
+
 # 动态加载类
 def load_class(class_path: str):
     module_path, class_name = class_path.rsplit(".", 1)
@@ -29,23 +67,57 @@ def load_class(class_path: str):
     return getattr(module, class_name)
 
 
+# 按平台类型取出平台实例，平台模块在首次使用时才导入，且只导入一次
+def get_platform(_type: str):
+    p = _platforms.get(_type)
+    if p is None:
+        class_path = platform_class_map.get(_type)
+        if class_path is None:
+            return None
+        started = time.perf_counter()
+        platform_class = load_class(class_path)
+        import_times[_type] = time.perf_counter() - started
+        logger.info(f"加载平台 {_type} 耗时 {import_times[_type]:.3f}s")
+        p = _platforms[_type] = platform_class()
+    return p
+
+
+# 链接所属的平台类型，不属于任何平台时返回 None
+def route(url: str) -> str | None:
+    m = _url_router.match(url)
+    return m.lastgroup if m is not None else None
+
+
 # 构建平台实例
 def make_platform(url: str):
-    for class_path in platform_class_map.values():
-        platform_class = load_class(class_path)
-        p = platform_class()
-        if p.filter(url):
-            return p
-    return None
+    _type = route(url)
+    if _type is None:
+        return None
+    p = get_platform(_type)
+    return p if p is not None and p.filter(url) else None
 
 
 def make_platform_from_type(_type: str):
-    for class_path in platform_class_map.values():
-        platform_class = load_class(class_path)
-        p = platform_class()
-        if p.type() == _type:
-            return p
-    return None
+    return get_platform(_type)
+
+
+def benchmark_imports() -> dict[str, float]:
+    """
+    在独立的子进程中分别导入各平台模块，返回 平台类型 -> 导入耗时（秒）
+    每个平台使用全新的解释器，耗时不受其他平台已导入的公共依赖影响
+    """
+    times = {}
+    for _type, class_path in platform_class_map.items():
+        module_path = class_path.rsplit(".", 1)[0]
+        code = ("import time, importlib; started = time.perf_counter(); "
+                f"importlib.import_module({module_path!r}); print(time.perf_counter() - started)")
+        ret = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        if ret.returncode != 0:
+            logger.warning(f"导入平台 {_type} 失败: {ret.stderr.strip().splitlines()[-1:]}")
+            continue
+        times[_type] = float(ret.stdout.strip().splitlines()[-1])
+    return times
 
 
 def _parse_args() -> dict:
@@ -65,3 +137,9 @@ def _parse_args() -> dict:
                         required=False)
 
     return parser.parse_args().__dict__
+
+
+# 启动耗时基准：python config.py，输出各平台模块的导入耗时
+if __name__ == '__main__':
+    for _type, seconds in sorted(benchmark_imports().items(), key=lambda it: -it[1]):
+        print(f"{_type:<12} {seconds:.3f}s")
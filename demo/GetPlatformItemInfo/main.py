@@ -1,10 +1,12 @@
 import asyncio
 import logging
-import traceback
+import sys
 
 from Result import Result, Item
 from config import _parse_args, make_platform
-from platforms.base import ActionResultItem
+from platforms.crawlers.client_pool import close_shared_clients
+from runner import run_urls, print_item, STREAM_RESULTS
+import startup_profile
 
 # 日志配置，建议你根据生产环境实际需要调整
 logging.basicConfig(
@@ -29,30 +31,28 @@ async def main():
 
     urls: list[str] = urls[0]
 
-    items: list[Item] = []
-    for url in urls:
-        platform = make_platform(url)
-        if platform is not None:
-            try:
-                it: ActionResultItem = await platform.action(url=url, **_config)
+    platforms = [make_platform(url) for url in urls]
 
-                if it is not None:
-                    _item = Item()
-                    _item.__dict__ = it.__dict__.copy()
+    # 并行预热各平台接口的连接，后续请求直接复用
+    warmups = {p.type(): p for p in platforms if p is not None}
+    await asyncio.gather(*(p.warmup() for p in warmups.values()), return_exceptions=True)
 
-                    # 固定参数
-                    _item.url = url
-                    _item.type = platform.type()
-
-                    items.append(_item)
-            except Exception as e:
-                logger.error(e)
-                logger.error("Traceback:\n%s", traceback.format_exc())
+    # 按平台分组并发处理，结果保持输入顺序
+    results = await run_urls(urls, platforms, on_item=print_item if STREAM_RESULTS else None, **_config)
+    items: list[Item] = [item for item in results if item is not None]
 
     Result(success=len(items) > 0, items=items, cookies=None).print()
 
 
 if __name__ == '__main__':
+    # STARTUP_PROFILE=true 时输出启动阶段各包的导入耗时
+    if startup_profile.enabled():
+        sys.exit(startup_profile.run_profiled())
+
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
-    loop.run_until_complete(main())
+    try:
+        loop.run_until_complete(main())
+    finally:
+        # 关闭共享的 HTTP 客户端（连接池）
+        loop.run_until_complete(close_shared_clients())
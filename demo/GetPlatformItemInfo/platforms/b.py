@@ -3,14 +3,9 @@ import logging
 import random
 import re
 from typing import Optional
-import requests
 import json
 
-from douyin_tiktok_scraper.scraper import Scraper
-
 from .base import PlatformAction, ActionResultItem, Comment, FeedsItem
-from .crawlers.bilibili.web.web_crawler import BilibiliWebCrawler
-from bilibili_api import user
 
 # 配置日志格式
 logging.basicConfig(
@@ -19,9 +14,29 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# 全局爬虫实例
-_scraper = Scraper()  # 抖音/TikTok爬虫
-_crawler = BilibiliWebCrawler()  # B站爬虫
+# 全局爬虫实例，首次使用时创建
+__scraper = None  # 抖音/TikTok爬虫
+__crawler = None  # B站爬虫
+
+
+# 动态加载
+def _scraper():
+    from douyin_tiktok_scraper.scraper import Scraper
+    global __scraper
+    if __scraper is None:
+        __scraper = Scraper()
+    return __scraper
+
+
+def _crawler():
+    from .crawlers.bilibili.web.web_crawler import BilibiliWebCrawler
+    global __crawler
+    if __crawler is None:
+        __crawler = BilibiliWebCrawler()
+    return __crawler
+
+# 可处理的链接（config 在导入本模块前读取它来路由链接，须为字符串字面量）
+URL_PATTERN = r'^https://www\.bilibili\.com/video/'
 
 # 常量定义
 COMMENTS_PER_PAGE = 20  # 每页评论数
@@ -32,7 +47,7 @@ MAX_SLEEP_TIME = 3.0  # 最大休眠时间(秒)
 
 async def hybrid_parsing(url: str) -> dict:
     """混合解析(Douyin/TikTok URL)"""
-    return await _scraper.hybrid_parsing(url)
+    return await _scraper().hybrid_parsing(url)
 
 
 def filter_duplicate_comments(comments: list[Comment]) -> list[Comment]:
@@ -56,6 +71,7 @@ class BPlatformAction(PlatformAction):
         result: list[FeedsItem] = []
         try:
             await self._random_delay()  # 随机延迟防止被封
+            from bilibili_api import user
             u = user.User(uid=uid)
             # 获取用户所有视频
             videos = await u.get_videos()
@@ -105,7 +121,7 @@ class BPlatformAction(PlatformAction):
                 result.video_url = info.get('video_url')
 
             # 2. 获取视频ID和BV号
-            video_id = await _scraper.get_bilibili_video_id(original_url=url)
+            video_id = await _scraper().get_bilibili_video_id(original_url=url)
             bv = video_id.split("/")[1]
 
             # 3. 获取视频详情
@@ -142,7 +158,7 @@ class BPlatformAction(PlatformAction):
             视频数据字典(可能为None)
         """
         try:
-            response = await _crawler.fetch_one_video(bv)
+            response = await _crawler().fetch_one_video(bv)
             return response.get('data')
         except Exception as e:
             logger.error("获取BV %s 视频详情出错: %s", bv, str(e))
@@ -202,7 +218,7 @@ class BPlatformAction(PlatformAction):
         while True:
             try:
                 logger.info("正在获取第%d页评论...", page_number + 1)
-                response = await _crawler.fetch_video_comments(bv_id=bv, pn=page_number)
+                response = await _crawler().fetch_video_comments(bv_id=bv, pn=page_number)
                 replies = response['data'].get('replies', [])
 
                 if not replies:  # 没有更多评论
@@ -261,9 +277,12 @@ class BPlatformAction(PlatformAction):
         Returns:
             bool: 是否是B站视频URL
         """
-        pattern = r'^https://www\.bilibili\.com/video/'
-        return re.match(pattern, url) is not None
+        return re.match(URL_PATTERN, url) is not None
 
     def type(self):
         """返回平台类型标识符"""
         return "b"
+
+    async def warmup(self):
+        """预先建立到B站接口的连接"""
+        await _crawler().warmup()
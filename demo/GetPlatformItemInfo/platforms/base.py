@@ -2,7 +2,6 @@ import os
 import shutil
 import sys
 
-import ffmpeg
 from pydantic import BaseModel
 
 
@@ -10,6 +9,8 @@ def is_video_playable(video_url: str, header: dict[str, str] = None) -> float:
     """
     判断给定视频 url 是否可以正常打开和播放
     """
+    import ffmpeg
+
     probe_kwargs = dict(
         v='error',
         select_streams='v:0',
@@ -176,6 +177,10 @@ class FeedsItem(BaseModel):
 
 
 class PlatformAction(BaseModel):
+    # 预先建立到平台接口的连接（在执行任务前调用，可选）
+    async def warmup(self):
+        pass
+
     # 执行任务
     async def action(self, url: str, *args, **kwargs) -> ActionResultItem:
         pass
@@ -39,6 +39,7 @@ import re
 
 from httpx import Response, AsyncBaseTransport
 
+from .client_pool import client_pool, connection_stats, resolve_http2
 from .utils.logger import logger
 from .utils.api_exceptions import (
     APIError,
@@ -66,16 +67,24 @@ class BaseCrawler:
             timeout: int = 10,
             max_tasks: int = 50,
             crawler_headers: dict = {},
+            shared_client: bool = False,
+            http2: bool = None,
     ):
-        if isinstance(proxies, dict):
+        # HTTP/2 多路复用，None 时按 CRAWLER_HTTP2 设置，未安装 h2 时不启用 / HTTP/2 multiplexing
+        self.http2 = resolve_http2(http2)
+        # 使用进程内共享的客户端（复用连接），退出时不关闭 / Use the process-wide shared client
+        self.shared_client = shared_client
+        if shared_client:
+            self.proxies = {k: v for k, v in (proxies or {}).items() if v}
+        elif isinstance(proxies, dict):
             # self.proxies = proxies
             self.proxies = {}
             if proxies.get("http://") is not None:
                 self.proxies["http://"] = httpx.AsyncHTTPTransport(proxy=f"{proxies.get("http://", None)}",
-                                                                   verify=False)
+                                                                   verify=False, http2=self.http2)
             if proxies.get("https://") is not None:
                 self.proxies["https://"] = httpx.AsyncHTTPTransport(proxy=f"{proxies.get("https://", None)}",
-                                                                    verify=False)
+                                                                    verify=False, http2=self.http2)
 
             # [f"{k}://{v}" for k, v in proxies.items()]
         else:
@@ -94,12 +103,17 @@ class BaseCrawler:
 
         # 业务逻辑重试次数 / Business logic retry count
         self._max_retries = max_retries
-        # 底层连接重试次数 / Underlying connection retry count
-        self.atransport = httpx.AsyncHTTPTransport(retries=max_retries)
-
         # 超时等待时间 / Timeout waiting time
         self._timeout = timeout
         self.timeout = httpx.Timeout(timeout)
+
+        if shared_client:
+            self.aclient = client_pool.get(proxies, self.crawler_headers, timeout=timeout, retries=max_retries,
+                                           max_connections=max_connections, http2=self.http2)
+            return
+
+        # 底层连接重试次数 / Underlying connection retry count
+        self.atransport = httpx.AsyncHTTPTransport(retries=max_retries, http2=self.http2)
         # 异步客户端 / Asynchronous client
         self.aclient = httpx.AsyncClient(
             headers=self.crawler_headers,
@@ -107,8 +121,43 @@ class BaseCrawler:
             timeout=self.timeout,
             limits=self.limits,
             transport=self.atransport,
+            event_hooks={"request": [connection_stats.on_request]},
         )
 
+    async def warmup(self, hosts: list[str]) -> dict[str, bool]:
+        """预先建立连接 (Pre-open connections)
+
+        对每个主机发送一次 HEAD 请求，提前完成 DNS 解析、TCP 与 TLS 握手，连接留在连接池中供后续请求复用；
+        HTTP/2 下并发的首批请求可直接多路复用同一连接，而不是各自新建连接
+
+        Args:
+            hosts (list[str]): 主机名或 URL，如 www.douyin.com / https://api.bilibili.com
+
+        Returns:
+            dict[str, bool]: 各主机是否预热成功 (Whether each host was warmed up)
+        """
+
+        async def _open(host: str) -> bool:
+            url = host if "://" in host else f"https://{host}/"
+            try:
+                await self.aclient.head(url)
+                return True
+            except httpx.HTTPError as error:
+                logger.warning(f"预热连接失败 {url}: {error}")
+                return False
+
+        results = await asyncio.gather(*(_open(host) for host in hosts))
+        return dict(zip(hosts, results))
+
+    @staticmethod
+    def connection_stats() -> dict[str, dict[str, int]]:
+        """连接复用统计 (Connection reuse statistics)
+
+        Returns:
+            dict: 主机 -> 请求数、新建连接数、复用数、HTTP/2 请求数
+        """
+        return connection_stats.snapshot()
+
     async def fetch_response(self, endpoint: str) -> Response:
         """获取数据 (Get data)
 
@@ -410,10 +459,11 @@ class BaseCrawler:
             raise APIResponseError(f"HTTP状态错误: {status_code}")
 
     async def close(self):
-        await self.aclient.aclose()
+        if not self.shared_client:
+            await self.aclient.aclose()
 
     async def __aenter__(self):
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.aclient.aclose()
+        await self.close()
@@ -0,0 +1,187 @@
+import asyncio
+import functools
+import importlib.util
+import os
+from typing import AsyncIterator
+
+import httpx
+
+from .utils.logger import logger
+
+# HTTP/2 需安装 h2，服务端不支持时通过 ALPN 自动回退到 HTTP/1.1
+HTTP2_AVAILABLE: bool = importlib.util.find_spec("h2") is not None
+# 默认是否启用 HTTP/2
+HTTP2_ENABLED: bool = HTTP2_AVAILABLE and os.getenv("CRAWLER_HTTP2", "true").lower() in ("1", "true", "yes", "on")
+# 同一主机同时进行的请求数上限（HTTP/1.1 下即连接数上限）
+HOST_CONNECTIONS: int = int(os.getenv("CRAWLER_HOST_CONNECTIONS", 10))
+# 空闲连接保持时间（秒）
+KEEPALIVE_EXPIRY: float = float(os.getenv("CRAWLER_KEEPALIVE_EXPIRY", 60))
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """响应体读取完毕或关闭时释放主机的并发名额"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, semaphore: asyncio.Semaphore):
+        self._stream = stream
+        self._semaphore = semaphore
+        self._released = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._semaphore.release()
+
+
+class HostLimitedTransport(httpx.AsyncBaseTransport):
+    """限制每个主机同时进行的请求数"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, per_host: int):
+        self._transport = transport
+        self._per_host = per_host
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self._per_host)
+        await semaphore.acquire()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            semaphore.release()
+            raise
+        response.stream = _ReleasingStream(response.stream, semaphore)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def resolve_http2(http2: bool | None) -> bool:
+    """None 表示使用默认设置，未安装 h2 时始终为 False"""
+    return HTTP2_AVAILABLE and (HTTP2_ENABLED if http2 is None else http2)
+
+
+class ConnectionStats:
+    """
+    按主机统计请求数、新建连接数与 HTTP/2 请求数（通过 httpx 的 trace 扩展）
+    复用数 = 请求数 - 新建连接数，用于确认请求确实复用了连接
+    """
+
+    def __init__(self):
+        self._hosts: dict[str, dict[str, int]] = {}
+
+    def _host(self, host: str) -> dict[str, int]:
+        counters = self._hosts.get(host)
+        if counters is None:
+            counters = self._hosts[host] = {"requests": 0, "connections": 0, "http2": 0}
+        return counters
+
+    async def on_request(self, request: httpx.Request):
+        """httpx 的 request 事件钩子"""
+        request.extensions["trace"] = functools.partial(self._trace, request.url.host)
+
+    async def _trace(self, host: str, event: str, info: dict):
+        # 请求在发出请求头时计数，连接失败的请求不计入
+        if event == "connection.connect_tcp.complete":
+            self._host(host)["connections"] += 1
+        elif event == "http11.send_request_headers.started":
+            self._host(host)["requests"] += 1
+        elif event == "http2.send_request_headers.started":
+            counters = self._host(host)
+            counters["requests"] += 1
+            counters["http2"] += 1
+
+    def snapshot(self) -> dict[str, dict[str, int]]:
+        return {host: {**c, "reused": max(c["requests"] - c["connections"], 0)} for host, c in self._hosts.items()}
+
+    def log(self):
+        for host, c in self.snapshot().items():
+            logger.info(f"连接复用统计 {host}: 请求 {c['requests']}，新建连接 {c['connections']}，"
+                        f"复用 {c['reused']}，HTTP/2 请求 {c['http2']}")
+
+
+# 进程级单例
+connection_stats = ConnectionStats()
+
+
+def make_transport(proxy: str | None = None, retries: int = 1, max_connections: int = 50, http2: bool = False,
+                   per_host: int = 0, verify: bool = True) -> httpx.AsyncBaseTransport:
+    transport = httpx.AsyncHTTPTransport(
+        proxy=proxy,
+        verify=verify,
+        retries=retries,
+        http2=http2,
+        limits=httpx.Limits(max_connections=max_connections, keepalive_expiry=KEEPALIVE_EXPIRY),
+    )
+    return HostLimitedTransport(transport, per_host) if per_host > 0 else transport
+
+
+class ClientPool:
+    """
+    进程内共享的 httpx.AsyncClient，按代理与请求头区分
+    同一组代理与请求头的请求复用同一个客户端的 keep-alive 连接（HTTP/2 下多路复用同一连接），
+    省去每次请求的 TCP 与 TLS 握手；进程结束前调用 aclose 关闭
+    """
+
+    def __init__(self, per_host: int = HOST_CONNECTIONS):
+        self.per_host = per_host
+        self._clients: dict[tuple, httpx.AsyncClient] = {}
+
+    @staticmethod
+    def _key(proxies: dict | None, headers: dict | None, timeout: float, retries: int, http2: bool) -> tuple:
+        proxies = proxies or {}
+        return (proxies.get("http://"), proxies.get("https://"),
+                tuple(sorted((headers or {}).items())), timeout, retries, http2)
+
+    def get(self, proxies: dict | None = None, headers: dict | None = None, timeout: float = 10,
+            retries: int = 1, max_connections: int = 50, http2: bool | None = None) -> httpx.AsyncClient:
+        http2 = resolve_http2(http2)
+        key = self._key(proxies, headers, timeout, retries, http2)
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            client = self._clients[key] = self._create(proxies or {}, headers, timeout, retries, max_connections,
+                                                       http2)
+        return client
+
+    def _create(self, proxies: dict, headers: dict | None, timeout: float, retries: int,
+                max_connections: int, http2: bool) -> httpx.AsyncClient:
+        options = dict(retries=retries, max_connections=max_connections, http2=http2, per_host=self.per_host)
+        mounts = {}
+        for scheme in ("http://", "https://"):
+            if proxies.get(scheme):
+                mounts[scheme] = make_transport(proxy=proxies[scheme], verify=False, **options)
+        logger.info(f"创建共享 HTTP 客户端: http2={http2}, 代理={list(mounts) or None}, 连接池数={len(self._clients) + 1}")
+        return httpx.AsyncClient(
+            headers=headers or {},
+            mounts=mounts or None,
+            timeout=httpx.Timeout(timeout),
+            transport=make_transport(**options),
+            event_hooks={"request": [connection_stats.on_request]},
+        )
+
+    async def aclose(self):
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"关闭 HTTP 客户端失败: {e}")
+
+
+# 进程级单例
+client_pool = ClientPool()
+
+
+async def close_shared_clients():
+    connection_stats.log()
+    await client_pool.aclose()
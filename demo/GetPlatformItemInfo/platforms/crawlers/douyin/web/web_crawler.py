@@ -89,6 +89,13 @@ class DouyinWebCrawler:
         }
         return kwargs
 
+    # 预先建立到抖音接口的连接
+    async def warmup(self):
+        kwargs = await self.get_douyin_headers()
+        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"], shared_client=True)
+        async with base_crawler as crawler:
+            return await crawler.warmup([DouyinAPIEndpoints.DOUYIN_DOMAIN])
+
     "-------------------------------------------------------handler接口列表-------------------------------------------------------"
 
     # 获取单个作品数据
@@ -96,7 +103,7 @@ class DouyinWebCrawler:
         # 获取抖音的实时Cookie
         kwargs = await self.get_douyin_headers()
         # 创建一个基础爬虫
-        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
+        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"], shared_client=True)
         async with base_crawler as crawler:
             # 创建一个作品详情的BaseModel参数
             params = PostDetail(aweme_id=aweme_id)
@@ -118,7 +125,7 @@ class DouyinWebCrawler:
     # 获取用户发布作品数据
     async def fetch_user_post_videos(self, sec_user_id: str, max_cursor: int, count: int):
         kwargs = await self.get_douyin_headers()
-        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
+        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"], shared_client=True)
         async with base_crawler as crawler:
             params = UserPost(sec_user_id=sec_user_id, max_cursor=max_cursor, count=count)
             # endpoint = BogusManager.xb_model_2_endpoint(
@@ -138,7 +145,7 @@ class DouyinWebCrawler:
     # 获取用户喜欢作品数据
     async def fetch_user_like_videos(self, sec_user_id: str, max_cursor: int, count: int):
         kwargs = await self.get_douyin_headers()
-        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
+        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"], shared_client=True)
         async with base_crawler as crawler:
             params = UserLike(sec_user_id=sec_user_id, max_cursor=max_cursor, count=count)
             # endpoint = BogusManager.xb_model_2_endpoint(
@@ -158,7 +165,7 @@ class DouyinWebCrawler:
     async def fetch_user_collection_videos(self, cookie: str, cursor: int = 0, count: int = 20):
         kwargs = await self.get_douyin_headers()
         kwargs["headers"]["Cookie"] = cookie
-        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
+        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"], shared_client=True)
         async with base_crawler as crawler:
             params = UserCollection(cursor=cursor, count=count)
             endpoint = BogusManager.xb_model_2_endpoint(
@@ -170,7 +177,7 @@ class DouyinWebCrawler:
     # 获取用户合辑作品数据
     async def fetch_user_mix_videos(self, mix_id: str, cursor: int = 0, count: int = 20):
         kwargs = await self.get_douyin_headers()
-        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
+        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"], shared_client=True)
         async with base_crawler as crawler:
             params = UserMix(mix_id=mix_id, cursor=cursor, count=count)
             endpoint = BogusManager.xb_model_2_endpoint(
@@ -182,7 +189,7 @@ class DouyinWebCrawler:
     # 获取用户直播流数据
     async def fetch_user_live_videos(self, webcast_id: str, room_id_str=""):
         kwargs = await self.get_douyin_headers()
-        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
+        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"], shared_client=True)
         async with base_crawler as crawler:
             params = UserLive(web_rid=webcast_id, room_id_str=room_id_str)
             endpoint = BogusManager.xb_model_2_endpoint(
@@ -194,7 +201,7 @@ class DouyinWebCrawler:
     # 获取指定用户的直播流数据
     async def fetch_user_live_videos_by_room_id(self, room_id: str):
         kwargs = await self.get_douyin_headers()
-        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
+        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"], shared_client=True)
         async with base_crawler as crawler:
             params = UserLive2(room_id=room_id)
             endpoint = BogusManager.xb_model_2_endpoint(
@@ -206,7 +213,7 @@ class DouyinWebCrawler:
     # 获取直播间送礼用户排行榜
     async def fetch_live_gift_ranking(self, room_id: str, rank_type: int = 30):
         kwargs = await self.get_douyin_headers()
-        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
+        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"], shared_client=True)
         async with base_crawler as crawler:
             params = LiveRoomRanking(room_id=room_id, rank_type=rank_type)
             endpoint = BogusManager.xb_model_2_endpoint(
@@ -218,7 +225,7 @@ class DouyinWebCrawler:
     # 获取指定用户的信息
     async def handler_user_profile(self, sec_user_id: str):
         kwargs = await self.get_douyin_headers()
-        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
+        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"], shared_client=True)
         async with base_crawler as crawler:
             params = UserProfile(sec_user_id=sec_user_id)
             endpoint = BogusManager.xb_model_2_endpoint(
@@ -230,7 +237,7 @@ class DouyinWebCrawler:
     # 获取指定视频的评论数据
     async def fetch_video_comments(self, aweme_id: str, cursor: int = 0, count: int = 20):
         kwargs = await self.get_douyin_headers()
-        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
+        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"], shared_client=True)
         async with base_crawler as crawler:
             params = PostComments(aweme_id=aweme_id, cursor=cursor, count=count)
             endpoint = BogusManager.xb_model_2_endpoint(
@@ -242,7 +249,7 @@ class DouyinWebCrawler:
     # 指定视频的评论进行回复
     async def fetch_comment_publish(self, aweme_id: str, reply_id: str, text: str):
         kwargs = await self.get_douyin_headers()
-        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
+        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"], shared_client=True)
         async with base_crawler as crawler:
             cookie: str = kwargs.get('headers').get('Cookie')
 
@@ -289,7 +296,7 @@ class DouyinWebCrawler:
     # 获取指定视频的评论回复数据
     async def fetch_video_comments_reply(self, item_id: str, comment_id: str, cursor: int = 0, count: int = 20):
         kwargs = await self.get_douyin_headers()
-        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
+        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"], shared_client=True)
         async with base_crawler as crawler:
             params = PostCommentsReply(item_id=item_id, comment_id=comment_id, cursor=cursor, count=count)
             endpoint = BogusManager.xb_model_2_endpoint(
@@ -301,7 +308,7 @@ class DouyinWebCrawler:
     # 获取抖音热榜数据
     async def fetch_hot_search_result(self):
         kwargs = await self.get_douyin_headers()
-        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"])
+        base_crawler = BaseCrawler(proxies=kwargs["proxies"], crawler_headers=kwargs["headers"], shared_client=True)
         async with base_crawler as crawler:
             params = BaseRequestModel()
             endpoint = BogusManager.xb_model_2_endpoint(
@@ -5,10 +5,7 @@ import random
 import re
 import traceback
 
-from douyin_tiktok_scraper.scraper import Scraper
-
 from .base import PlatformAction, ActionResultItem, find_first_playable_video, Comment, FeedsItem
-from .reply_messages.douyin_reply_message import douyin_reply_message
 
 # 日志配置，建议你根据生产环境实际需要调整
 logging.basicConfig(
@@ -17,11 +14,19 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-_scraper = Scraper()
-
+__douyin_scraper = None
 __douyin_web_crawler = None
 
 
+# 动态加载
+def _douyin_scraper():
+    from douyin_tiktok_scraper.scraper import Scraper
+    global __douyin_scraper
+    if __douyin_scraper is None:
+        __douyin_scraper = Scraper()
+    return __douyin_scraper
+
+
 # 动态加载
 def _douyin_web_crawler():
     from .crawlers.douyin.web.web_crawler import DouyinWebCrawler
@@ -110,6 +115,10 @@ async def page_comments(comments: list[Comment], video_id: str, cursor: int = 0,
     pass
 
 
+# 可处理的链接（config 在导入本模块前读取它来路由链接，须为字符串字面量）
+URL_PATTERN = r'^https://www\.douyin\.com/'
+
+
 # 过滤重复的回复数据
 def filter_duplicate_comments(comments: list[Comment]) -> list[Comment]:
     # Create a dictionary to store unique comments based on their cid
@@ -126,17 +135,20 @@ def filter_duplicate_comments(comments: list[Comment]) -> list[Comment]:
 class DouyinPlatformAction(PlatformAction):
 
     def filter(self, url: str) -> bool:
-        pattern = r'^https://www\.douyin\.com/'
-        return re.match(pattern, url) is not None
+        return re.match(URL_PATTERN, url) is not None
 
     def type(self):
         return "douyin"
 
+    async def warmup(self):
+        await _douyin_web_crawler().warmup()
+
     async def send_message(self, proxy: str, cookies: str, uid: str, message: str, *args, **kwargs) -> list[bool| str]:
         from .send_messages.douyin_send_message import douyin_send_message
         return await douyin_send_message(proxy=proxy, cookies=cookies, uid=uid, message=message, *args, **kwargs)
 
     async def reply_message(self, proxy: str, cookies: str, ai_url: str, max_chat_count: int,no_chat_timeout:int, *args, **kwargs) -> [bool, str]:
+        from .reply_messages.douyin_reply_message import douyin_reply_message
         await douyin_reply_message(proxy=proxy, cookies=cookies, ai_url=ai_url,max_chat_count=max_chat_count,no_chat_timeout=no_chat_timeout, *args, **kwargs)
         # logger.info("reply_message 执行完毕")
         return True, "reply_message 执行完毕"
@@ -185,7 +197,7 @@ class DouyinPlatformAction(PlatformAction):
         logger.info(f"comment: skip_count - max_count: %s - %s ", skip_comment_count, max_comment_count)
 
         # ------------------ 取出视频id
-        video_id: str = await _scraper.get_douyin_video_id(original_url=url)
+        video_id: str = await _douyin_scraper().get_douyin_video_id(original_url=url)
         logger.info("douyin video id: %s", video_id)
         item.id = video_id
 
@@ -251,8 +263,9 @@ class DouyinPlatformAction(PlatformAction):
         if bit_rate is not None:
             # 取出一个最合适的视频(分辨率+视频编码)
             video_item: dict = find_best_video(bit_rate)
-            # 取出一个可以播放的视频
-            item.video_url, item.video_duration = find_first_playable_video(video_item.get("play_addr").get("url_list"))
+            # 取出一个可以播放的视频（ffprobe 为阻塞调用，放到线程中执行，不阻塞其他链接的处理）
+            item.video_url, item.video_duration = await asyncio.to_thread(
+                find_first_playable_video, video_item.get("play_addr").get("url_list"))
 
         # ------------------ 作者信息
         author: dict = aweme_detail.get("author")
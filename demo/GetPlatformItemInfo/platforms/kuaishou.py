@@ -8,7 +8,6 @@ import traceback
 
 import httpx
 from bs4 import BeautifulSoup
-from playwright.async_api import async_playwright
 
 from .base import PlatformAction, ActionResultItem, Comment, getChromeExecutablePath, FeedsItem
 
@@ -19,6 +18,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 可处理的链接（config 在导入本模块前读取它来路由链接，须为字符串字面量）
+URL_PATTERN = r'^https://www\.kuaishou\.com/'
+
 
 # 过滤重复的回复数据
 def filter_duplicate_comments(comments: list[Comment]) -> list[Comment]:
@@ -448,8 +450,7 @@ class KuaishouPlatformAction(PlatformAction):
         return item
 
     def filter(self, url: str) -> bool:
-        pattern = r'^https://www\.kuaishou\.com/'
-        return re.match(pattern, url) is not None
+        return re.match(URL_PATTERN, url) is not None
 
     def type(self):
         return "kuaishou"
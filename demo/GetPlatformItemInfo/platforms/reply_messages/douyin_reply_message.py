@@ -13,7 +13,7 @@ from urllib.parse import urlparse
 import requests
 from playwright.async_api import async_playwright, Page, Browser, BrowserContext
 
-from ..util.image_utils import find_and_click_image
+from ..util.image_utils import find_and_click_image, set_display_xauth
 
 # 日志配置
 logging.basicConfig(
@@ -320,6 +320,9 @@ async def douyin_reply_message(proxy: str, cookies: str, ai_url: str, max_chat_c
     if proxy:
         args_list.append(f'--proxy-server=https={proxy}')
 
+    # 有界面的浏览器需要 DISPLAY（Xvfb）
+    set_display_xauth()
+
     async with async_playwright() as p:
         browser = await p.chromium.launch(
             headless=False,
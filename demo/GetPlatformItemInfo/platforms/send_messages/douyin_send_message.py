@@ -13,7 +13,7 @@ from playwright._impl._api_structures import SetCookieParam
 from playwright.async_api import async_playwright, Page, Browser, BrowserContext, JSHandle
 from pywebio.platform import page
 
-from ..util.image_utils import find_and_click_image
+from ..util.image_utils import find_and_click_image, set_display_xauth
 
 # 日志配置
 logging.basicConfig(
@@ -415,6 +415,9 @@ async def douyin_send_message(proxy: str, cookies: str, uid: str, message: str,
     if proxy:
         args_list.append(f'--proxy-server=https={proxy}')
 
+    # 有界面的浏览器需要 DISPLAY（Xvfb）
+    set_display_xauth()
+
     async with async_playwright() as p:
         browser = await p.chromium.launch(
             headless=False,
@@ -1,12 +1,10 @@
+import functools
 import logging
 from datetime import datetime
 import os
 import subprocess
 import sys
 
-import cv2
-import numpy as np
-
 # 日志配置
 logging.basicConfig(
     format='%(asctime)s %(levelname)s %(name)s %(message)s',
@@ -34,10 +32,17 @@ def set_display_xauth():
             os.environ['XAUTHORITY'] = out.strip()
 
 
-# 优先设置环境变量
-set_display_xauth()
-
-import pyautogui
+@functools.cache
+def _gui():
+    """
+    首次截屏时才导入 cv2、numpy 与 pyautogui（导入较慢，且 pyautogui 导入时即连接 DISPLAY）
+    导入 pyautogui 前需先设置 DISPLAY 与 XAUTHORITY
+    """
+    set_display_xauth()
+    import cv2
+    import numpy as np
+    import pyautogui
+    return cv2, np, pyautogui
 
 
 def find_and_click_image(template_path, threshold=0.8):
@@ -49,6 +54,8 @@ def find_and_click_image(template_path, threshold=0.8):
         print(f"模板图片未找到: {template_path}")
         return False
 
+    cv2, np, pyautogui = _gui()
+
     # 内存中获取截图 (PIL 格式)
     screenshot_pil = pyautogui.screenshot()
 
@@ -18,12 +18,13 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 可处理的链接（config 在导入本模块前读取它来路由链接，须为字符串字面量）
+URL_PATTERN = r'^https://www\.xiaohongshu\.com/'
 
 
 class XiaohongshuPlatformAction(PlatformAction):
     def filter(self, url: str) -> bool:
-        pattern = r'^https://www\.xiaohongshu\.com/'
-        return re.match(pattern, url) is not None
+        return re.match(URL_PATTERN, url) is not None
 
     def type(self) -> str | None:
         return "xiaohongshu"
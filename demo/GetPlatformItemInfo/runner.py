@@ -0,0 +1,122 @@
+# 并发处理多个链接：按平台分组并行，平台内限制并发数，同一主机的请求之间保持间隔
+import asyncio
+import logging
+import os
+import time
+import traceback
+from typing import Callable
+from urllib.parse import urlparse
+
+from Result import Item
+from platforms.base import PlatformAction, ActionResultItem
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_platform_values(value: str | None, default: float) -> dict[str, float]:
+    """
+    解析按平台配置的数值，如 "2" 或 "douyin=3,b=2,default=1"
+    返回 平台类型 -> 数值，"default" 为未单独配置的平台的取值
+    """
+    values = {"default": default}
+    for part in (value or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, sep, number = part.rpartition("=")
+        values[name.strip() if sep else "default"] = float(number)
+    return values
+
+
+# 每个平台同时处理的链接数，如 "2" 或 "douyin=3,b=2"
+PLATFORM_CONCURRENCY: dict[str, float] = _parse_platform_values(os.getenv("PLATFORM_CONCURRENCY"), 2)
+# 同一主机相邻两次开始处理之间的最小间隔（秒），格式同上
+PLATFORM_HOST_DELAY: dict[str, float] = _parse_platform_values(os.getenv("PLATFORM_HOST_DELAY"), 1)
+# 每完成一个链接即输出一次该链接的结果
+STREAM_RESULTS: bool = os.getenv("STREAM_RESULTS", "false").lower() in ("1", "true", "yes", "on")
+
+
+def _platform_value(values: dict[str, float], _type: str) -> float:
+    return values.get(_type, values["default"])
+
+
+class HostPacer:
+    """同一主机的请求按 delay 秒的间隔依次放行，不同主机互不影响"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self._next_at: dict[str, float] = {}
+
+    async def wait(self, host: str):
+        if self.delay <= 0:
+            return
+        now = time.monotonic()
+        # 先占好时间点再等待，并发的请求依次向后排
+        at = max(self._next_at.get(host, 0), now)
+        self._next_at[host] = at + self.delay
+        if at > now:
+            await asyncio.sleep(at - now)
+
+
+def _to_item(url: str, platform: PlatformAction, it: ActionResultItem) -> Item:
+    _item = Item()
+    _item.__dict__ = it.__dict__.copy()
+
+    # 固定参数
+    _item.url = url
+    _item.type = platform.type()
+    return _item
+
+
+def print_item(index: int, item: Item):
+    """流式输出单个链接的结果，index 为该链接在输入中的位置"""
+    print(f"""
+===result-item===
+{index} {item.model_dump_json(exclude_none=True)}
+===result-item===
+""", flush=True)
+
+
+async def run_urls(urls: list[str],
+                   platforms: list[PlatformAction | None],
+                   on_item: Callable[[int, Item], None] | None = None,
+                   **kwargs) -> list[Item | None]:
+    """
+    并发处理链接，返回与 urls 等长、顺序一致的结果（无法处理或失败的链接为 None）
+    - 按平台分组，各平台并行处理，平台内同时处理的链接数为 PLATFORM_CONCURRENCY
+    - 同一主机相邻两次开始处理之间至少间隔 PLATFORM_HOST_DELAY 秒
+    - 每完成一个链接调用一次 on_item(index, item)
+    """
+    results: list[Item | None] = [None] * len(urls)
+
+    groups: dict[str, list[int]] = {}
+    for index, platform in enumerate(platforms):
+        if platform is not None:
+            groups.setdefault(platform.type(), []).append(index)
+
+    async def run_one(index: int, semaphore: asyncio.Semaphore, pacer: HostPacer):
+        url, platform = urls[index], platforms[index]
+        async with semaphore:
+            await pacer.wait(urlparse(url).hostname or "")
+            started = time.perf_counter()
+            try:
+                it: ActionResultItem = await platform.action(url=url, **kwargs)
+            except Exception as e:
+                logger.error(e)
+                logger.error("Traceback:\n%s", traceback.format_exc())
+                return
+        logger.info(f"[{platform.type()}] 完成 {url}，耗时 {time.perf_counter() - started:.2f}s")
+        if it is not None:
+            results[index] = _to_item(url, platform, it)
+            if on_item is not None:
+                on_item(index, results[index])
+
+    async def run_group(_type: str, indexes: list[int]):
+        concurrency = max(int(_platform_value(PLATFORM_CONCURRENCY, _type)), 1)
+        semaphore = asyncio.Semaphore(concurrency)
+        pacer = HostPacer(_platform_value(PLATFORM_HOST_DELAY, _type))
+        logger.info(f"[{_type}] 处理 {len(indexes)} 个链接，并发 {concurrency}，同主机间隔 {pacer.delay}s")
+        await asyncio.gather(*(run_one(index, semaphore, pacer) for index in indexes))
+
+    await asyncio.gather(*(run_group(_type, indexes) for _type, indexes in groups.items()))
+    return results
@@ -0,0 +1,53 @@
+# 启动耗时分析：以 python -X importtime 重新运行当前命令，按顶层包汇总各模块的导入耗时
+import os
+import re
+import subprocess
+import sys
+import time
+
+# import time: self [us] | cumulative | imported package
+_IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)")
+
+
+def enabled() -> bool:
+    return os.getenv("STARTUP_PROFILE", "false").lower() in ("1", "true", "yes", "on")
+
+
+def parse_import_times(lines: list[str]) -> dict[str, float]:
+    """按顶层包汇总各模块自身的导入耗时（秒），各包之和即为全部导入耗时"""
+    totals: dict[str, float] = {}
+    for line in lines:
+        m = _IMPORT_TIME_LINE.match(line)
+        if m is None:
+            continue
+        package = m.group(3).split(".")[0]
+        totals[package] = totals.get(package, 0) + int(m.group(1)) / 1e6
+    return totals
+
+
+def report(totals: dict[str, float], elapsed: float, top: int = 20):
+    """输出到 stderr，不影响 stdout 中的结果"""
+    imported = sum(totals.values())
+    print(f"\n===startup-profile=== 总耗时 {elapsed:.3f}s，其中导入 {imported:.3f}s", file=sys.stderr)
+    for package, seconds in sorted(totals.items(), key=lambda it: -it[1])[:top]:
+        print(f"{package:<32} {seconds:8.3f}s {seconds / imported if imported else 0:6.1%}", file=sys.stderr)
+
+
+def run_profiled() -> int:
+    """
+    以 -X importtime 重新运行当前命令，stdout 原样输出，返回子进程的退出码
+    包括运行过程中延迟导入的模块（各平台首次使用时才导入的依赖）
+    """
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-X", "importtime", *sys.orig_argv[1:]],
+                            env={**os.environ, "STARTUP_PROFILE": "false"},
+                            stderr=subprocess.PIPE, text=True, encoding="utf-8", errors="replace")
+    lines = []
+    for line in proc.stderr:
+        if line.startswith("import time:"):
+            lines.append(line)
+        else:
+            sys.stderr.write(line)
+    code = proc.wait()
+    report(parse_import_times(lines), time.perf_counter() - started)
+    return code
@@ -5,4 +5,4 @@ chcp 65001 >nul
 call .\env.bat
 
 
-celery -A app.worker worker --loglevel=info --pool=solo --concurrency=1 -Q celery,test
\ No newline at end of file
+celery -A app.worker worker --loglevel=info --pool=threads --concurrency=4 -Q celery,test,callback
\ No newline at end of file
@@ -0,0 +1,27 @@
+import socket
+import threading
+
+import pytest
+import redis
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture(scope="session")
+def redis_url():
+    """进程内的 fakeredis TCP 服务，kombu / celery 与 redis-py 都可以直接连接"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = fakeredis.TcpFakeServer(("127.0.0.1", port), server_type="redis")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"redis://127.0.0.1:{port}/0"
+    server.shutdown()
+
+
+@pytest.fixture
+def redis_client(redis_url):
+    client = redis.Redis.from_url(redis_url)
+    client.flushall()
+    yield client
+    client.close()
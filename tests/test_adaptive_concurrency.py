@@ -0,0 +1,88 @@
+import pytest
+
+from app.adaptive_concurrency import AdaptiveConcurrency
+from app.resource_budget import ResourceBudget
+
+RELAXED = {"memory_available": 0.6, "memory_pressure": 0.0, "cpu_busy": 0.3, "cpu_steal": 0.0}
+# 介于降低与提高阈值之间
+STEADY = {"memory_available": 0.2, "memory_pressure": 0.0, "cpu_busy": 0.5, "cpu_steal": 0.0}
+
+
+class FakeQoS:
+    def __init__(self):
+        self.value = 0
+
+    def increment_eventually(self, n):
+        self.value += n
+
+    def decrement_eventually(self, n):
+        self.value -= n
+
+
+class FakeConsumer:
+    prefetch_multiplier = 4
+
+    def __init__(self, num_processes):
+        self.pool = type("Pool", (), {"num_processes": num_processes})()
+        self.qos = FakeQoS()
+
+
+def make(concurrency=8, **kwargs):
+    adaptive = AdaptiveConcurrency(ResourceBudget(), **kwargs)
+    adaptive.attach(FakeConsumer(concurrency))
+    return adaptive
+
+
+def test_adjust_without_consumer_is_noop():
+    assert AdaptiveConcurrency(ResourceBudget()).adjust(RELAXED) == 0
+
+
+@pytest.mark.parametrize("load", [
+    {**RELAXED, "memory_available": 0.1},
+    {**RELAXED, "memory_pressure": 25.0},
+    {**RELAXED, "cpu_steal": 0.2},
+])
+def test_overload_scales_down_by_a_quarter(load):
+    adaptive = make(8)
+    assert adaptive.adjust(load) == 6
+    assert adaptive.budget.limit == 6
+    assert adaptive._consumer.qos.value == -2 * FakeConsumer.prefetch_multiplier
+
+
+def test_overload_decreases_by_at_least_one_and_stops_at_min():
+    adaptive = make(3, min_concurrency=2)
+    overloaded = {**RELAXED, "memory_available": 0.05}
+    assert adaptive.adjust(overloaded) == 2
+    assert adaptive.adjust(overloaded) == 2
+    assert adaptive.budget.limit == 2
+
+
+def test_missing_psi_is_not_overload():
+    adaptive = make(4)
+    assert adaptive.adjust({**STEADY, "memory_pressure": None}) == 4
+
+
+def test_scale_up_needs_consecutive_relaxed_rounds():
+    adaptive = make(8, scale_up_rounds=3)
+    adaptive.adjust({**RELAXED, "memory_available": 0.05})
+    assert adaptive.concurrency == 6
+
+    adaptive.adjust(RELAXED)
+    adaptive.adjust(RELAXED)
+    # 中间出现一次非宽松采样会重新计数
+    adaptive.adjust(STEADY)
+    adaptive.adjust(RELAXED)
+    adaptive.adjust(RELAXED)
+    assert adaptive.concurrency == 6
+    assert adaptive.adjust(RELAXED) == 7
+    assert adaptive.budget.limit == 7
+    assert adaptive._consumer.qos.value == -1 * FakeConsumer.prefetch_multiplier
+
+
+def test_scale_up_stops_at_worker_concurrency():
+    adaptive = make(4, scale_up_rounds=1)
+    for _ in range(5):
+        assert adaptive.adjust(RELAXED) == 4
+    # 上限未变化时不调整资源预算与预取数
+    assert adaptive.budget.limit == 0
+    assert adaptive._consumer.qos.value == 0
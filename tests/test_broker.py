@@ -0,0 +1,98 @@
+import json
+
+import pytest
+from celery import Celery
+from celery.signals import after_task_publish
+from kombu import Connection
+
+from app.broker import BatchPublisher
+
+QUEUE = "celery"
+
+
+@pytest.fixture
+def celery_app(redis_url, redis_client):
+    app = Celery("tests", broker=redis_url, backend=redis_url, set_as_current=False)
+
+    @app.task(name="tests.add")
+    def add(x=0, y=0):
+        return x + y
+
+    return app
+
+
+def _messages(redis_client, key) -> list[dict]:
+    return [json.loads(raw) for raw in redis_client.lrange(key, 0, -1)]
+
+
+def _comparable(message: dict) -> dict:
+    """去掉每条消息各自生成的值（delivery_tag，以及 eta / expires 的绝对时间）"""
+    message = json.loads(json.dumps(message))
+    message["properties"].pop("delivery_tag")
+    message["headers"]["eta"] = message["headers"]["eta"] is not None
+    message["headers"]["expires"] = message["headers"]["expires"] is not None
+    return message
+
+
+@pytest.mark.parametrize("transport_options", [
+    {},
+    {"priority_steps": list(range(10)), "sep": ":"},
+    {"priority_steps": [0, 5], "sep": "|"},
+])
+def test_queue_key_matches_kombu(redis_url, transport_options):
+    app = Celery("tests", broker=redis_url, set_as_current=False)
+    app.conf.broker_transport_options = transport_options
+    publisher = BatchPublisher(app)
+    with Connection(redis_url, transport_options=transport_options) as conn:
+        channel = conn.default_channel
+        for priority in [None, *range(10)]:
+            assert publisher._queue_key(QUEUE, priority) == channel._q_for_pri(QUEUE, priority or 0)
+
+
+def test_queue_key_applies_global_keyprefix(redis_url):
+    app = Celery("tests", broker=redis_url, set_as_current=False)
+    app.conf.broker_transport_options = {"global_keyprefix": "tasker:"}
+    publisher = BatchPublisher(app)
+    assert publisher._queue_key(QUEUE, 0) == "tasker:celery"
+    assert publisher._queue_key(QUEUE, 9) == "tasker:celery\x06\x169"
+
+
+@pytest.mark.parametrize("options", [
+    {},
+    {"priority": 3},
+    {"priority": 9, "expires": 60},
+    {"countdown": 30, "headers": {"tenant": "acme"}},
+])
+def test_message_matches_apply_async(celery_app, redis_client, options):
+    publisher = BatchPublisher(celery_app)
+    assert publisher.pipelined
+    key = publisher._queue_key(QUEUE, options.get("priority"))
+
+    publisher.publish("tests.add", [({"x": 1, "y": 2}, {"task_id": "batch", "queue": QUEUE, **options})])
+    celery_app.tasks["tests.add"].apply_async(kwargs={"x": 1, "y": 2}, task_id="batch", queue=QUEUE, **options)
+
+    published, expected = _messages(redis_client, key)[::-1]
+    assert published["headers"]["id"] == "batch"
+    if "expires" in options:
+        assert published["properties"]["expiration"] == str(options["expires"] * 1000)
+    assert _comparable(published) == _comparable(expected)
+
+
+def test_published_batch_is_consumable_by_kombu(celery_app, redis_url, redis_client):
+    publisher = BatchPublisher(celery_app)
+    sent = []
+    handler = lambda sender=None, headers=None, routing_key=None, **kwargs: sent.append((sender, headers["id"], routing_key))
+    after_task_publish.connect(handler, weak=False)
+    try:
+        task_ids = publisher.publish("tests.add", [({"x": i}, {"queue": QUEUE}) for i in range(5)])
+    finally:
+        after_task_publish.disconnect(handler)
+
+    assert sent == [("tests.add", task_id, QUEUE) for task_id in task_ids]
+    received = []
+    with Connection(redis_url) as conn:
+        channel = conn.default_channel
+        while (message := channel.basic_get(QUEUE)) is not None:
+            received.append((message.headers["id"], message.decode()[1]))
+    # LPUSH 入队，kombu 从另一端取出，先发布的先被消费
+    assert received == [(task_id, {"x": i}) for i, task_id in enumerate(task_ids)]
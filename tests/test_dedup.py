@@ -0,0 +1,94 @@
+import json
+import time
+
+import pytest
+from celery import Celery
+
+from app.dedup import TaskDeduplicator, callbacks_key, done_key, inflight_key, task_fingerprint
+
+IMAGE = "192.168.31.98:5000/platform_item_info:1.0.0"
+COMMAND = ["python", "main.py", "--url", "https://www.douyin.com/video/1"]
+
+
+def test_fingerprint_is_stable_across_key_order():
+    a = task_fingerprint(IMAGE, COMMAND, {"mem_limit": "1g", "environment": {"A": "1", "B": "2"}})
+    b = task_fingerprint(IMAGE, COMMAND, {"environment": {"B": "2", "A": "1"}, "mem_limit": "1g"})
+    assert a == b
+    assert len(a) == 64
+
+
+def test_fingerprint_ignores_names_labels_and_surrounding_whitespace():
+    base = task_fingerprint(IMAGE, COMMAND, {"mem_limit": "1g"})
+    assert task_fingerprint(f" {IMAGE}\n", COMMAND, {"mem_limit": "1g", "name": "x", "labels": {"a": "b"},
+                                                      "ports": {"80/tcp": 8080}, "detach": True,
+                                                      "auto_remove": True}) == base
+    assert task_fingerprint(IMAGE, COMMAND, None) == task_fingerprint(IMAGE, COMMAND, {})
+
+
+@pytest.mark.parametrize("image, command, kwargs", [
+    (IMAGE + "-other", COMMAND, {"mem_limit": "1g"}),
+    (IMAGE, COMMAND[:-1] + ["https://www.douyin.com/video/2"], {"mem_limit": "1g"}),
+    (IMAGE, " ".join(COMMAND), {"mem_limit": "1g"}),
+    (IMAGE, COMMAND, {"mem_limit": "2g"}),
+    (IMAGE, COMMAND, {"mem_limit": "1g", "environment": {"A": "1"}}),
+])
+def test_fingerprint_differs_for_relevant_changes(image, command, kwargs):
+    assert task_fingerprint(image, command, kwargs) != task_fingerprint(IMAGE, COMMAND, {"mem_limit": "1g"})
+
+
+@pytest.fixture
+def dedup(redis_url, redis_client):
+    app = Celery("tests", broker=redis_url, backend=redis_url, set_as_current=False)
+    return TaskDeduplicator(app, result_ttl=600)
+
+
+def test_first_claim_owns_the_task(dedup, redis_client):
+    assert dedup.claim("fp", "t1", lease=60) is None
+    assert redis_client.get(inflight_key("fp")) == b"t1"
+    assert 0 < redis_client.ttl(inflight_key("fp")) <= 60
+
+
+def test_later_claims_join_and_append_callbacks(dedup, redis_client):
+    dedup.claim("fp", "t1", lease=60, callback="http://a/cb")
+    assert dedup.claim("fp", "t2", lease=60, callback="http://b/cb") == "t1"
+    assert dedup.claim("fp", "t3", lease=60) == "t1"
+    assert dedup.claim("fp", "t4", lease=60, callback="http://c/cb") == "t1"
+    # 发起方自己的回调在任务参数中，不进入合并列表
+    assert redis_client.lrange(callbacks_key("t1"), 0, -1) == [b"http://b/cb", b"http://c/cb"]
+
+
+def test_complete_success_releases_and_records_result(dedup, redis_client):
+    dedup.claim("fp", "t1", lease=60)
+    dedup.claim("fp", "t2", lease=60, callback="http://b/cb")
+    assert dedup.complete("fp", "t1", success=True) == ["http://b/cb"]
+    assert redis_client.get(inflight_key("fp")) is None
+    assert not redis_client.exists(callbacks_key("t1"))
+    assert dedup.lookup_result("fp", max_age=60) == "t1"
+    # 结束后相同任务重新由新任务执行
+    assert dedup.claim("fp", "t3", lease=60) is None
+
+
+def test_complete_failure_does_not_record_result(dedup, redis_client):
+    dedup.claim("fp", "t1", lease=60)
+    dedup.claim("fp", "t2", lease=60, callback="http://b/cb")
+    assert dedup.complete("fp", "t1", success=False) == ["http://b/cb"]
+    assert redis_client.get(inflight_key("fp")) is None
+    assert dedup.lookup_result("fp", max_age=60) is None
+
+
+def test_complete_by_non_owner_keeps_the_owner(dedup, redis_client):
+    dedup.claim("fp", "t1", lease=60)
+    assert dedup.complete("fp", "stale", success=False) == []
+    assert redis_client.get(inflight_key("fp")) == b"t1"
+
+
+def test_lookup_respects_max_age(dedup, redis_client):
+    redis_client.set(done_key("fp"), json.dumps({"task_id": "t1", "finished_at": time.time() - 120}))
+    assert dedup.lookup_result("fp", max_age=300) == "t1"
+    assert dedup.lookup_result("fp", max_age=60) is None
+    assert dedup.lookup_result("other", max_age=300) is None
+
+
+def test_done_entry_expires_after_result_ttl(dedup, redis_client):
+    dedup.complete("fp", "t1", success=True)
+    assert 0 < redis_client.ttl(done_key("fp")) <= 600
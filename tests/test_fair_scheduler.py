@@ -0,0 +1,178 @@
+import time
+from collections import Counter
+
+import pytest
+from celery import Celery, states
+
+from app.fair_scheduler import (PAYLOAD_KEY, FairScheduler, inflight_key, parse_priority, pending_key,
+                                priority_class)
+
+TASK = "app.worker.run_docker_task"
+QUEUE = "celery"
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, 3), ("high", 0), ("normal", 3), ("low", 9), (0, 0), (5, 5), (9, 9),
+])
+def test_parse_priority(value, expected):
+    assert parse_priority(value) == expected
+
+
+@pytest.mark.parametrize("value", ["urgent", "", -1, 10, 1.5, True, False, "3", [1]])
+def test_parse_priority_rejects_invalid(value):
+    with pytest.raises(ValueError):
+        parse_priority(value)
+
+
+@pytest.mark.parametrize("priority, expected", [(None, "high"), (0, "high"), (3, "normal"), (6, "normal"), (9, "low")])
+def test_priority_class(priority, expected):
+    assert priority_class(priority) == expected
+
+
+@pytest.fixture
+def celery_app(redis_url, redis_client):
+    return Celery("tests", broker=redis_url, backend=redis_url, set_as_current=False)
+
+
+@pytest.fixture
+def sent(celery_app, monkeypatch):
+    """记录发送的任务，不真正发送到 broker（队列深度始终为 0）"""
+    calls = []
+    monkeypatch.setattr(celery_app, "send_task", lambda name, **kwargs: calls.append(kwargs))
+    return calls
+
+
+def make_scheduler(celery_app, **kwargs) -> FairScheduler:
+    return FairScheduler(celery_app, **{"queue_depth": 1000, **kwargs})
+
+
+def submit(scheduler: FairScheduler, tenant: str, count: int, priority: int = 3, **options):
+    for i in range(count):
+        scheduler.submit(TASK, f"{tenant}-{priority}-{i}", {"i": i}, {"queue": QUEUE, "headers": {}, **options},
+                         tenant, priority)
+
+
+def tenants_of(calls) -> list[str]:
+    return [call["task_id"].split("-")[0] for call in calls]
+
+
+def test_stride_follows_weights(celery_app, sent):
+    scheduler = make_scheduler(celery_app, weights={"a": 2, "b": 1})
+    submit(scheduler, "a", 20)
+    submit(scheduler, "b", 20)
+    assert scheduler._dispatch_queue(QUEUE, 12) == 12
+    assert Counter(tenants_of(sent)) == {"a": 8, "b": 4}
+
+
+def test_tasks_of_one_tenant_keep_submission_order(celery_app, sent):
+    scheduler = make_scheduler(celery_app)
+    submit(scheduler, "a", 5)
+    scheduler.dispatch()
+    assert [call["task_id"] for call in sent] == [f"a-3-{i}" for i in range(5)]
+
+
+def test_higher_priority_goes_first_regardless_of_weight(celery_app, sent):
+    scheduler = make_scheduler(celery_app, weights={"a": 100, "b": 1})
+    submit(scheduler, "a", 3, priority=9)
+    submit(scheduler, "b", 3, priority=0)
+    scheduler.dispatch()
+    assert tenants_of(sent) == ["b"] * 3 + ["a"] * 3
+
+
+def test_queue_depth_limits_each_round(celery_app, sent):
+    scheduler = make_scheduler(celery_app, queue_depth=2)
+    submit(scheduler, "a", 5)
+    assert scheduler.dispatch() == 2
+
+
+def test_concurrency_limit_and_release(celery_app, sent):
+    scheduler = make_scheduler(celery_app, concurrency={"a": 2})
+    submit(scheduler, "a", 5)
+    submit(scheduler, "b", 2)
+    assert scheduler.dispatch() == 4
+    assert Counter(tenants_of(sent)) == {"a": 2, "b": 2}
+    assert scheduler.dispatch() == 0
+
+    scheduler.release("a", sent[0]["task_id"])
+    assert scheduler.dispatch() == 1
+    assert tenants_of(sent[4:]) == ["a"]
+
+
+def test_default_concurrency(celery_app, sent):
+    scheduler = make_scheduler(celery_app, default_concurrency=1, concurrency={"b": 3})
+    submit(scheduler, "a", 3)
+    submit(scheduler, "b", 3)
+    scheduler.dispatch()
+    assert Counter(tenants_of(sent)) == {"a": 1, "b": 3}
+
+
+def test_expired_lease_frees_the_slot(celery_app, sent, redis_client):
+    scheduler = make_scheduler(celery_app, concurrency={"a": 1})
+    submit(scheduler, "a", 2)
+    assert scheduler.dispatch() == 1
+    # worker 崩溃、释放丢失：占用到期后自动失效
+    redis_client.zadd(inflight_key("a"), {sent[0]["task_id"]: time.time() - 1})
+    assert scheduler.dispatch() == 1
+
+
+def test_lease_covers_time_limit_and_grace(celery_app, sent, redis_client):
+    scheduler = make_scheduler(celery_app, lease_grace=300)
+    submit(scheduler, "a", 1, time_limit=600)
+    before = time.time()
+    scheduler.dispatch()
+    lease = redis_client.zscore(inflight_key("a"), sent[0]["task_id"])
+    assert before + 900 <= lease <= time.time() + 900
+
+
+def test_countdown_and_expires_become_absolute(celery_app, sent):
+    scheduler = make_scheduler(celery_app)
+    before = time.time()
+    submit(scheduler, "a", 1, countdown=60, expires=120)
+    scheduler.dispatch()
+    options = sent[0]
+    assert "countdown" not in options
+    assert before + 60 <= options["eta"].timestamp() <= time.time() + 60
+    assert before + 120 <= options["expires"].timestamp() <= time.time() + 120
+
+
+def test_expired_payload_is_revoked_without_lease(celery_app, sent, redis_client):
+    scheduler = make_scheduler(celery_app)
+    submit(scheduler, "a", 1, expires=0.01)
+    submit(scheduler, "b", 1)
+    time.sleep(0.05)
+    assert scheduler.dispatch() == 1
+    assert tenants_of(sent) == ["b"]
+    assert celery_app.AsyncResult("a-3-0").state == states.REVOKED
+    assert redis_client.zcard(inflight_key("a")) == 0
+    assert not redis_client.hexists(PAYLOAD_KEY, "a-3-0")
+
+
+def test_lease_is_taken_before_publishing(celery_app, monkeypatch, redis_client):
+    scheduler = make_scheduler(celery_app)
+    # 执行很快的任务在发送返回前就已结束并释放
+    monkeypatch.setattr(celery_app, "send_task", lambda name, **kwargs: scheduler.release("a", kwargs["task_id"]))
+    submit(scheduler, "a", 1)
+    assert scheduler.dispatch() == 1
+    assert redis_client.zcard(inflight_key("a")) == 0
+
+
+def test_failed_send_returns_task_to_pending(celery_app, monkeypatch, redis_client):
+    scheduler = make_scheduler(celery_app)
+
+    def fail(name, **kwargs):
+        raise ConnectionError("broker down")
+
+    monkeypatch.setattr(celery_app, "send_task", fail)
+    submit(scheduler, "a", 1)
+    with pytest.raises(ConnectionError):
+        scheduler.dispatch()
+    assert redis_client.zcard(inflight_key("a")) == 0
+    assert redis_client.zrange(pending_key(QUEUE, "a"), 0, -1) == [b"a-3-0"]
+    assert redis_client.hexists(PAYLOAD_KEY, "a-3-0")
+
+
+def test_stats(celery_app, sent):
+    scheduler = make_scheduler(celery_app, concurrency={"a": 1}, weights={"a": 2})
+    submit(scheduler, "a", 3)
+    scheduler.dispatch()
+    assert scheduler.stats() == {"a": {"pending": {QUEUE: 2}, "inflight": 1, "limit": 1, "weight": 2.0}}
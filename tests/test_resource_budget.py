@@ -0,0 +1,64 @@
+import threading
+
+from app.resource_budget import ResourceBudget, requested_resources
+
+GB = 1024 ** 3
+
+
+def test_requested_resources_defaults():
+    assert requested_resources({}, 1, GB) == (1, GB)
+
+
+def test_requested_resources_from_container_kwargs():
+    assert requested_resources({"nano_cpus": 2_500_000_000, "mem_limit": "512m"}, 1, GB) == (2.5, 512 * 1024 ** 2)
+    assert requested_resources({"cpu_quota": 50000, "cpu_period": 100000}, 1, GB) == (0.5, GB)
+
+
+def test_acquire_within_budget():
+    budget = ResourceBudget(cpus=4, memory=8 * GB)
+    assert budget.acquire(2, 4 * GB, timeout=0)
+    assert budget.acquire(2, 4 * GB, timeout=0)
+    assert budget.usage()["running"] == 2
+
+
+def test_acquire_blocks_until_release():
+    budget = ResourceBudget(cpus=4, memory=0)
+    assert budget.acquire(3, 0, timeout=0)
+    assert not budget.acquire(2, 0, timeout=0.05)
+
+    acquired = threading.Event()
+    waiter = threading.Thread(target=lambda: budget.acquire(2, 0) and acquired.set())
+    waiter.start()
+    assert not acquired.wait(0.05)
+    budget.release(3, 0)
+    waiter.join(timeout=2)
+    assert acquired.is_set()
+    assert budget.usage()["cpus"] == 2
+
+
+def test_oversized_request_is_clamped_to_budget():
+    budget = ResourceBudget(cpus=2, memory=GB)
+    assert budget.acquire(16, 64 * GB, timeout=0)
+    assert budget.usage()["cpus"] == 2
+    assert budget.usage()["memory"] == GB
+    # 释放时按同样的方式截断，预算归零
+    budget.release(16, 64 * GB)
+    assert budget.usage() == {"running": 0, "limit": 0, "cpus": 0, "cpus_budget": 2, "memory": 0,
+                              "memory_budget": GB}
+
+
+def test_first_task_always_fits():
+    budget = ResourceBudget(cpus=1, memory=GB)
+    budget.set_limit(1)
+    assert budget.acquire(1, GB, timeout=0)
+    assert not budget.acquire(0.1, 1, timeout=0)
+
+
+def test_limit_caps_running_tasks():
+    budget = ResourceBudget()
+    budget.set_limit(2)
+    assert budget.acquire(1, 0, timeout=0)
+    assert budget.acquire(1, 0, timeout=0)
+    assert not budget.acquire(1, 0, timeout=0)
+    budget.set_limit(3)
+    assert budget.acquire(1, 0, timeout=0)
@@ -0,0 +1,93 @@
+import re
+
+import pytest
+
+from app.result_parser import ResultParser, result_data_word
+
+
+def regex_parse(ret: str) -> str:
+    # 旧版 get_execute_result 的实现，作为增量解析的对照
+    matches = re.findall(rf"{result_data_word}\s*([\s\S]*?)\s*{result_data_word}", ret)
+    if matches:
+        return "\n\n".join(m.strip() for m in matches if m.strip())
+    elif ret.strip():
+        return ret.strip().splitlines()[-1]
+    return ""
+
+
+def parse(data: bytes, chunk_size: int, **kwargs) -> str:
+    parser = ResultParser(**kwargs)
+    for i in range(0, len(data), chunk_size):
+        parser.feed(data[i:i + chunk_size])
+    parser.close()
+    return parser.result()
+
+
+MARKER = result_data_word
+LOGS = [
+    "line1\nline2\nlast line",
+    "line1\nline2\nlast line\n",
+    "line1\nlast line\n\n\n",
+    "line1\nlast line\n  \t \n",
+    "line1\r\nlast line\r\n",
+    "line1\r\nlast line\r\n\r\n",
+    "line1\nlast line\n　\n",
+    "\n\n  \n",
+    "",
+    "single",
+    f"log\n{MARKER}\n{{\"a\": 1}}\n{MARKER}\nafter\n",
+    f"log\n{MARKER}\n  first  \n{MARKER}\nmid\n{MARKER}\nsecond\n{MARKER}\n",
+    f"log\n{MARKER}\n\n{MARKER}\nafter\n",
+    f"log\n{MARKER}\nunclosed block\n",
+    f"{MARKER}data{MARKER}",
+    f"中文日志\n{MARKER}\n结果：成功\n{MARKER}\n",
+    "中文日志\n最后一行\n",
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 16, 1024])
+@pytest.mark.parametrize("log", LOGS)
+def test_matches_regex_across_chunk_boundaries(log: str, chunk_size: int):
+    assert parse(log.encode("utf-8"), chunk_size) == regex_parse(log)
+
+
+def test_marker_split_across_chunks():
+    data = f"x\n{MARKER}\nresult\n{MARKER}\n".encode()
+    for split in range(1, len(data)):
+        parser = ResultParser()
+        parser.feed(data[:split])
+        parser.feed(data[split:])
+        parser.close()
+        assert parser.result() == "result"
+
+
+def test_long_line_without_newline_is_capped():
+    parser = ResultParser(max_line_size=16)
+    for _ in range(1000):
+        parser.feed(b"x" * 1024)
+    assert len(parser._line) == 16
+    parser.close()
+    assert parser.result() == "x" * 16
+
+
+def test_long_line_inside_chunk_is_capped():
+    parser = ResultParser(max_line_size=16)
+    parser.feed(b"y" * 1024 + b"\n\n")
+    parser.close()
+    assert parser.result() == "y" * 16
+
+
+def test_block_is_truncated_at_max_block_size():
+    parser = ResultParser(max_block_size=4)
+    parser.feed(f"{MARKER}abcdefgh{MARKER}".encode())
+    parser.close()
+    assert parser.truncated
+    assert parser.result() == "abcd"
+
+
+def test_tail_keeps_recent_output():
+    parser = ResultParser(tail_size=8)
+    for i in range(100):
+        parser.feed(f"line{i:03d}\n".encode())
+    assert parser.tail().endswith("line099\n")
+    assert parser.total_bytes == 800
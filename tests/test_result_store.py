@@ -0,0 +1,100 @@
+import json
+import os
+import time
+import zlib
+
+import msgpack
+import pytest
+
+from app import result_store as store_module
+from app.result_store import FORMAT_RAW, FORMAT_ZLIB, OFFLOAD_REF_KEY, ResultStore
+
+META = {
+    "status": "SUCCESS",
+    "result": {"success": True, "attempt": 1, "result": "结果", "resources": {"memory_peak": 5000}},
+    "traceback": None,
+    "children": [],
+    "date_done": "2025-07-18T10:00:00",
+    "task_id": "5937c7e7-425f-4452-bff7-a234fca14973",
+}
+
+
+def large_meta(size: int) -> dict:
+    return {**META, "result": {"success": True, "result": os.urandom(size // 2).hex()}}
+
+
+def test_small_result_round_trip_uncompressed():
+    store = ResultStore()
+    data = store.dumps(META)
+    assert data[:1] == FORMAT_RAW
+    assert store.loads(data) == META
+
+
+def test_large_result_round_trip_compressed():
+    store = ResultStore(compress_threshold=1024)
+    meta = {**META, "result": {"success": True, "result": "x" * 100_000}}
+    data = store.dumps(meta)
+    assert data[:1] != FORMAT_RAW
+    assert len(data) < 10_000
+    assert store.loads(data) == meta
+
+
+def test_zlib_fallback_without_zstd_and_lz4(monkeypatch):
+    monkeypatch.setattr(store_module, "zstandard", None)
+    monkeypatch.setattr(store_module, "lz4", None)
+    store = ResultStore(compress_threshold=16)
+    meta = {**META, "result": "y" * 1000}
+    data = store.dumps(meta)
+    assert data[:1] == FORMAT_ZLIB
+    assert msgpack.unpackb(zlib.decompress(data[1:]), raw=False) == meta
+    assert store.loads(data) == meta
+
+
+@pytest.mark.parametrize("legacy", [
+    json.dumps(META),
+    json.dumps(META).encode("utf-8"),
+    json.dumps({"status": "PENDING", "result": None}),
+])
+def test_loads_legacy_json(legacy):
+    expected = json.loads(legacy)
+    assert ResultStore().loads(legacy) == expected
+
+
+def test_unserializable_values_are_stringified():
+    store = ResultStore()
+    assert store.loads(store.dumps({"result": ValueError("boom")})) == {"result": "boom"}
+
+
+def test_offload_round_trip(tmp_path):
+    store = ResultStore(compress_threshold=1024, offload_threshold=4096, offload_dir=str(tmp_path))
+    meta = large_meta(64 * 1024)
+    data = store.dumps(meta)
+    assert len(data) < 4096
+    ref = store._unpack(data)["result"][OFFLOAD_REF_KEY]
+    assert (tmp_path / ref).is_file()
+    assert store.loads(data) == meta
+
+
+def test_offload_only_when_enabled():
+    store = ResultStore(compress_threshold=1024, offload_threshold=4096)
+    meta = large_meta(64 * 1024)
+    assert store.loads(store.dumps(meta)) == meta
+
+
+def test_missing_offloaded_file_returns_failure(tmp_path):
+    store = ResultStore(compress_threshold=1024, offload_threshold=4096, offload_dir=str(tmp_path))
+    data = store.dumps(large_meta(64 * 1024))
+    ref = store._unpack(data)["result"][OFFLOAD_REF_KEY]
+    os.remove(tmp_path / ref)
+    assert store.loads(data)["result"]["success"] is False
+
+
+def test_sweep_removes_expired_files(tmp_path):
+    store = ResultStore(compress_threshold=1024, offload_threshold=4096, offload_dir=str(tmp_path))
+    old = store._unpack(store.dumps(large_meta(64 * 1024)))["result"][OFFLOAD_REF_KEY]
+    new = store._unpack(store.dumps(large_meta(64 * 1024)))["result"][OFFLOAD_REF_KEY]
+    past = time.time() - 7200
+    os.utime(tmp_path / old, (past, past))
+    store.sweep(max_age=3600)
+    assert not (tmp_path / old).exists()
+    assert (tmp_path / new).exists()